@@ -1,9 +1,15 @@
+import fnmatch
+import json
+import os
 import sys
-from datetime import datetime
+import xml.etree.ElementTree as ET
+from collections import deque
+from dataclasses import replace
+from datetime import datetime, timedelta
 from pathlib import Path
-import tempfile
 
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 
 from xml_builder import (
     TaskConfig,
@@ -14,229 +20,705 @@ from xml_builder import (
     monthly_days_trigger,
     monthly_last_day_trigger,
     monthly_nth_dow_trigger,
+    shift_trigger,
 )
 import scheduler_cli as sc
-from preview import preview_next_runs
+import folders
+import inventory_poller
+import launcher
+import metrics
+import run_history
+import task_logs
+import task_store
+from task_index import TaskIndex, paginate
+from preview import next_runs, parse_duration
 
 
 st.set_page_config(page_title="Task Scheduler Frontend")
 
+# 统计本次脚本运行中的 schtasks 调用；上一次若被 st.rerun 中断，在这里补记
+if "metrics_scope" in st.session_state:
+    metrics.end_scope(st.session_state.metrics_scope, completed=False)
+st.session_state.metrics_scope = metrics.begin_scope()
 
-def parse_tasks_list(text: str):
-    tasks = []
-    current = {}
-    for line in text.splitlines():
-        line = line.strip()
-        if not line:
-            if current and ('TaskName' in current or '任务名' in current):
-                tasks.append(current)
-                current = {}
-            continue
-        if ':' in line:
-            # 找到最后一个有意义的冒号（排除值部分的冒号）
-            # 对于"重复: 每: 0 小时， 2 分钟"这种格式
-            if line.count(':') >= 2 and ('重复:' in line or 'Repeat:' in line):
-                # 特殊处理重复相关字段
-                parts = line.split(':', 2)  # 最多分割成3部分
-                if len(parts) >= 3:
-                    # "重复: 每: 0 小时， 2 分钟" -> key="重复: 每", value="0 小时， 2 分钟"
-                    key = f"{parts[0].strip()}: {parts[1].strip()}"
-                    val = parts[2].strip()
-                    current[key] = val
+
+def format_time(value):
+    return value.strftime("%Y-%m-%d %H:%M:%S") if value else "N/A"
+
+
+BULK_ACTIONS = {
+    "启用": lambda names: sc.change_enable_batch(names, True),
+    "禁用": lambda names: sc.change_enable_batch(names, False),
+    "运行": sc.run_task_batch,
+    "删除": sc.delete_task_batch,
+}
+
+
+def render_bulk_actions(tasks):
+    """批量操作：按通配符筛选、多选，然后并发执行并汇总结果"""
+    names = [t.short_name for t in tasks]
+    with st.expander("📦 批量操作", expanded="bulk_results" in st.session_state):
+        summary = st.session_state.pop("bulk_results", None)
+        if summary:
+            failed = sum(1 for row in summary["rows"] if row["结果"] != "成功")
+            st.write(f"**{summary['action']}**: {len(summary['rows']) - failed} 成功, {failed} 失败")
+            st.dataframe(summary["rows"], use_container_width=True)
+
+        pattern = st.text_input("按名称筛选（支持 * 和 ? 通配符）", value="*", key="bulk_pattern")
+        matched = [n for n in names if fnmatch.fnmatch(n.lower(), (pattern or "*").lower())]
+        select_all = st.checkbox(f"选择全部匹配的任务（{len(matched)} 个）", key="bulk_select_all")
+        if select_all:
+            selected = matched
+        else:
+            selected = st.multiselect("选择任务", matched, key="bulk_selected")
+
+        col1, col2 = st.columns(2)
+        action = col1.selectbox("操作", list(BULK_ACTIONS), key="bulk_action")
+        confirmed = action != "删除" or col2.checkbox("确认删除所选任务", key="bulk_confirm_delete")
+        if st.button(f"执行（{len(selected)} 个任务）", disabled=not selected or not confirmed):
+            results = BULK_ACTIONS[action](selected)
+            rows = []
+            for task_name, res in zip(selected, results):
+                if res is None:
+                    rows.append({"任务": task_name, "结果": "已取消", "详情": ""})
+                elif res.returncode == 0:
+                    rows.append({"任务": task_name, "结果": "成功", "详情": res.stdout.strip()})
+                else:
+                    rows.append({"任务": task_name, "结果": "失败", "详情": res.stderr.strip()})
+            # 保存汇总结果，统一刷新一次任务列表
+            st.session_state.bulk_results = {"action": action, "rows": rows}
+            refresh_after_change()
+
+
+NEXT_RUN_WINDOWS = {
+    "全部": None,
+    "1 小时内": timedelta(hours=1),
+    "24 小时内": timedelta(days=1),
+    "7 天内": timedelta(days=7),
+}
+
+RESULT_FILTER_LABELS = {"全部": None, "成功": "ok", "失败": "failed", "从未运行": "never"}
+
+
+def render_task_filters(tasks, version):
+    """筛选与分页：返回当前页的 (序号, 任务) 列表，只有这一页会被渲染"""
+    # 索引按快照版本缓存在会话中，版本不变时重复使用
+    cached = st.session_state.get("task_index")
+    if cached is None or cached[0] != version:
+        cached = (version, TaskIndex(tasks))
+        st.session_state.task_index = cached
+    index = cached[1]
+
+    col1, col2 = st.columns(2)
+    text = col1.text_input("搜索任务名", key="filter_text")
+    statuses = col2.multiselect("状态", index.statuses(), key="filter_status")
+    col1, col2, col3 = st.columns(3)
+    result_label = col1.selectbox("上次结果", list(RESULT_FILTER_LABELS), key="filter_result")
+    window_label = col2.selectbox("下次运行", list(NEXT_RUN_WINDOWS), key="filter_window")
+    page_size = col3.selectbox("每页数量", [20, 50, 100], key="page_size")
+
+    window = NEXT_RUN_WINDOWS[window_label]
+    matches = index.search(
+        text=text,
+        statuses=statuses,
+        result=RESULT_FILTER_LABELS[result_label],
+        next_run_before=datetime.now() + window if window else None,
+    )
+    pages = max(1, -(-len(matches) // page_size))
+    # 不设 key：匹配数量变化时标签随之变化，页码自动回到第 1 页
+    page = st.number_input(f"页码（共 {pages} 页，{len(matches)}/{len(index)} 个任务）",
+                           min_value=1, max_value=pages, value=1)
+    start = (page - 1) * page_size
+    return list(enumerate(paginate(matches, page, page_size), start=start))
+
+
+HISTORY_DAYS = 30
+
+
+def format_stats(stats):
+    if stats is None or not (stats.runs or stats.missed):
+        return f"近 {HISTORY_DAYS} 天无运行记录"
+    rate = "N/A" if stats.success_rate is None else f"{stats.success_rate:.0%}"
+    return (f"近 {HISTORY_DAYS} 天：成功率 {rate} · 运行 {stats.runs} 次（每天 {stats.runs_per_day:.2f} 次）"
+            f" · 错过 {stats.missed} 次")
+
+
+def format_journal(summary):
+    """启动器日志中的耗时分位数与峰值内存"""
+    durations = " · ".join(f"p{p} {d:.1f}s" for p, d in summary["durations"].items() if d is not None)
+    rss = summary["peak_rss"]
+    memory = f" · 峰值内存 {rss / 1024 / 1024:.0f} MB" if rss else ""
+    return f"最近 {summary['runs']} 次耗时：{durations}{memory}"
+
+
+@st.fragment
+def render_task_card(idx, task, stats=None):
+    """每张任务卡片是一个独立的 fragment：卡片内的操作只重跑、重绘这一张卡片"""
+    name = task.name
+    short_name = task.short_name if name else f"task_{idx}"
+    
+    # 使用任务名作为基础key，翻页后仍保持唯一
+    base_key = short_name
+    snapshot = get_poller().snapshot(timeout=0)
+    if card_flag(f"deleted_{base_key}", snapshot):
+        if snapshot is None or snapshot.find(name) is None:
+            st.caption(f"🗑️ {name} 已删除")
+            return
+        # 同名任务已重新创建
+        del st.session_state[f"deleted_{base_key}"]
+    # fragment 重跑时参数仍是上次整页运行时的记录；操作过的卡片改用修补后的最新记录
+    if card_flag(f"patched_{base_key}", snapshot) and snapshot is not None:
+        task = snapshot.find(name) or task
+    message = st.session_state.pop(f"card_message_{base_key}", None)
+    
+    # 检查任务状态（解析时已统一中英文字段）
+    status = task.status
+    enabled = task.enabled
+    
+    # 根据状态设置标题颜色
+    display_name = name if name else f"未知任务_{idx}"
+    if enabled:
+        title = f"✅ {display_name}"
+    else:
+        title = f"⚠️ {display_name} (已禁用)"
+        
+    with st.expander(title, expanded=message is not None):
+        if message:
+            st.success(message)
+        # 任务信息 - 每行显示两个字段
+        col1, col2 = st.columns(2)
+        
+        # 第一行：状态和上次结果
+        with col1:
+            st.write(f"**状态**: {status or 'N/A'}")
+        with col2:
+            last_result = 'N/A' if task.last_result is None else task.last_result
+            st.write(f"**上次结果**: {last_result}")
+        
+        # 第二行：上次运行和下次运行
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write(f"**上次运行**: {format_time(task.last_run)}")
+        with col2:
+            st.write(f"**下次运行**: {format_time(task.next_run)}")
+        st.caption(format_stats(stats))
+        journal = launcher.journal_summary(short_name)
+        if journal and journal["runs"]:
+            st.caption(format_journal(journal))
+        
+        # 其余字段与任务 XML 在打开详情时才渲染/查询
+        if st.toggle("更多详情", key=f"details_{base_key}"):
+            render_task_details(task, short_name)
+        if st.toggle("✏️ 编辑", key=f"edit_{base_key}"):
+            render_task_editor(task, short_name)
+        if st.toggle("📜 日志", key=f"log_{base_key}"):
+            render_task_log(short_name)
+        
+        # 操作按钮
+        col1, col2, col3 = st.columns(3)
+        
+        # Run 按钮 - 如果任务被禁用则显示提示
+        if enabled:
+            if col1.button("▶️ 运行", key=f"run_{base_key}"):
+                res = sc.run_task(short_name)
+                if res.returncode == 0:
+                    refresh_card(short_name, "✅ 任务已启动")
                 else:
-                    # 正常处理
-                    key, val = line.split(':', 1)
-                    current[key.strip()] = val.strip()
+                    st.error(f"❌ 启动失败: {res.stderr}")
+        else:
+            if col1.button("▶️ 运行 (需先启用)", key=f"run_{base_key}", disabled=True):
+                st.warning("⚠️ 无法运行已禁用的任务，请先启用该任务")
+        
+        # Enable/Disable 按钮
+        toggle_text = "⏸️ 禁用" if enabled else "▶️ 启用"
+        if col2.button(toggle_text, key=f"toggle_{base_key}"):
+            res = sc.change_enable(short_name, not enabled)
+            if res.returncode == 0:
+                action = "禁用" if enabled else "启用"
+                refresh_card(short_name, f"✅ 任务已{action}")  # 只刷新这一张卡片
             else:
-                # 正常的单冒号字段
-                key, val = line.split(':', 1)
-                current[key.strip()] = val.strip()
-    # 处理最后一个任务
-    if current and ('TaskName' in current or '任务名' in current):
-        tasks.append(current)
-    return tasks
+                st.error(f"❌ 操作失败: {res.stderr}")
+        
+        # Delete 按钮
+        if col3.button("🗑️ 删除", key=f"del_{base_key}"):
+            res = sc.delete_task(short_name)
+            if res.returncode == 0:
+                st.session_state[f"deleted_{base_key}"] = patch_snapshot(short_name, None)
+                rerun_fragment()
+            else:
+                st.error(f"❌ 删除失败: {res.stderr}")
 
 
-menu = st.sidebar.selectbox("Menu", ["Tasks", "Create Task"])
+def refresh_card(short_name, message):
+    """单个任务操作后：一次定向查询取回该任务的新状态，修补共享快照，只重跑当前卡片"""
+    result, record = sc.refresh_task(short_name)
+    if result.returncode != 0 and not sc.is_not_found(result):
+        # 查询失败不代表任务已不存在：保留快照中的旧记录，下次刷新时重查
+        st.success(message)
+        st.warning(f"⚠️ 无法获取任务最新状态: {result.stderr.strip()}")
+        return
+    st.session_state[f"patched_{short_name}"] = patch_snapshot(short_name, record)
+    st.session_state[f"card_message_{short_name}"] = message
+    rerun_fragment()
 
-if menu == "Tasks":
-    st.header("Scheduled Tasks")
+
+def patch_snapshot(short_name, record):
+    """修补共享快照，返回修补后的快照版本，供卡片标记判断是否过期"""
+    snapshot = get_poller().patch(short_name, record) or get_poller().snapshot(timeout=0)
+    return snapshot.version if snapshot else 0
+
+
+def card_flag(key, snapshot):
+    """卡片标记的值是设置时的快照版本；之后发布了更新的快照（如整页刷新、任务被重新创建）即失效并清除"""
+    version = st.session_state.get(key)
+    if version is None or (snapshot is not None and snapshot.version > version):
+        st.session_state.pop(key, None)
+        return False
+    return True
+
+
+def rerun_fragment():
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        # 卡片作为整页运行的一部分执行时（而非 fragment 重跑）只能整页重跑；快照已修补，不会重新查询
+        st.rerun()
+
+
+def render_task_details(task, short_name):
+    # 第三行：计划类型和重复间隔
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write(f"**计划类型**: {task.schedule_type or 'N/A'}")
+    with col2:
+        st.write(f"**重复间隔**: {task.repeat_every or 'N/A'}")
     
-    # 添加调试按钮
+    # 第四行：开始时间和开始日期
     col1, col2 = st.columns(2)
     with col1:
-        if st.button("🔄 刷新任务列表"):
-            st.rerun()
+        st.write(f"**开始时间**: {task.start_time or 'N/A'}")
     with col2:
-        if st.button("🔍 调试信息"):
-            st.subheader("调试信息")
-            
-            # 查看所有任务
-            all_tasks = sc.list_all_tasks()
-            if all_tasks.returncode == 0:
-                pytasks_count = all_tasks.stdout.count("\\PyTasks\\")
-                st.write(f"系统中包含 'PyTasks' 的任务数量: {pytasks_count}")
-                
-                if pytasks_count > 0:
-                    st.text("找到的 PyTasks 任务:")
-                    lines = all_tasks.stdout.split('\n')
-                    for line in lines:
-                        if '\\PyTasks\\' in line:
-                            st.text(line.strip())
-                else:
-                    st.info("系统中暂无 PyTasks 相关任务")
-            else:
-                st.error(f"查询所有任务失败: {all_tasks.stderr}")
-            
-            # 检查 PyTasks 文件夹
-            folder_result = sc.query_task_folder()
-            if folder_result.returncode == 0:
-                st.success("✅ PyTasks 文件夹存在且可访问")
-            else:
-                # 检查是否真的有任务存在
-                if pytasks_count > 0:
-                    st.warning("⚠️ PyTasks 任务存在但文件夹检测异常（可能是系统版本差异）")
-                else:
-                    st.info("ℹ️ PyTasks 文件夹不存在（正常情况，首次使用时会自动创建）")
-                    
-            st.write(f"**技术详情**:")
-            st.write(f"- 文件夹检测返回码: {folder_result.returncode}")
-            if folder_result.stderr and folder_result.stderr.strip():
-                st.text(f"- 详细信息: {folder_result.stderr.strip()}")
+        st.write(f"**开始日期**: {task.start_date or 'N/A'}")
     
-    result = sc.query_all_tasks()
-    if result.returncode != 0:
-        if "找不到指定的文件" in result.stderr or "cannot find" in result.stderr.lower():
-            tasks = []
-            st.info("暂无任务或任务文件夹不存在")
+    # 第五行：执行命令和工作目录
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write(f"**执行命令**: {task.task_to_run or 'N/A'}")
+    with col2:
+        st.write(f"**工作目录**: {task.start_in or 'N/A'}")
+    
+    # 第六行：运行用户和创建者
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write(f"**运行用户**: {task.run_as_user or 'N/A'}")
+    with col2:
+        st.write(f"**创建者**: {task.author or 'N/A'}")
+    
+    runs = run_history.get_history().runs(task.name, limit=10)
+    if runs:
+        st.write("**最近运行**:")
+        st.dataframe([{"时间": format_time(t), "结果": "N/A" if r is None else r} for t, r in runs],
+                     use_container_width=True)
+
+    if st.button("📄 查看任务 XML", key=f"xml_{short_name}"):
+        res = sc.query_task_xml(short_name)
+        if res.returncode == 0:
+            st.code(res.stdout, language="xml")
+            runs = next_runs(res.stdout, 5)
+            if runs:
+                st.write("**接下来的运行**: " + ", ".join(t.strftime('%Y-%m-%d %H:%M') for t in runs))
         else:
-            st.error(f"Failed to query tasks: {result.stderr}")
-            tasks = []
+            st.error(f"❌ 查询失败: {res.stderr}")
+
+
+def render_task_editor(task, short_name):
+    """就地编辑任务：与线上定义逐字段比较，能用 /Change 的就不重建任务"""
+    import task_edit
+    from xml_builder import config_from_xml
+
+    # 线上 XML 只在打开编辑器时查询一次
+    xml_key = f"edit_xml_{short_name}"
+    if xml_key not in st.session_state:
+        res = sc.query_task_xml(short_name)
+        if res.returncode != 0:
+            st.error(f"❌ 查询失败: {res.stderr}")
+            return
+        st.session_state[xml_key] = res.stdout
+    live, _ = config_from_xml(st.session_state[xml_key], short_name)
+    triggers = task_edit.parse_triggers(live.trigger_xml) if live.trigger_xml else []
+    start_node = task_edit.find_element(triggers[0], "StartBoundary") if len(triggers) == 1 else None
+    interval_node = task_edit.find_element(triggers[0], "Interval") if len(triggers) == 1 else None
+    policies = ["Parallel", "Queue", "IgnoreNew", "StopExisting"]
+
+    with st.form(f"edit_form_{short_name}"):
+        python_path = st.text_input("Python Path", value=live.python_path)
+        script_path = st.text_input("Script Path", value=live.script_path)
+        args = st.text_input("Arguments", value=live.args)
+        workdir = st.text_input("Working Directory", value=live.workdir)
+        if start_node is not None:
+            start = datetime.fromisoformat(start_node.text.strip()[:19])
+            col1, col2 = st.columns(2)
+            start_date = col1.date_input("开始日期", value=start.date())
+            start_time = col2.time_input("开始时间", value=start.time())
+        if interval_node is not None:
+            minutes = max(1, int(parse_duration(interval_node.text.strip()).total_seconds() // 60))
+            interval = st.number_input("重复间隔（分钟）", min_value=1, value=minutes)
+        multiple_policy = st.selectbox(
+            "Multiple Instance Policy", policies,
+            index=policies.index(live.multiple_instances_policy) if live.multiple_instances_policy in policies else 0,
+        )
+        start_when_available = st.checkbox("Start When Available", value=live.start_when_available == "true")
+        retry_count = st.number_input("Retry Count", min_value=0, value=int(live.retry_count))
+        retry = parse_duration(live.retry_interval)
+        retry_interval = st.number_input("Retry Interval (minutes)", min_value=1,
+                                         value=max(1, int(retry.total_seconds() // 60)) if retry else 5)
+        use_launcher = st.checkbox("通过启动器运行（记录耗时与资源占用）", value=live.launcher)
+        log_path = st.text_input("输出日志文件（可选）", value=live.log_path)
+        enabled = st.checkbox("启用", value=task.enabled)
+        trigger_xml = st.text_area("触发器 XML（高级）", value=live.trigger_xml, height=150)
+        submit = st.form_submit_button("保存修改")
+
+    if not submit:
+        return
+    # 手动修改了触发器 XML 时以其为准，否则把开始时间/间隔写回原触发器
+    if trigger_xml == live.trigger_xml:
+        if start_node is not None:
+            trigger_xml = task_edit.set_trigger_start(trigger_xml, datetime.combine(start_date, start_time).replace(second=0))
+        if interval_node is not None:
+            trigger_xml = task_edit.set_trigger_interval(trigger_xml, interval)
+    desired = replace(
+        live,
+        python_path=python_path,
+        script_path=script_path,
+        args=args,
+        workdir=workdir,
+        multiple_instances_policy=multiple_policy,
+        start_when_available=str(start_when_available).lower(),
+        # 分钟数未改时保留原写法（如 PT1H）
+        retry_interval=(live.retry_interval if retry and retry_interval == retry.total_seconds() // 60
+                        else f"PT{int(retry_interval)}M"),
+        retry_count=int(retry_count),
+        trigger_xml=trigger_xml,
+        launcher=use_launcher,
+        log_path=log_path.strip(),
+    )
+    try:
+        plan = task_edit.plan_edit(short_name, st.session_state[xml_key], task.enabled, desired, enabled)
+    except ET.ParseError as exc:  # 手工编辑的触发器 XML 可能无法解析
+        st.error(f"❌ 触发器 XML 无效: {exc}")
+        return
+    if plan.op == "none":
+        st.info("没有需要保存的修改")
+        return
+    res = task_edit.apply_edit(plan)
+    if res.returncode == 0:
+        del st.session_state[xml_key]
+        refresh_card(short_name, f"✅ 已保存: {plan.describe()}")
     else:
-        tasks = parse_tasks_list(result.stdout)
-        if not tasks:
-            st.info("PyTasks 文件夹下暂无任务")
+        st.error(f"❌ 保存失败（{plan.describe()}）: {res.stderr}")
 
-    for idx, task in enumerate(tasks):
-        name = task.get("TaskName", "") or task.get("任务名", "")
-        short_name = name.split("\\")[-1] if name else f"task_{idx}"
-        
-        # 创建唯一的基础key，使用索引确保唯一性
-        base_key = f"{idx}_{short_name}" if short_name else f"task_{idx}"
-        
-        # 检查任务状态 - 支持中英文字段名
-        status = task.get('Status', '') or task.get('模式', '')
-        enabled = status != 'Disabled' and status != '已禁用'
-        
-        # 根据状态设置标题颜色
-        display_name = name if name else f"未知任务_{idx}"
-        if enabled:
-            title = f"✅ {display_name}"
+
+# 日志查看器最多保留的行数
+LOG_LINES = 1000
+
+
+def render_task_log(short_name):
+    """增量查看任务日志：每次只读取上次之后追加的内容"""
+    path_key = f"log_path_{short_name}"
+    if path_key not in st.session_state:
+        path = task_logs.configured_logs().get(short_name)
+        if not path:
+            res = sc.query_task_xml(short_name)
+            path = task_logs.log_path_for(short_name, res.stdout if res.returncode == 0 else None)
+        st.session_state[path_key] = path or ""
+    path = st.text_input("日志文件", value=st.session_state[path_key], key=f"log_input_{short_name}")
+    if path != st.session_state[path_key]:
+        # 手动指定的路径按任务保存，下次直接使用
+        task_logs.set_log_path(short_name, path)
+        st.session_state[path_key] = path
+    if not path:
+        st.caption("未配置日志文件：创建/编辑任务时填写输出日志文件，或在此指定脚本自己写的日志")
+        return
+
+    # 读取位置与已显示的行保存在会话中，刷新时只读新增的字节
+    tail_key = f"log_tail_{short_name}"
+    tail, lines = st.session_state.get(tail_key, (None, None))
+    if tail is None or str(tail.path) != path:
+        tail, lines = task_logs.LogTail(path), deque(maxlen=LOG_LINES)
+        st.session_state[tail_key] = (tail, lines)
+    try:
+        lines.extend(tail.read_new())
+    except OSError as exc:  # 被占用、无权限或是目录
+        st.warning(f"无法读取日志文件: {exc}")
+        return
+    if not Path(path).exists():
+        st.warning(f"日志文件不存在: {path}")
+        return
+    col1, col2 = st.columns(2)
+    col1.button("⟳ 读取新内容", key=f"log_more_{short_name}")
+    col2.caption(f"已读 {tail.bytes_read} 字节，跳过 {tail.skipped} 字节，轮转 {tail.rotations} 次")
+    st.code("\n".join(lines) or "（暂无内容）", language=None)
+
+    query = st.text_input("搜索（从文件末尾向前，最多扫描 16 MB）", key=f"log_search_{short_name}")
+    if query:
+        try:
+            result = task_logs.search(path, query)
+        except OSError as exc:
+            st.warning(f"无法搜索日志文件: {exc}")
+            return
+        st.caption(f"{len(result.matches)} 条匹配，扫描 {result.scanned} 字节"
+                   + ("" if result.complete else "（未扫描到文件开头）"))
+        st.code("\n".join(line for _, line in result.matches) or "（无匹配）", language=None)
+
+
+def render_debug_panel():
+    """调试信息：schtasks 调用耗时统计、每次刷新的开销和缓存统计"""
+    st.subheader("调试信息")
+
+    folder_result = sc.query_task_folder()
+    if folder_result.returncode == 0:
+        st.success("✅ PyTasks 文件夹存在且可访问")
+    elif "could not be queried" in folder_result.stderr:
+        st.warning(f"⚠️ 无法查询 PyTasks 文件夹: {folder_result.stderr.strip()}")
+    else:
+        st.info("ℹ️ PyTasks 文件夹不存在（正常情况，首次使用时会自动创建）")
+        if folder_result.stderr and folder_result.stderr.strip():
+            st.text(f"详细信息: {folder_result.stderr.strip()}")
+
+    scope = metrics.current_scope()
+    if scope is not None:
+        st.write(f"**本次刷新**: 到目前为止 {scope.calls} 次 schtasks 调用，共 {scope.seconds * 1e3:.0f} ms")
+    scopes = [s.as_dict() for s in list(metrics.metrics.scopes)[-10:]]
+    if scopes:
+        st.write("**最近几次刷新**:")
+        st.dataframe([{"开始": datetime.fromtimestamp(s["started"]).strftime("%H:%M:%S"),
+                       "调用次数": s["calls"], "schtasks 耗时 (ms)": round(s["subprocess_ms"], 1),
+                       "总耗时 (ms)": None if s["wall_ms"] is None else round(s["wall_ms"], 1)}
+                      for s in reversed(scopes)], use_container_width=True)
+
+    verbs = metrics.metrics.verb_table()
+    if verbs:
+        st.write("**按命令统计**（分位数为直方图桶上限）:")
+        st.dataframe([{k: round(v, 2) if isinstance(v, float) else v for k, v in row.items()} for row in verbs],
+                     use_container_width=True)
+    recent = list(metrics.metrics.recent)[-20:]
+    if recent:
+        st.write("**最近调用**:")
+        st.dataframe([{"命令": c.verb, "任务": c.task, "耗时 (ms)": round(c.duration * 1e3, 1),
+                       "返回码": c.returncode, "输出 (B)": c.output_bytes} for c in reversed(recent)],
+                     use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    col1.download_button("导出 Prometheus", metrics.to_prometheus(), file_name="pytasks.prom", mime="text/plain")
+    col2.download_button("导出 JSON", json.dumps(metrics.to_json(), indent=2), file_name="pytasks_metrics.json",
+                         mime="application/json")
+
+    # 任务列表缓存统计
+    st.write("**缓存统计**:")
+    st.json(sc.inventory_cache_stats())
+
+
+@st.cache_resource
+def get_poller():
+    """全进程共享一个后台刷新线程，所有浏览器会话读取同一份快照"""
+    poller = inventory_poller.InventoryPoller()
+    history = run_history.get_history()
+
+    def record_history(snapshot):
+        # 每份新快照顺便记录运行历史（只写入有变化的任务）
+        if snapshot.ok:
+            history.record(snapshot.records)
+
+    poller.subscribe(record_history)
+    return poller.start()
+
+
+def current_snapshot():
+    snapshot = get_poller().snapshot(timeout=60)
+    if snapshot is None:
+        st.warning("任务列表仍在加载，请稍后刷新")
+    return snapshot
+
+
+def refresh_after_change():
+    """修改任务后只重新查询受影响的任务，等新快照发布后再刷新界面"""
+    get_poller().refresh(wait=True)
+    st.rerun()
+
+
+def load_tasks_or_warn():
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return []
+    result, tasks = snapshot.result, list(snapshot.records)
+    if result.returncode != 0 and "找不到指定的文件" not in result.stderr and "cannot find" not in result.stderr.lower():
+        st.error(f"Failed to query tasks: {result.stderr}")
+    return tasks if result.returncode == 0 else []
+
+
+def render_schedule_load():
+    """所有任务在未来一段时间内每分钟的触发次数、高峰时刻和错峰建议"""
+    # numpy/pandas 只在打开此页面时加载
+    import pandas as pd
+    import schedule_load
+
+    days = st.slider("时间范围（天）", min_value=1, max_value=14, value=7)
+    xmls = schedule_load.fleet_xml(load_tasks_or_warn())
+    if not xmls:
+        st.info("PyTasks 文件夹下暂无任务")
+        return
+    profile = schedule_load.load_profile(xmls, horizon=timedelta(days=days))
+    st.metric("峰值（同一分钟触发的任务数）", profile.peak)
+
+    bucket = 1 if days == 1 else 15
+    index = pd.date_range(profile.start, periods=-(-profile.minutes // bucket), freq=f"{bucket}min")
+    st.caption(f"每 {bucket} 分钟内的最大每分钟触发数")
+    st.line_chart(pd.Series(profile.resample(bucket), index=index, name="firings"))
+
+    st.subheader("高峰时刻")
+    spots = schedule_load.hotspots(profile)
+    if spots:
+        st.dataframe([{"时间": format_time(t), "触发数": count, "任务": ", ".join(names)}
+                      for t, count, names in spots], use_container_width=True)
+    else:
+        st.write("没有多个任务在同一分钟触发")
+
+    st.subheader("错峰建议")
+    suggestions = schedule_load.suggest_offsets(profile, xmls)
+    if suggestions:
+        peak_after = suggestions[-1].peak_after
+        st.write(f"按以下偏移调整开始时间后，峰值可从 {profile.peak} 降到约 {peak_after}。"
+                 "新建任务时可勾选“错开开始时间”自动应用。")
+        st.dataframe([{"任务": s.name, "开始时间偏移（分钟）": int(s.offset.total_seconds() // 60)}
+                      for s in suggestions], use_container_width=True)
+    else:
+        st.write("当前分布已足够平坦")
+
+    st.subheader("并发模拟")
+    render_concurrency_simulation(xmls)
+
+
+def render_concurrency_simulation(xmls):
+    """按各任务的实例策略与失败重试设置，模拟一段时间内的并发进程、排队与 CPU 占用"""
+    import numpy as np
+    import pandas as pd
+    import concurrency_sim
+
+    with st.form("concurrency_sim"):
+        col1, col2 = st.columns(2)
+        days = col1.number_input("模拟天数", min_value=1, max_value=31, value=30)
+        slots = col2.number_input("CPU 槽位", min_value=1, value=os.cpu_count() or 1)
+        col1, col2 = st.columns(2)
+        seconds = col1.number_input("通常运行时长（秒）", min_value=1, value=60)
+        failure = col2.number_input("失败率（%）", min_value=0.0, max_value=100.0, value=0.0)
+        col1, col2 = st.columns(2)
+        slow_seconds = col1.number_input("偶尔变慢时的时长（秒）", min_value=1, value=300)
+        slow_share = col2.number_input("变慢的概率（%）", min_value=0.0, max_value=100.0, value=0.0)
+        use_journals = st.checkbox("有启动器运行记录的任务使用记录的时长与失败率", value=True)
+        submit = st.form_submit_button("运行模拟")
+    if not submit:
+        return
+
+    default = concurrency_sim.DurationModel(seconds, slow_seconds, slow_share / 100, failure / 100)
+    models = concurrency_sim.journal_models(xmls) if use_journals else {}
+    report = concurrency_sim.simulate_fleet(xmls, models, default, horizon=timedelta(days=int(days)),
+                                            slots=int(slots))
+    peak_at = format_time(report.time_at(report.concurrency.peak_at))
+    col1, col2, col3 = st.columns(3)
+    col1.metric("并发进程峰值", f"{report.concurrency.peak:.0f}", help=f"出现在 {peak_at}")
+    col2.metric("排队峰值", f"{report.queue.peak:.0f}")
+    col3.metric("CPU 槽位需求峰值", f"{report.cpu.peak:.1f}")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("被忽略的运行", report.total("dropped"))
+    col2.metric("被终止的运行", report.total("stopped"))
+    col3.metric("重试次数", report.total("retries"))
+    st.caption(f"共启动 {report.total('started')} 次（{len(models)} 个任务使用了运行记录）；"
+               f"CPU 需求超过 {report.slots} 个槽位的时间共 {report.cpu.seconds_above / 3600:.1f} 小时；"
+               f"重试用尽仍失败 {report.total('failed')} 次")
+
+    bucket = 1 if days == 1 else 15
+    index = pd.date_range(report.start, periods=-(-len(report.concurrency.per_minute) // bucket), freq=f"{bucket}min")
+
+    def resample(values):
+        size = len(index) * bucket
+        return np.pad(values, (0, size - len(values))).reshape(-1, bucket).max(axis=1)
+
+    st.line_chart(pd.DataFrame({"并发进程": resample(report.concurrency.per_minute),
+                                "排队": resample(report.queue.per_minute),
+                                "CPU 槽位": resample(report.cpu.per_minute)}, index=index))
+    affected = [(name, o) for name, o in report.tasks.items() if o.dropped or o.queued or o.stopped or o.failed]
+    if affected:
+        affected.sort(key=lambda item: -(item[1].dropped + item[1].queued + item[1].stopped))
+        st.dataframe([{"任务": name, "启动": o.started, "忽略": o.dropped, "排队": o.queued,
+                       "最长等待（分钟）": round(o.max_wait / 60, 1), "终止": o.stopped,
+                       "重试": o.retries, "最终失败": o.failed} for name, o in affected],
+                     use_container_width=True)
+
+
+FOLDER_ACTIONS = ["启用", "禁用", "运行"]
+
+
+def render_folder_tasks(folder, records):
+    """一个文件夹中的任务；操作使用完整路径，只刷新该文件夹"""
+    if not records:
+        st.caption("（此文件夹下没有任务）")
+        return
+    st.dataframe([{"任务": r.short_name, "状态": r.status, "下次运行": format_time(r.next_run),
+                   "上次结果": r.last_result} for r in records], use_container_width=True)
+    col1, col2, col3 = st.columns([3, 1, 1])
+    selected = col1.multiselect("选择任务", [r.short_name for r in records], key=f"folder_selected_{folder}")
+    action = col2.selectbox("操作", FOLDER_ACTIONS, key=f"folder_action_{folder}")
+    if col3.button("执行", key=f"folder_run_{folder}", disabled=not selected):
+        results = BULK_ACTIONS[action]([folder + name for name in selected])
+        failed = [name for name, res in zip(selected, results) if res is None or res.returncode != 0]
+        st.session_state.folder_message = (f"{action}: {len(selected) - len(failed)} 成功"
+                                           + (f"，失败: {', '.join(failed)}" if failed else ""))
+        if folder.lower() == sc.TASK_FOLDER.lower():
+            get_poller().refresh()
+        st.rerun()
+
+
+def render_folder_node(folder, depth=0):
+    """文件夹树的一个节点：勾选展开后才查询其任务和子文件夹"""
+    indent = "\u3000" * depth
+    if not st.checkbox(f"{indent}📁 {folders.folder_name(folder)}", key=f"folder_open_{folder}"):
+        return
+    res, records = sc.load_folder(folder)
+    if res.returncode != 0:
+        st.caption(f"无法读取 {folder}: {res.stderr.strip()}")
+    else:
+        render_folder_tasks(folder, records)
+    for child in folders.subfolders(folder):
+        render_folder_node(child, depth + 1)
+
+
+def render_folder_tree():
+    message = st.session_state.pop("folder_message", None)
+    if message:
+        st.info(message)
+    roots = folders.configured_roots()
+    if st.button("🔄 刷新展开的文件夹"):
+        for key in [k for k, v in st.session_state.items() if str(k).startswith("folder_open_") and v]:
+            sc.get_folder_cache(key[len("folder_open_"):]).invalidate()
+    # 已展开的文件夹并发查询，逐个渲染时直接命中缓存
+    expanded = [k[len("folder_open_"):] for k, v in st.session_state.items()
+                if str(k).startswith("folder_open_") and v]
+    if expanded:
+        sc.load_folders(expanded)
+    exists = sc.folder_cache.exists_many(roots)
+    for root in roots:
+        if exists[root]:
+            render_folder_node(root)
+        elif exists[root] is None:
+            st.warning(f"📁 {root}：无法查询该文件夹（超时或无权限），稍后刷新重试")
         else:
-            title = f"⚠️ {display_name} (已禁用)"
-            
-        with st.expander(title):
-            # 任务信息 - 每行显示两个字段
-            col1, col2 = st.columns(2)
-            
-            # 第一行：状态和计划状态
-            with col1:
-                st.write(f"**状态**: {status}")
-            with col2:
-                task_status = task.get('Scheduled Task State', '') or task.get('计划任务状态', 'N/A')
-                st.write(f"**计划状态**: {task_status}")
-            
-            # 第二行：上次运行和下次运行
-            col1, col2 = st.columns(2)
-            with col1:
-                last_run = task.get('Last Run Time', '') or task.get('上次运行时间', 'N/A')
-                st.write(f"**上次运行**: {last_run}")
-            with col2:
-                next_run = task.get('Next Run Time', '') or task.get('下次运行时间', 'N/A')
-                st.write(f"**下次运行**: {next_run}")
-            
-            # 第三行：上次结果和计划类型
-            col1, col2 = st.columns(2)
-            with col1:
-                last_result = task.get('Last Result', '') or task.get('上次结果', 'N/A')
-                st.write(f"**上次结果**: {last_result}")
-            with col2:
-                schedule_type = task.get('Schedule Type', '') or task.get('计划类型', 'N/A')
-                st.write(f"**计划类型**: {schedule_type}")
-            
-            # 第四行：开始时间和开始日期
-            col1, col2 = st.columns(2)
-            with col1:
-                start_time = task.get('Start Time', '') or task.get('开始时间', 'N/A')
-                st.write(f"**开始时间**: {start_time}")
-            with col2:
-                start_date = task.get('Start Date', '') or task.get('开始日期', 'N/A')
-                st.write(f"**开始日期**: {start_date}")
-            
-            # 第五行：重复间隔和执行命令
-            col1, col2 = st.columns(2)
-            with col1:
-                repeat_every = task.get('Repeat: Every', '') or task.get('重复: 每', 'N/A')
-                st.write(f"**重复间隔**: {repeat_every}")
-            with col2:
-                task_to_run = task.get('Task To Run', '') or task.get('要运行的任务', 'N/A')
-                st.write(f"**执行命令**: {task_to_run}")
-            
-            # 第六行：工作目录和运行用户
-            col1, col2 = st.columns(2)
-            with col1:
-                start_in = task.get('Start In', '') or task.get('起始于', 'N/A')
-                st.write(f"**工作目录**: {start_in}")
-            with col2:
-                run_as_user = task.get('Run As User', '') or task.get('作为用户运行', 'N/A')
-                st.write(f"**运行用户**: {run_as_user}")
-            
-            # 第七行：创建者
-            col1, col2 = st.columns(2)
-            with col1:
-                author = task.get('Author', '') or task.get('创建者', 'N/A')
-                st.write(f"**创建者**: {author}")
-            with col2:
-                st.write("")  # 空白占位
-            
-            # 操作按钮
-            col1, col2, col3 = st.columns(3)
-            
-            # Run 按钮 - 如果任务被禁用则显示提示
-            if enabled:
-                if col1.button("▶️ 运行", key=f"run_{base_key}"):
-                    res = sc.run_task(short_name)
-                    if res.returncode == 0:
-                        st.success("✅ 任务已启动")
-                    else:
-                        st.error(f"❌ 启动失败: {res.stderr}")
-            else:
-                if col1.button("▶️ 运行 (需先启用)", key=f"run_{base_key}", disabled=True):
-                    st.warning("⚠️ 无法运行已禁用的任务，请先启用该任务")
-            
-            # Enable/Disable 按钮
-            toggle_text = "⏸️ 禁用" if enabled else "▶️ 启用"
-            if col2.button(toggle_text, key=f"toggle_{base_key}"):
-                res = sc.change_enable(short_name, not enabled)
-                if res.returncode == 0:
-                    action = "禁用" if enabled else "启用"
-                    st.success(f"✅ 任务已{action}")
-                    st.rerun()  # 刷新界面以显示新状态
-                else:
-                    st.error(f"❌ 操作失败: {res.stderr}")
-            
-            # Delete 按钮
-            if col3.button("🗑️ 删除", key=f"del_{base_key}"):
-                res = sc.delete_task(short_name)
-                if res.returncode == 0:
-                    st.success("✅ 任务已删除")
-                    st.rerun()  # 刷新界面
-                else:
-                    st.error(f"❌ 删除失败: {res.stderr}")
+            st.caption(f"📁 {root}（不存在，在其中创建任务后会自动建立）")
+    st.caption("文件夹列表来自 PYTASKS_FOLDERS（以 ; 分隔）；子文件夹在可读取任务存储时自动发现。")
 
-elif menu == "Create Task":
-    st.header("Create Task")
 
+@st.fragment
+def render_create_form():
+    """创建表单是独立的 fragment：切换触发器类型、提交表单都只重跑表单本身"""
     if "trigger_type" not in st.session_state:
         st.session_state.trigger_type = "Every N minutes"
 
@@ -253,6 +735,7 @@ elif menu == "Create Task":
     )
 
     with st.form("create_task"):
+        folder = st.text_input("Folder", value=sc.TASK_FOLDER)
         name = st.text_input("Task Name")
         python_path = st.text_input("Python Path", value=sys.executable)
         script_path = st.text_input("Script Path")
@@ -291,11 +774,18 @@ elif menu == "Create Task":
         start_when_available = st.checkbox("Start When Available", value=True, key="start_when_available")
         retry_count = st.number_input("Retry Count", min_value=0, value=3, key="retry_count")
         retry_interval = st.number_input("Retry Interval (minutes)", min_value=1, value=5, key="retry_interval")
+        use_launcher = st.checkbox("通过启动器运行（记录耗时与资源占用）", value=False, key="use_launcher")
+        log_path = st.text_input("输出日志文件（可选，stdout/stderr 追加到此文件）", key="log_path",
+                                 placeholder=str(task_logs.default_log_path("task_name")))
+        stagger = st.checkbox("错开开始时间（避开已有任务的触发高峰）", value=False, key="stagger")
         submit = st.form_submit_button("Create")
 
     if submit:
+        # 默认文件夹下使用短名称，其他文件夹使用完整路径
+        folder = sc.folder_path(folder or sc.TASK_FOLDER)
+        name = name.strip() if folder.lower() == sc.TASK_FOLDER.lower() else folder + name.strip()
         # 检查任务名是否为空
-        if not name.strip():
+        if not name.strip() or name.endswith("\\"):
             st.error("❌ 任务名不能为空")
         # 检查任务是否已存在
         elif sc.task_exists(name.strip()):
@@ -305,37 +795,32 @@ elif menu == "Create Task":
             # 创建新任务
             trigger_type = st.session_state.trigger_type
             now = datetime.now().replace(second=0, microsecond=0)
-            cron_expr = None
             if trigger_type in ("Every N minutes", "Every N hours"):
                 unit = "hours" if trigger_type.endswith("hours") else "minutes"
                 trigger_xml = minutes_trigger(now, int(interval), unit)
-                if unit == "hours":
-                    cron_expr = f"0 */{int(interval)} * * *"
-                else:
-                    cron_expr = f"*/{int(interval)} * * * *"
             elif trigger_type == "Daily":
                 trigger_xml = daily_trigger(datetime.combine(now.date(), daily_time), int(day_interval))
-                cron_expr = f"{daily_time.minute} {daily_time.hour} */{int(day_interval)} * *"
             elif trigger_type == "Weekly":
                 trigger_xml = weekly_trigger(datetime.combine(now.date(), week_time), weekdays)
-                if weekdays:
-                    days = ','.join(day[:3].upper() for day in weekdays)
-                    cron_expr = f"{week_time.minute} {week_time.hour} * * {days}"
             elif trigger_type == "Monthly":
                 start = datetime.combine(now.date(), month_time)
                 if month_mode == "Specific Days":
                     days = [int(d.strip()) for d in month_days.split(',') if d.strip().isdigit()]
                     trigger_xml = monthly_days_trigger(start, days)
-                    if days:
-                        cron_expr = f"{month_time.minute} {month_time.hour} {','.join(str(d) for d in days)} * *"
                 elif month_mode == "Last Day":
                     trigger_xml = monthly_last_day_trigger(start)
-                    cron_expr = f"{month_time.minute} {month_time.hour} L * *"
                 else:
                     trigger_xml = monthly_nth_dow_trigger(start, week_no, week_day)
-                    cron_expr = f"{month_time.minute} {month_time.hour} * * {week_day}#{week_no}"
             else:
                 trigger_xml = ""
+
+            if stagger and trigger_xml:
+                import schedule_load
+                profile = schedule_load.load_profile(schedule_load.fleet_xml(load_tasks_or_warn()), now)
+                offset = schedule_load.suggest_offset(trigger_xml, profile)
+                if offset:
+                    trigger_xml = shift_trigger(trigger_xml, offset)
+                    st.info(f"开始时间已错开 {int(offset.total_seconds() // 60)} 分钟")
             
             config = TaskConfig(
                 name=name,
@@ -348,32 +833,103 @@ elif menu == "Create Task":
                 retry_interval=f"PT{int(retry_interval)}M",
                 retry_count=int(retry_count),
                 trigger_xml=trigger_xml,
+                launcher=use_launcher,
+                log_path=log_path.strip(),
             )
             xml_content = build_xml(config)
+            res = sc.create_task_from_xml(xml_content, name, False)
             
-            # Windows `schtasks` requires the XML file to be UTF-16 encoded
-            with tempfile.NamedTemporaryFile("w", encoding="utf-16", delete=False, suffix=".xml") as f:
-                f.write(xml_content)
-                temp_path = Path(f.name)
-            
-            res = sc.create_task(temp_path, name, False)
-            
-            # 清理临时文件
-            try:
-                temp_path.unlink()
-            except:
-                pass
-                
             if res.returncode == 0:
                 st.success(f"任务 '{name}' 创建成功！")
-                st.info("请点击上方的 '刷新任务列表' 按钮查看新创建的任务。")
+                # 只查询新建的这一个任务并加入共享快照，任务列表无需重新查询
+                result, record = sc.refresh_task(name)
+                if result.returncode == 0:
+                    get_poller().patch(name, record)
+                else:
+                    # 查询失败时交给后台刷新重试
+                    get_poller().refresh()
                 
                 # 预览功能 - 只在成功时显示
                 st.subheader("Next Runs Preview")
-                if cron_expr:
-                    for t in preview_next_runs(cron_expr):
-                        st.write(t)
+                runs = next_runs(trigger_xml) if trigger_xml else []
+                if runs:
+                    for t in runs:
+                        st.write(t.isoformat(sep=' '))
                 else:
                     st.write("Preview not available for this trigger")
             else:
                 st.error(f"任务创建失败: {res.stderr}")
+
+
+menu = st.sidebar.selectbox("Menu", ["Tasks", "Folders", "Create Task", "Schedule Load"])
+
+if menu == "Tasks":
+    st.header("Scheduled Tasks")
+    
+    # 添加调试按钮
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔄 刷新任务列表"):
+            sc.inventory_cache.invalidate()
+            get_poller().refresh(full=True, wait=True)
+            st.rerun()
+    with col2:
+        if st.button("🔍 调试信息"):
+            render_debug_panel()
+
+    # 直接使用后台线程发布的最新快照，不在脚本线程里等待 schtasks
+    snapshot = current_snapshot()
+    if snapshot is None:
+        st.stop()
+    result, tasks = snapshot.result, list(snapshot.records)
+    if snapshot.cached:
+        st.caption(f"显示的是 {format_time(datetime.fromtimestamp(snapshot.taken_at))} 保存的任务列表，正在后台重新查询…")
+    else:
+        st.caption(f"任务列表更新于 {snapshot.age:.0f} 秒前（每 {get_poller().interval:.0f} 秒自动刷新）")
+    if result.returncode != 0:
+        if "找不到指定的文件" in result.stderr or "cannot find" in result.stderr.lower():
+            tasks = []
+            st.info("暂无任务或任务文件夹不存在")
+        else:
+            st.error(f"Failed to query tasks: {result.stderr}")
+            tasks = []
+    else:
+        if not tasks:
+            st.info("PyTasks 文件夹下暂无任务")
+
+    # 可选：直接读取任务存储目录中的 XML，只重新解析有变化的文件
+    version = snapshot.version
+    if st.sidebar.checkbox("直接读取任务存储（需管理员权限）", key="use_task_store"):
+        reader = task_store.get_reader()
+        try:
+            tasks = reader.load()
+            version = (version, reader.stats["parsed"], reader.stats["removed"])
+        except OSError as exc:
+            st.warning(f"无法读取任务存储 {reader.root}: {exc}")
+
+    if tasks or "bulk_results" in st.session_state:
+        render_bulk_actions(tasks)
+
+    summary = run_history.get_history().summary(HISTORY_DAYS)
+
+    if tasks:
+        page_tasks = render_task_filters(tasks, version)
+        for idx, task in page_tasks:
+            render_task_card(idx, task, summary.get(task.name))
+
+elif menu == "Folders":
+    st.header("Folders")
+    render_folder_tree()
+
+elif menu == "Create Task":
+    st.header("Create Task")
+
+    render_create_form()
+
+elif menu == "Schedule Load":
+    st.header("Schedule Load")
+    render_schedule_load()
+
+metrics.end_scope(st.session_state.metrics_scope)
+if os.environ.get("PYTASKS_METRICS_FILE"):
+    metrics.write_prometheus(os.environ["PYTASKS_METRICS_FILE"])
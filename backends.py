@@ -0,0 +1,78 @@
+import os
+import subprocess
+import threading
+from typing import List, Optional
+
+from executor import current_batch
+
+
+class Backend:
+    """Executes one ``schtasks`` argument list and returns its result.
+
+    ``scheduler_cli.run_command`` delegates every call to the active
+    backend, so alternative implementations (e.g. the in-memory
+    ``fake_scheduler.FakeScheduler``) see the exact command lines.
+    """
+
+    def run(self, args: List[str], timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        raise NotImplementedError
+
+
+class SubprocessBackend(Backend):
+    """Spawns the real ``schtasks`` executable for every call.
+
+    Inside an executor batch the process is killed when the batch is
+    cancelled. A timeout is reported as return code -1 with a message on
+    stderr.
+    """
+
+    def run(self, args: List[str], timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        batch = current_batch()
+        # 非 Windows 平台（基准测试中的假 schtasks）直接执行参数列表
+        proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                text=True, shell=os.name == 'nt')
+        if batch is not None:
+            batch.track(proc)
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            stdout, stderr = proc.communicate()
+            return subprocess.CompletedProcess(args, -1, stdout, f"{stderr}Timed out after {timeout}s")
+        finally:
+            if batch is not None:
+                batch.untrack(proc)
+        if batch is not None and batch.cancelled.is_set() and proc.returncode != 0:
+            stderr = f"{stderr}Cancelled"
+        return subprocess.CompletedProcess(args, proc.returncode, stdout, stderr)
+
+
+_backend: Optional[Backend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> Backend:
+    """Return the active backend; the first call picks the default.
+
+    The default spawns ``schtasks`` per call, or pipelines calls to one
+    persistent worker (:class:`command_server.ServerBackend`) when
+    ``PYTASKS_COMMAND_SERVER`` is set.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if os.environ.get('PYTASKS_COMMAND_SERVER', '').lower() in ('1', 'true', 'yes'):
+                    from command_server import ServerBackend
+                    _backend = ServerBackend()
+                else:
+                    _backend = SubprocessBackend()
+    return _backend
+
+
+def set_backend(backend: Backend) -> Backend:
+    """Install ``backend`` process-wide and return the previous one."""
+    global _backend
+    with _backend_lock:
+        old, _backend = _backend, backend
+    return old
@@ -0,0 +1,295 @@
+"""Back up task definitions into one archive and restore them.
+
+:func:`export_archive` fetches the XML of every task in the given folders
+concurrently, a chunk at a time, and streams each definition into a ZIP
+archive (``tasks/<folder>/<name>.xml``) as it arrives, so memory use does
+not grow with the number of tasks. ``manifest.json`` is written last and
+lists every task with its enabled state, the SHA-256 of the stored bytes
+and the canonical definition hash used by :mod:`reconcile`.
+
+:func:`restore_archive` validates the archive first, compares the canonical
+hashes with the live tasks (live XML is only fetched for tasks that exist)
+and recreates the changed or missing ones in parallel with ``/Create /F``.
+Usage::
+
+    python backup.py export tasks.zip [--folder \\PyTasks\\ --folder \\Ops\\]
+    python backup.py verify tasks.zip
+    python backup.py restore tasks.zip [--dry-run]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import scheduler_cli as sc
+from executor import get_executor
+from reconcile import xml_hash
+from task_records import TaskRecord
+
+
+MANIFEST_NAME = 'manifest.json'
+ARCHIVE_FORMAT = 1
+
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _chunk_size() -> int:
+    # 每批数量为并发数的数倍：既能让线程池保持忙碌，又只在内存中保留一批结果
+    return max(1, get_executor().max_workers * 4)
+
+
+def archive_path(task_name: str) -> str:
+    """Archive member for a task, e.g. ``tasks/PyTasks/team_a/backup.xml``."""
+    parts = [p for p in sc.task_path(task_name).split('\\') if p]
+    return 'tasks/' + '/'.join(parts) + '.xml'
+
+
+def _fetch(task_name: str) -> Tuple[subprocess.CompletedProcess, Optional[bytes], Optional[str]]:
+    res = sc.query_task_xml(task_name)
+    if res.returncode != 0:
+        return res, None, None
+    return res, res.stdout.encode('utf-8'), xml_hash(res.stdout)
+
+
+@dataclass
+class ExportReport:
+    path: Path
+    tasks: int = 0
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def export_archive(path: Union[str, Path], folders: Optional[Iterable[str]] = None) -> ExportReport:
+    """Write every task of ``folders`` (default ``\\PyTasks\\``) into a ZIP archive.
+
+    The archive is written to a temporary file and moved into place once the
+    manifest has been added, so an interrupted export never leaves a
+    truncated archive behind.
+    """
+    started = time.perf_counter()
+    path = Path(path)
+    report = ExportReport(path)
+    records = []
+    for folder, (result, folder_records) in sc.load_folders(folders or [sc.TASK_FOLDER], force=True).items():
+        if result.returncode != 0:
+            raise RuntimeError(f"Failed to query {folder}: {result.stderr.strip()}")
+        records.extend(folder_records)
+
+    entries = []
+    tmp = path.with_name(path.name + '.tmp')
+    try:
+        with zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            for chunk in _chunks(records, _chunk_size()):
+                for record, outcome in zip(chunk, get_executor().map(_fetch, [r.name for r in chunk])):
+                    if outcome is None or outcome[1] is None:
+                        report.failed.append((record.name, outcome[0].stderr.strip() if outcome else 'cancelled'))
+                        continue
+                    _, data, digest = outcome
+                    member = archive_path(record.name)
+                    zf.writestr(member, data)
+                    entries.append({'name': record.name, 'path': member, 'enabled': record.enabled,
+                                    'size': len(data), 'sha256': hashlib.sha256(data).hexdigest(),
+                                    'definition': digest})
+            manifest = {'format': ARCHIVE_FORMAT, 'created': time.time(), 'tasks': entries,
+                        'failed': [name for name, _ in report.failed]}
+            zf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=1))
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    report.tasks = len(entries)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def read_manifest(zf: zipfile.ZipFile) -> dict:
+    try:
+        manifest = json.loads(zf.read(MANIFEST_NAME))
+    except KeyError:
+        raise ValueError(f"{MANIFEST_NAME} missing; not a task archive") from None
+    if manifest.get('format') != ARCHIVE_FORMAT:
+        raise ValueError(f"Unsupported archive format {manifest.get('format')!r}")
+    return manifest
+
+
+def _check_entry(zf: zipfile.ZipFile, entry: dict) -> Optional[str]:
+    try:
+        data = zf.read(entry['path'])
+    except (KeyError, zipfile.BadZipFile) as exc:
+        return f"{entry['name']}: {exc}"
+    if hashlib.sha256(data).hexdigest() != entry['sha256']:
+        return f"{entry['name']}: content hash mismatch"
+    return None
+
+
+def verify_archive(path: Union[str, Path]) -> List[str]:
+    """Return the problems found in an archive (empty when it is intact)."""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            manifest = read_manifest(zf)
+            # ZipFile 读取是线程安全的，校验与解压一样并发执行
+            problems = get_executor().map(lambda entry: _check_entry(zf, entry), manifest['tasks'])
+    except (OSError, zipfile.BadZipFile, ValueError) as exc:
+        return [str(exc)]
+    return [p for p in problems if p]
+
+
+@dataclass
+class RestoreReport:
+    restored: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    state_changes: List[str] = field(default_factory=list)
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+    xml_queries: int = 0
+    seconds: float = 0.0
+
+
+def _live_state(names: List[str]) -> Tuple[Dict[str, TaskRecord], Dict[str, str]]:
+    """Live records and canonical hashes of the tasks among ``names`` that exist.
+
+    Both are keyed by the lower-case full path; only the hashes are kept, not
+    the fetched XML.
+    """
+    live: Dict[str, TaskRecord] = {}
+    for folder, (result, records) in sc.load_folders({sc.folder_of(n) for n in names}, force=True).items():
+        # 文件夹不存在时其中的任务都按缺失处理；其它失败（超时、无权限）不能当作缺失而覆盖全部任务
+        if result.returncode != 0 and not sc.is_not_found(result):
+            raise RuntimeError(f"Failed to query {folder}: {result.stderr.strip()}")
+        live.update({r.name.lower(): r for r in records})
+    present = [n for n in names if n.lower() in live]
+    hashes = {}
+    for chunk in _chunks(present, _chunk_size()):
+        for name, outcome in zip(chunk, get_executor().map(_fetch, chunk)):
+            if outcome is not None and outcome[2] is not None:
+                hashes[name.lower()] = outcome[2]
+    return live, hashes
+
+
+def restore_archive(path: Union[str, Path], names: Optional[Iterable[str]] = None,
+                    dry_run: bool = False) -> RestoreReport:
+    """Recreate the archived tasks whose live definition differs or is missing.
+
+    ``names`` limits the restore to some tasks (full paths or short names in
+    ``\\PyTasks\\``). Raises ``ValueError`` when the archive fails validation
+    and ``RuntimeError`` when a live folder cannot be queried.
+    """
+    started = time.perf_counter()
+    problems = verify_archive(path)
+    if problems:
+        raise ValueError('Archive failed validation: ' + '; '.join(problems[:10]))
+    report = RestoreReport()
+    with zipfile.ZipFile(path) as zf:
+        entries = read_manifest(zf)['tasks']
+        if names is not None:
+            wanted = {sc.task_path(n).lower() for n in names}
+            entries = [e for e in entries if e['name'].lower() in wanted]
+
+        live, hashes = _live_state([e['name'] for e in entries])
+        report.xml_queries = sum(1 for e in entries if e['name'].lower() in live)
+        changed = []
+        for entry in entries:
+            if hashes.get(entry['name'].lower()) == entry['definition']:
+                report.unchanged.append(entry['name'])
+            else:
+                changed.append(entry)
+
+        if dry_run:
+            report.restored = [e['name'] for e in changed]
+            report.seconds = time.perf_counter() - started
+            return report
+
+        workdir = Path(tempfile.mkdtemp(prefix='pytasks_restore_'))
+
+        def recreate(item):
+            index, entry = item
+            xml_path = workdir / f'{index}.xml'
+            # schtasks 要求 UTF-16 文件
+            xml_path.write_text(zf.read(entry['path']).decode('utf-8'), encoding='utf-16')
+            try:
+                return sc.create_task(xml_path, entry['name'], force_overwrite=True)
+            finally:
+                xml_path.unlink()
+
+        try:
+            results = get_executor().map(recreate, list(enumerate(changed)))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        for entry, res in zip(changed, results):
+            if res is not None and res.returncode == 0:
+                report.restored.append(entry['name'])
+            else:
+                report.failed.append((entry['name'], res.stderr.strip() if res else 'cancelled'))
+
+    # 启用状态不参与定义哈希，单独对齐；重建的任务按 XML 默认启用，需要时再禁用
+    restored = {name.lower() for name in report.restored}
+    for enable in (True, False):
+        targets = [e['name'] for e in entries if e['enabled'] == enable and (
+            (e['name'].lower() in restored and not enable)
+            or (e['name'] in report.unchanged and live[e['name'].lower()].enabled != enable))]
+        for name, res in zip(targets, sc.change_enable_batch(targets, enable)):
+            if res is not None and res.returncode == 0:
+                report.state_changes.append(name)
+            else:
+                report.failed.append((name, res.stderr.strip() if res else 'cancelled'))
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Back up and restore scheduled task definitions.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('export', help='write all tasks into a ZIP archive')
+    p.add_argument('archive')
+    p.add_argument('--folder', action='append', help='folder to export (repeatable, default \\PyTasks\\)')
+    p = sub.add_parser('verify', help='check the manifest and content hashes of an archive')
+    p.add_argument('archive')
+    p = sub.add_parser('restore', help='recreate tasks whose live definition differs')
+    p.add_argument('archive')
+    p.add_argument('names', nargs='*', help='restore only these tasks')
+    p.add_argument('--dry-run', action='store_true', help='only report what would be restored')
+    opts = parser.parse_args(argv)
+
+    if opts.command == 'export':
+        try:
+            report = export_archive(opts.archive, opts.folder)
+        except RuntimeError as exc:
+            print(exc, file=sys.stderr)
+            return 1
+        print(f"{report.tasks} tasks written to {report.path} in {report.seconds:.1f}s")
+        for name, error in report.failed:
+            print(f"FAILED {name}: {error}", file=sys.stderr)
+        return 1 if report.failed else 0
+    if opts.command == 'verify':
+        problems = verify_archive(opts.archive)
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        print('OK' if not problems else f'{len(problems)} problems')
+        return 1 if problems else 0
+
+    try:
+        report = restore_archive(opts.archive, opts.names or None, dry_run=opts.dry_run)
+    except (ValueError, RuntimeError) as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    verb = 'would restore' if opts.dry_run else 'restored'
+    print(f"{len(report.restored)} {verb}, {len(report.unchanged)} unchanged, "
+          f"{len(report.state_changes)} enabled/disabled ({report.xml_queries} XML queries, {report.seconds:.1f}s)")
+    for name, error in report.failed:
+        print(f"FAILED {name}: {error}", file=sys.stderr)
+    return 1 if report.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
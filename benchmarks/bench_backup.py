@@ -0,0 +1,49 @@
+"""Export and restore of a whole folder through ``backup.py``.
+
+Runs against the in-memory fake scheduler with ``--latency`` seconds per
+call. ``restore (empty)`` recreates every task after the folder was wiped;
+``restore (no-op)`` finds every live hash matching and creates nothing.
+"""
+import argparse
+import os
+import tempfile
+
+from common import print_table, timed
+
+import backup
+from backends import set_backend
+from executor import CommandExecutor, set_executor
+from fake_scheduler import FakeScheduler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per fake schtasks call')
+    parser.add_argument('--workers', default='1,16', help='comma separated concurrency limits')
+    opts = parser.parse_args()
+
+    archive = os.path.join(tempfile.mkdtemp(), 'tasks.zip')
+    rows = []
+    for workers in (int(w) for w in opts.workers.split(',')):
+        set_executor(CommandExecutor(max_workers=workers))
+        scheduler = FakeScheduler(latency=opts.latency).populate(opts.tasks)
+        set_backend(scheduler)
+
+        seconds, report = timed(backup.export_archive, archive)
+        assert report.tasks == opts.tasks and not report.failed
+        rows.append((workers, 'export', report.tasks, f'{seconds:.2f}', f'{os.path.getsize(archive) / 1024:.0f}'))
+
+        scheduler.tasks.clear()
+        seconds, report = timed(backup.restore_archive, archive)
+        assert len(report.restored) == opts.tasks and not report.failed
+        rows.append((workers, 'restore (empty)', len(report.restored), f'{seconds:.2f}', ''))
+
+        seconds, report = timed(backup.restore_archive, archive)
+        assert not report.restored and len(report.unchanged) == opts.tasks
+        rows.append((workers, 'restore (no-op)', len(report.restored), f'{seconds:.2f}', ''))
+    print_table(['workers', 'step', 'tasks written', 'wall s', 'archive KB'], rows)
+
+
+if __name__ == '__main__':
+    main()
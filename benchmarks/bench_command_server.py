@@ -0,0 +1,54 @@
+"""Compare spawn-per-call with the persistent command server.
+
+``spawn`` starts the fake schtasks script for every call, as the default
+backend does. ``server/exec`` pipelines the same commands to one worker that
+still spawns a process per command (only the shell layer and client-side
+start-up are saved). ``server/fake`` lets the worker answer in-process, the
+stand-in for a worker that talks to the Task Scheduler without spawning.
+"""
+import argparse
+import sys
+
+from common import fake_env, fake_schtasks_command, print_table, timed
+
+import scheduler_cli as sc
+from backends import SubprocessBackend, set_backend
+from command_server import WORKER_SCRIPT, ServerBackend
+from executor import CommandExecutor, set_executor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=200)
+    parser.add_argument('--workers', default='1,8', help='comma separated concurrency limits')
+    opts = parser.parse_args()
+
+    sc.SCHTASKS = fake_schtasks_command()
+    names = [f'task_{i:05d}' for i in range(opts.tasks)]
+    backends = [
+        ('spawn', SubprocessBackend),
+        ('server/exec', ServerBackend),
+        ('server/fake', lambda: ServerBackend([sys.executable, str(WORKER_SCRIPT), '--fake', str(opts.tasks)])),
+    ]
+    rows = []
+    with fake_env(FAKE_SCHTASKS_TASKS=opts.tasks, FAKE_SCHTASKS_SYSTEM=0):
+        for workers in (int(w) for w in opts.workers.split(',')):
+            set_executor(CommandExecutor(max_workers=workers))
+            baseline = None
+            for label, factory in backends:
+                backend = factory()
+                set_backend(backend)
+                # 预热：启动常驻进程不计入
+                sc.query_task(names[0])
+                seconds, results = timed(sc.query_task_batch, names)
+                ok = sum(1 for r in results if r is not None and r.returncode == 0)
+                baseline = baseline or seconds
+                rows.append((label, workers, opts.tasks, ok, f'{seconds:.2f}',
+                             f'{seconds / opts.tasks * 1e3:.2f}', f'{baseline / seconds:.1f}x'))
+                if isinstance(backend, ServerBackend):
+                    backend.close()
+    print_table(['backend', 'workers', 'calls', 'ok', 'wall s', 'ms/call', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
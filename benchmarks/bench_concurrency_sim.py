@@ -0,0 +1,65 @@
+"""Concurrency simulator: a month of a mixed fleet with every instance policy.
+
+One task in ten has a 1-minute trigger, the rest run every 5/15/60 minutes
+or daily. Runs usually take 40 s but take 5 minutes 10% of the time; failed
+runs are restarted up to 3 times, 1 minute apart. Without failures most
+policies take the vectorised paths; with them every non-Parallel task goes
+through the event loop.
+"""
+import argparse
+import itertools
+from datetime import datetime, timedelta
+
+from common import print_table, timed
+
+import concurrency_sim
+from xml_builder import TaskConfig, build_xml, daily_trigger, minutes_trigger
+
+
+START = datetime(2026, 3, 2)
+
+
+def fleet(count):
+    makers = [
+        lambda: minutes_trigger(START, 1, 'minutes'),
+        lambda: minutes_trigger(START, 5, 'minutes'),
+        lambda: minutes_trigger(START, 15, 'minutes'),
+        lambda: minutes_trigger(START, 15, 'minutes'),
+        lambda: minutes_trigger(START, 15, 'minutes'),
+        lambda: minutes_trigger(START, 1, 'hours'),
+        lambda: minutes_trigger(START, 1, 'hours'),
+        lambda: minutes_trigger(START, 1, 'hours'),
+        lambda: daily_trigger(START.replace(hour=2), 1),
+        lambda: daily_trigger(START.replace(hour=3), 1),
+    ]
+    policies = concurrency_sim.POLICIES
+    return {f'task_{i}': build_xml(TaskConfig(
+        name=f'task_{i}', python_path='python.exe', script_path=f'job_{i}.py',
+        multiple_instances_policy=policies[i // len(makers) % len(policies)],
+        retry_count=3, retry_interval='PT1M', trigger_xml=makers[i % len(makers)]()))
+        for i in range(count)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--counts', default='100,500')
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--failure-rates', default='0,0.05')
+    opts = parser.parse_args()
+
+    rows = []
+    for count, rate in itertools.product((int(c) for c in opts.counts.split(',')),
+                                         (float(r) for r in opts.failure_rates.split(','))):
+        model = concurrency_sim.DurationModel(seconds=40, slow_seconds=300, slow_share=0.1, failure_rate=rate)
+        xmls = fleet(count)
+        seconds, report = timed(concurrency_sim.simulate_fleet, xmls, default=model, start=START,
+                                horizon=timedelta(days=opts.days), slots=8)
+        rows.append((count, rate, report.total('launches'), f'{seconds:.2f}', f'{report.concurrency.peak:.0f}',
+                     f'{report.queue.peak:.0f}', report.total('dropped'), report.total('stopped'),
+                     report.total('retries'), f'{report.cpu.seconds_above / 3600:.1f}'))
+    print_table(['tasks', 'failure rate', 'launches', 'wall s', 'peak procs', 'peak queue', 'dropped', 'stopped',
+                 'retries', 'h over 8 slots'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Throughput of mass task creation: per-task path vs. the batch pipeline.
+
+The per-task path mirrors the Create Task form: ``build_xml``, a UTF-16
+temp file and one ``schtasks /Create`` at a time. The batch path uses
+``manifest.register_tasks`` on the shared executor. Both register into the
+in-memory fake scheduler with ``--latency`` seconds per call.
+"""
+import argparse
+from datetime import datetime
+
+from common import print_table, timed
+
+import scheduler_cli as sc
+from backends import set_backend
+from executor import CommandExecutor, set_executor
+from fake_scheduler import FakeScheduler
+from manifest import register_tasks
+from xml_builder import TaskConfig, build_xml, build_xml_batch, minutes_trigger
+
+
+def make_configs(count):
+    start = datetime(2030, 1, 1)
+    return [
+        TaskConfig(name=f'task_{i:05d}', python_path='C:\\Python\\python.exe',
+                   script_path=f'C:\\scripts\\job_{i}.py', trigger_xml=minutes_trigger(start, 5, 'minutes'))
+        for i in range(count)
+    ]
+
+
+def per_task(configs):
+    return [sc.create_task_from_xml(build_xml(c), c.name) for c in configs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--counts', default='100,1000')
+    parser.add_argument('--latency', type=float, default=0.01, help='seconds per fake schtasks call')
+    parser.add_argument('--workers', type=int, default=16)
+    opts = parser.parse_args()
+
+    set_executor(CommandExecutor(max_workers=opts.workers))
+    rows = []
+    for count in (int(c) for c in opts.counts.split(',')):
+        configs = make_configs(count)
+        render_s, _ = timed(lambda: list(build_xml_batch(configs)))
+        for label, func in (('per-task', per_task), ('batch', register_tasks)):
+            scheduler = FakeScheduler(latency=opts.latency)
+            set_backend(scheduler)
+            seconds, results = timed(func, configs)
+            assert all(r.returncode == 0 for r in results) and len(scheduler.tasks) == count
+            rows.append((count, label, f'{render_s * 1000:.1f}', f'{seconds:.2f}', f'{count / seconds:.0f}'))
+    print_table(['tasks', 'path', 'render only ms', 'total s', 'tasks/s'], rows)
+
+
+if __name__ == '__main__':
+    main()
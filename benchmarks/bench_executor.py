@@ -0,0 +1,32 @@
+"""Measure batch query walltime against a sleep-based fake schtasks."""
+import argparse
+
+from common import fake_env, fake_schtasks_command, print_table, timed
+
+import scheduler_cli as sc
+from executor import CommandExecutor, set_executor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=100)
+    parser.add_argument('--delay', type=float, default=0.1, help='seconds each fake schtasks call sleeps')
+    parser.add_argument('--workers', default='1,4,8,16', help='comma separated concurrency limits')
+    opts = parser.parse_args()
+
+    sc.SCHTASKS = fake_schtasks_command()
+    names = [f'task_{i:05d}' for i in range(opts.tasks)]
+    rows = []
+    baseline = None
+    with fake_env(FAKE_SCHTASKS_TASKS=opts.tasks, FAKE_SCHTASKS_DELAY=opts.delay):
+        for workers in (int(w) for w in opts.workers.split(',')):
+            set_executor(CommandExecutor(max_workers=workers))
+            seconds, results = timed(sc.query_task_batch, names)
+            ok = sum(1 for r in results if r is not None and r.returncode == 0)
+            baseline = baseline or seconds
+            rows.append((workers, opts.tasks, ok, f'{seconds:.2f}', f'{baseline / seconds:.1f}x'))
+    print_table(['workers', 'tasks', 'ok', 'wall s', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
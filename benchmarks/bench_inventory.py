@@ -0,0 +1,29 @@
+"""Compare the legacy per-task fan-out with the single scoped CSV query."""
+import argparse
+
+from common import fake_env, fake_schtasks_command, print_table, timed
+
+import scheduler_cli as sc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--counts', default='10,50,100,200', help='comma separated task counts')
+    parser.add_argument('--system', type=int, default=200, help='unrelated system tasks in the listing')
+    opts = parser.parse_args()
+
+    sc.SCHTASKS = fake_schtasks_command()
+    rows = []
+    for count in (int(c) for c in opts.counts.split(',')):
+        with fake_env(FAKE_SCHTASKS_TASKS=count, FAKE_SCHTASKS_SYSTEM=opts.system):
+            legacy_s, legacy = timed(sc.query_all_tasks)
+            bulk_s, bulk = timed(lambda: list(sc.iter_inventory(sc.query_inventory().stdout)))
+        legacy_tasks = legacy.stdout.count('TaskName:')
+        rows.append((count, legacy_tasks, len(bulk), count + 1, 1,
+                     f'{legacy_s:.3f}', f'{bulk_s:.3f}', f'{legacy_s / bulk_s:.1f}x'))
+    print_table(['tasks', 'legacy found', 'bulk found', 'legacy procs', 'bulk procs',
+                 'legacy s', 'bulk s', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Launcher journals: tail-seeking reads vs. parsing the whole file."""
+import argparse
+import json
+import tempfile
+from pathlib import Path
+
+from common import print_table, timed
+
+import launcher
+
+
+def read_all(path, count):
+    with open(path, 'rb') as f:
+        return [json.loads(line) for line in f][-count:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='1000,100000,1000000', help='records per journal')
+    parser.add_argument('--tail', type=int, default=200)
+    opts = parser.parse_args()
+
+    rows = []
+    for size in (int(s) for s in opts.sizes.split(',')):
+        path = Path(tempfile.mkdtemp(prefix='journal_')) / 'task.jsonl'
+        with open(path, 'w') as f:
+            for i in range(size):
+                f.write(json.dumps({'s': i, 'e': i + 1.5, 'rc': 0, 'rss': 1 << 25, 'cpu': 0.5},
+                                   separators=(',', ':')) + '\n')
+        tail_s, tail = timed(launcher.tail_records, path, opts.tail)
+        full_s, full = timed(read_all, path, opts.tail)
+        assert tail == full
+        rows.append((size, f'{path.stat().st_size / 1e6:.1f}', f'{tail_s * 1e3:.2f}', f'{full_s * 1e3:.1f}'))
+    print_table(['records', 'MB', 'tail ms', 'full read ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Task log viewer: incremental tail and bounded search vs. rereading the file."""
+import argparse
+import shutil
+import tempfile
+from pathlib import Path
+
+from common import print_table, timed
+
+import task_logs
+
+
+def read_all(path, count):
+    with open(path, 'rb') as f:
+        return f.read().decode('utf-8', errors='replace').splitlines()[-count:]
+
+
+def grep_all(path, text):
+    with open(path, 'rb') as f:
+        return [line for line in f if text.encode() in line]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10,100,1000', help='log sizes in MB')
+    parser.add_argument('--append', type=int, default=100, help='lines appended between refreshes')
+    opts = parser.parse_args()
+
+    line = 'INFO worker processed batch id=00000000 rows=1024 elapsed=0.035s\n'
+    rows = []
+    for mb in (int(s) for s in opts.sizes.split(',')):
+        tmpdir = Path(tempfile.mkdtemp(prefix='log_tail_'))
+        path = tmpdir / 'task.log'
+        block = line * (1024 * 1024 // len(line))
+        with open(path, 'w') as f:
+            for _ in range(mb):
+                f.write(block)
+        tail = task_logs.LogTail(path)
+        first_s, _ = timed(tail.read_new)
+        with open(path, 'a') as f:
+            f.write(line * opts.append)
+        before = tail.bytes_read
+        new_s, new = timed(tail.read_new)
+        assert len(new) == opts.append
+        search_s, result = timed(task_logs.search, path, 'ROWS=1024', max_matches=50)
+        full_s, _ = timed(read_all, path, opts.append)
+        grep_s, _ = timed(grep_all, path, 'rows=1024')
+        rows.append((mb, f'{first_s * 1e3:.2f}', f'{new_s * 1e3:.3f}', tail.bytes_read - before,
+                     f'{search_s * 1e3:.2f}', f'{full_s * 1e3:.0f}', f'{grep_s * 1e3:.0f}'))
+        shutil.rmtree(tmpdir)
+    print_table(['MB', 'first read ms', 'refresh ms', 'refresh bytes', 'search ms',
+                 'full read ms', 'full grep ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Next-run preview: native trigger evaluation vs. croniter on equivalent cron strings."""
+import argparse
+from datetime import datetime
+
+from common import print_table, timed
+
+import preview
+from xml_builder import daily_trigger, minutes_trigger, monthly_days_trigger, monthly_nth_dow_trigger, weekly_trigger
+
+
+START = datetime(2025, 1, 6, 9, 30)
+
+CASES = [
+    ('every 5 min', minutes_trigger(START, 5, 'minutes'), '*/5 * * * *'),
+    ('daily', daily_trigger(START, 1), '30 9 * * *'),
+    ('weekly mon,fri', weekly_trigger(START, ['Monday', 'Friday']), '30 9 * * MON,FRI'),
+    ('monthly 1,15', monthly_days_trigger(START, [1, 15]), '30 9 1,15 * *'),
+    ('2nd tuesday', monthly_nth_dow_trigger(START, 'Second', 'Tuesday'), '30 9 * * TUE#2'),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=100, help='firings to compute per preview')
+    parser.add_argument('--repeat', type=int, default=200)
+    opts = parser.parse_args()
+
+    from croniter import croniter
+
+    def cron_runs(expr):
+        itr = croniter(expr, START)
+        return [itr.get_next(datetime) for _ in range(opts.runs)]
+
+    rows = []
+    for label, xml, expr in CASES:
+        after = datetime(2026, 3, 1)
+        native, _ = timed(lambda: [preview.next_runs(xml, opts.runs, after) for _ in range(opts.repeat)])
+        cron, _ = timed(lambda: [cron_runs(expr) for _ in range(opts.repeat)])
+        rows.append((label, f'{native * 1e3 / opts.repeat:.3f}', f'{cron * 1e3 / opts.repeat:.3f}',
+                     f'{cron / native:.1f}x'))
+    print_table(['trigger', 'native ms', 'croniter ms', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
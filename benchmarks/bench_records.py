@@ -0,0 +1,50 @@
+"""Micro-benchmark of the TaskRecord parser: time and retained memory per task."""
+import argparse
+import csv
+import io
+import tracemalloc
+
+from common import print_table, timed
+
+from fake_scheduler import FakeScheduler
+from task_records import iter_csv_records, iter_list_records
+
+
+def query_text(scheduler, fmt):
+    return scheduler.run(['schtasks', '/Query', '/TN', '\\PyTasks\\', '/V', '/FO', fmt]).stdout
+
+
+def retained_bytes(func, text):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = func(text)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--counts', default='100,1000,10000,50000')
+    opts = parser.parse_args()
+
+    parsers = [
+        ('csv dict', lambda text: list(csv.DictReader(io.StringIO(text)))),
+        ('csv record', lambda text: list(iter_csv_records(text))),
+        ('list record', lambda text: list(iter_list_records(text))),
+    ]
+    rows = []
+    for count in (int(c) for c in opts.counts.split(',')):
+        scheduler = FakeScheduler().populate(count)
+        texts = {'csv': query_text(scheduler, 'CSV'), 'list': query_text(scheduler, 'LIST')}
+        for label, func in parsers:
+            text = texts[label.split()[0]]
+            seconds, records = timed(func, text)
+            assert len(records) == count
+            size, _ = retained_bytes(func, text)
+            rows.append((count, label, f'{seconds * 1e6 / count:.1f}', f'{size / count:.0f}'))
+    print_table(['tasks', 'parser', 'us/task', 'bytes/task'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Run history: snapshot recording cost and summary query latency on months of data."""
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from common import print_table, timed
+
+from run_history import RunHistory
+from task_records import TaskRecord
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=300)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--every', type=int, default=60, help='minutes between runs and snapshots')
+    opts = parser.parse_args()
+
+    path = Path(tempfile.mkdtemp(prefix='history_')) / 'history.sqlite3'
+    history = RunHistory(path)
+    records = [TaskRecord(name=f'\\PyTasks\\task_{i}') for i in range(opts.tasks)]
+    start = datetime(2026, 1, 1)
+    step = timedelta(minutes=opts.every)
+    snapshots = opts.days * 24 * 60 // opts.every
+
+    began = time.perf_counter()
+    for n in range(snapshots):
+        now = start + n * step
+        for i, record in enumerate(records):
+            # 每 50 次运行失败一次，每 97 次错过一次
+            if (n + i) % 97:
+                record.last_run = now
+                record.last_result = 1 if (n + i) % 50 == 0 else 0
+            record.next_run = now + step
+        history.record(records, now + timedelta(minutes=5))
+    fill = time.perf_counter() - began
+
+    end = start + snapshots * step
+    unchanged, _ = timed(history.record, records, end)
+    summary_s, summary = timed(history.summary, 30, end)
+    runs_s, _ = timed(history.runs, records[0].name, 50)
+    stats = summary[records[0].name]
+    print_table(['metric', 'value'], [
+        ('runs stored', history.stats['runs']),
+        ('missed stored', history.stats['missed']),
+        ('db size MB', f'{path.stat().st_size / 1e6:.1f}'),
+        ('record ms/snapshot', f'{fill * 1e3 / snapshots:.2f}'),
+        ('record unchanged ms', f'{unchanged * 1e3:.2f}'),
+        ('summary(30d) ms', f'{summary_s * 1e3:.2f}'),
+        ('runs(task) ms', f'{runs_s * 1e3:.2f}'),
+        ('task_0 success rate', f'{stats.success_rate:.1%}'),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Fleet load histogram: build time and peak reduction from suggested offsets."""
+import argparse
+from datetime import datetime, timedelta
+
+from common import print_table, timed
+
+import schedule_load
+from xml_builder import daily_trigger, minutes_trigger, shift_trigger, weekly_trigger
+
+
+START = datetime(2026, 3, 2)
+
+
+def fleet(count):
+    # 模拟“同一时刻创建”的任务：开始时间全部相同
+    makers = [
+        lambda: minutes_trigger(START, 5, 'minutes'),
+        lambda: minutes_trigger(START, 15, 'minutes'),
+        lambda: minutes_trigger(START, 1, 'hours'),
+        lambda: daily_trigger(START.replace(hour=2), 1),
+        lambda: weekly_trigger(START.replace(hour=3), ['Monday', 'Thursday']),
+    ]
+    return {f'task_{i}': makers[i % len(makers)]() for i in range(count)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--counts', default='100,1000,5000')
+    parser.add_argument('--days', type=int, default=7)
+    opts = parser.parse_args()
+
+    horizon = timedelta(days=opts.days)
+    rows = []
+    for count in (int(c) for c in opts.counts.split(',')):
+        xmls = fleet(count)
+        build, profile = timed(schedule_load.load_profile, xmls, START, horizon)
+        suggest, suggestions = timed(schedule_load.suggest_offsets, profile, xmls)
+        offsets = {s.name: s.offset for s in suggestions}
+        shifted = {name: shift_trigger(xml, offsets.get(name, timedelta())) for name, xml in xmls.items()}
+        after = schedule_load.load_profile(shifted, START, horizon)
+        rows.append((count, f'{build * 1e3:.0f}', f'{suggest * 1e3:.0f}', profile.peak, after.peak))
+    print_table(['tasks', 'histogram ms', 'suggest ms', 'peak', 'peak after'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Time to first paint: how long a new process waits before it has tasks to show.
+
+Each scenario starts a fresh interpreter that imports the modules the Tasks
+page needs and waits for the first inventory snapshot, with the stand-in
+``schtasks`` sleeping ``--delay`` seconds per call. ``warm`` starts with the
+on-disk snapshot from a previous run; ``cold`` has none.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from common import ROOT_DIR, fake_env, fake_schtasks_command, print_table
+
+CHILD = r'''
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import scheduler_cli as sc
+import inventory_poller, run_history, launcher, metrics, task_index, preview, xml_builder
+imported = time.perf_counter()
+sc.SCHTASKS = sys.argv[2]
+poller = inventory_poller.InventoryPoller(snapshot_path=sys.argv[3]).start()
+snapshot = poller.snapshot()
+first = time.perf_counter()
+fresh = snapshot if not snapshot.cached else poller.refresh(wait=True, timeout=120)
+done = time.perf_counter()
+poller.stop()
+print(json.dumps({
+    'import_ms': (imported - started) * 1e3,
+    'first_ms': (first - started) * 1e3,
+    'fresh_ms': (done - started) * 1e3,
+    'cached': snapshot.cached,
+    'tasks': len(snapshot.records),
+    'heavy': [m for m in ('jinja2', 'croniter', 'numpy', 'pandas') if m in sys.modules],
+}))
+'''
+
+
+def run_child(command, snapshot_path):
+    out = subprocess.run([sys.executable, '-c', CHILD, str(ROOT_DIR), command, str(snapshot_path)],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=500)
+    parser.add_argument('--delay', type=float, default=2.0, help='seconds per schtasks call')
+    opts = parser.parse_args()
+
+    command = fake_schtasks_command()
+    snapshot_path = Path(tempfile.mkdtemp(prefix='startup_')) / 'inventory.pickle'
+    rows = []
+    with fake_env(FAKE_SCHTASKS_TASKS=opts.tasks, FAKE_SCHTASKS_DELAY=opts.delay):
+        for label in ('cold', 'warm'):
+            if label == 'cold' and snapshot_path.exists():
+                os.remove(snapshot_path)
+            r = run_child(command, snapshot_path)
+            rows.append((label, r['tasks'], f"{r['import_ms']:.0f}", f"{r['first_ms']:.0f}",
+                         f"{r['fresh_ms']:.0f}", ','.join(r['heavy']) or '-'))
+    size = snapshot_path.stat().st_size / 1024 if snapshot_path.exists() else 0
+    print_table(['start', 'tasks', 'import ms', 'first paint ms', 'fresh data ms', 'heavy modules'], rows)
+    print(f'snapshot file: {size:.0f} KB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""End-to-end scaling benchmarks on the in-memory fake scheduler.
+
+Measures, per task count, the bulk inventory load (backend + parse), the
+legacy per-task fan-out and XML generation with ``xml_builder``. Use
+``--latency`` to add a fixed cost per emulated ``schtasks`` call, which
+approximates process start-up on Windows.
+"""
+import argparse
+from datetime import datetime
+
+from common import print_table, timed
+
+import scheduler_cli as sc
+from backends import set_backend
+from fake_scheduler import FakeScheduler
+from task_records import iter_csv_records, iter_list_records
+
+
+def bench_inventory(count, latency, legacy_max):
+    scheduler = FakeScheduler(latency=latency, system_tasks=200).populate(count)
+    old = set_backend(scheduler)
+    try:
+        query_s, result = timed(sc.query_inventory)
+        parse_s, records = timed(lambda: list(iter_csv_records(result.stdout)))
+        load_s, (_, cached) = timed(sc.load_inventory, True)
+        assert len(records) == len(cached) == count
+        legacy_s = None
+        if count <= legacy_max:
+            legacy_s, _ = timed(lambda: list(iter_list_records(sc.query_all_tasks().stdout)))
+    finally:
+        set_backend(old)
+    return query_s, parse_s, load_s, legacy_s
+
+
+def bench_xml(count):
+    try:
+        from xml_builder import TaskConfig, build_xml, minutes_trigger
+    except ImportError as exc:
+        return f'skipped ({exc.name} not installed)'
+    start = datetime(2030, 1, 1)
+    configs = [
+        TaskConfig(name=f'task_{i:05d}', python_path='C:\\Python\\python.exe',
+                   script_path=f'C:\\scripts\\job_{i}.py', trigger_xml=minutes_trigger(start, 5, 'minutes'))
+        for i in range(count)
+    ]
+    seconds, _ = timed(lambda: [build_xml(c) for c in configs])
+    return f'{seconds * 1000:.1f}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--counts', default='10,100,1000,10000')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every fake schtasks call')
+    parser.add_argument('--legacy-max', type=int, default=1000, help='skip the legacy fan-out above this count')
+    opts = parser.parse_args()
+
+    rows = []
+    for count in (int(c) for c in opts.counts.split(',')):
+        query_s, parse_s, load_s, legacy_s = bench_inventory(count, opts.latency, opts.legacy_max)
+        rows.append((
+            count,
+            f'{query_s * 1000:.1f}',
+            f'{parse_s * 1000:.1f}',
+            f'{load_s * 1000:.1f}',
+            '-' if legacy_s is None else f'{legacy_s * 1000:.1f}',
+            bench_xml(count),
+        ))
+    print_table(['tasks', 'query ms', 'parse ms', 'load ms', 'legacy ms', 'xml build ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
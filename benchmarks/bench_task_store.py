@@ -0,0 +1,55 @@
+"""Cold scan vs. incremental rescan of a task-store fixture directory.
+
+Writes ``--tasks`` UTF-16 task files (like ``%SystemRoot%\\System32\\Tasks``)
+into a temporary directory, then measures a cold scan, a rescan with no
+changes and a rescan after touching ``--changed`` files.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from common import print_table, timed
+
+from fake_scheduler import sample_xml
+from task_store import TaskStoreReader
+
+
+def write_fixture(root, count):
+    folder = Path(root) / 'PyTasks'
+    folder.mkdir(parents=True)
+    for i in range(count):
+        (folder / f'task_{i:05d}').write_text(sample_xml(i), encoding='utf-16')
+    return folder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', default='100,1000,10000')
+    parser.add_argument('--changed', type=int, default=10)
+    opts = parser.parse_args()
+
+    rows = []
+    for count in (int(c) for c in opts.tasks.split(',')):
+        root = tempfile.mkdtemp(prefix='task_store_')
+        try:
+            folder = write_fixture(root, count)
+            reader = TaskStoreReader(root)
+            cold_s, records = timed(reader.scan)
+            assert len(records) == count
+            warm_s, _ = timed(reader.scan)
+            for i in range(min(opts.changed, count)):
+                path = folder / f'task_{i:05d}'
+                path.write_text(sample_xml(i + 1), encoding='utf-16')
+                os.utime(path, ns=(0, path.stat().st_mtime_ns + 1_000_000))
+            changed_s, _ = timed(reader.scan)
+            rows.append((count, f'{cold_s * 1000:.1f}', f'{warm_s * 1000:.1f}', f'{changed_s * 1000:.1f}',
+                         reader.stats['parsed']))
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    print_table(['tasks', 'cold ms', 'unchanged ms', f'{opts.changed} changed ms', 'files parsed'], rows)
+
+
+if __name__ == '__main__':
+    main()
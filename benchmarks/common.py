@@ -0,0 +1,62 @@
+"""Shared helpers for the benchmark scripts.
+
+Run benchmarks from the repository root, e.g.::
+
+    python benchmarks/bench_inventory.py
+"""
+import os
+import stat
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+
+def fake_schtasks_command() -> str:
+    """Write an executable wrapper around ``fake_schtasks.py`` and return its path."""
+    script = BENCH_DIR / 'fake_schtasks.py'
+    tmpdir = Path(tempfile.mkdtemp(prefix='fake_schtasks_'))
+    if os.name == 'nt':
+        wrapper = tmpdir / 'schtasks.bat'
+        wrapper.write_text(f'@"{sys.executable}" "{script}" %*\n')
+    else:
+        wrapper = tmpdir / 'schtasks'
+        wrapper.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n')
+        wrapper.chmod(wrapper.stat().st_mode | stat.S_IXUSR)
+    return str(wrapper)
+
+
+@contextmanager
+def fake_env(**values):
+    """Temporarily set ``FAKE_SCHTASKS_*`` environment variables."""
+    old = {key: os.environ.get(key) for key in values}
+    os.environ.update({key: str(value) for key, value in values.items()})
+    try:
+        yield
+    finally:
+        for key, value in old.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def timed(func, *args, **kwargs):
+    """Return ``(seconds, result)`` for one call of ``func``."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print('  '.join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print('  '.join(str(v).rjust(w) for v, w in zip(row, widths)))
@@ -0,0 +1,33 @@
+"""Command-line stand-in for ``schtasks.exe`` used by the benchmarks.
+
+It wraps ``fake_scheduler.FakeScheduler`` so the subprocess path of
+``scheduler_cli`` can be measured. Every invocation starts from a fresh
+inventory, so mutations succeed but are not persisted. The inventory is
+controlled through environment variables:
+
+- ``FAKE_SCHTASKS_TASKS``: number of tasks under ``\\PyTasks\\`` (default 10)
+- ``FAKE_SCHTASKS_SYSTEM``: number of unrelated system tasks (default 200)
+- ``FAKE_SCHTASKS_DELAY``: seconds to sleep per invocation (default 0)
+"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fake_scheduler import FakeScheduler  # noqa: E402
+
+
+def main(argv):
+    scheduler = FakeScheduler(
+        latency=float(os.environ.get('FAKE_SCHTASKS_DELAY', '0')),
+        system_tasks=int(os.environ.get('FAKE_SCHTASKS_SYSTEM', '200')),
+    ).populate(int(os.environ.get('FAKE_SCHTASKS_TASKS', '10')))
+    result = scheduler.run(['schtasks'] + argv)
+    sys.stdout.write(result.stdout)
+    sys.stderr.write(result.stderr)
+    return result.returncode
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,307 @@
+"""Long-lived worker process that runs scheduler commands sent over a pipe.
+
+:class:`ServerBackend` starts one worker (this module run as a script) and
+pipelines commands to it instead of spawning ``cmd.exe`` + ``schtasks`` for
+every call. Messages are newline-framed JSON objects; ``ensure_ascii``
+keeps any newline inside the output escaped, so a line is always exactly
+one message::
+
+    -> {"id": 7, "args": ["schtasks", "/Run", "/TN", "\\\\PyTasks\\\\job"], "timeout": 30}
+    <- {"id": 7, "started": true}
+    <- {"id": 7, "rc": 0, "stdout": "SUCCESS: ...", "stderr": ""}
+    -> {"id": 8, "cancel": 7}
+
+Responses carry the request id and may arrive out of order, because the
+worker runs up to ``--workers`` commands at once; requests beyond that wait
+in the worker's queue. The worker executes the command line directly (no
+shell), reports when it starts a command and enforces the timeout itself.
+The client counts the timeout from that start, so time spent queued does
+not count, and gives up after the timeout plus a grace period. A cancelled
+request that has not started yet is never run. If the worker
+dies, pending calls fail with return code -1 and the next call starts a new
+worker.
+
+``--fake N`` answers from an in-process :class:`fake_scheduler.FakeScheduler`
+with ``N`` tasks instead of running anything, which stands in for a worker
+that talks to the Task Scheduler directly (e.g. over COM) and lets the
+protocol be tested on Linux.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from backends import Backend
+from executor import current_batch
+
+
+WORKER_SCRIPT = Path(__file__).resolve()
+
+# 客户端在命令超时之后再等待的时间，超过则认为工作进程无响应
+TIMEOUT_GRACE = 5.0
+
+
+# ---- 工作进程 ----
+
+class _Worker:
+    def __init__(self, workers: int, fake: Optional[int], latency: float):
+        self._out_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='command')
+        self._running: Dict[int, subprocess.Popen] = {}
+        # 已提交但未结束的请求，以及其中在开始前就被取消的请求
+        self._queued: Set[int] = set()
+        self._cancelled: Set[int] = set()
+        self._lock = threading.Lock()
+        self._fake = None
+        if fake is not None:
+            from fake_scheduler import FakeScheduler
+            self._fake = FakeScheduler(latency=latency).populate(fake)
+
+    def serve(self, stdin, stdout) -> None:
+        self._stdout = stdout
+        for line in stdin:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                continue
+            if 'cancel' in request:
+                self._cancel(request['cancel'])
+            else:
+                with self._lock:
+                    self._queued.add(request['id'])
+                self._pool.submit(self._handle, request)
+        # 标准输入关闭表示客户端已退出
+        self._pool.shutdown(wait=True)
+
+    def _send(self, message: dict) -> None:
+        data = json.dumps(message, ensure_ascii=True) + '\n'
+        with self._out_lock:
+            self._stdout.write(data)
+            self._stdout.flush()
+
+    def _handle(self, request: dict) -> None:
+        rid, args, timeout = request['id'], request['args'], request.get('timeout')
+        with self._lock:
+            cancelled = rid in self._cancelled
+        if cancelled:
+            # 客户端已放弃该请求（取消或超时）：不再执行，避免在调用方得知失败之后才修改任务
+            self._finish(rid)
+            self._send({'id': rid, 'rc': -1, 'stdout': '', 'stderr': 'Cancelled'})
+            return
+        self._send({'id': rid, 'started': True})
+        try:
+            if self._fake is not None:
+                result = self._fake.run(args, timeout)
+                rc, stdout, stderr = result.returncode, result.stdout, result.stderr
+            else:
+                rc, stdout, stderr = self._execute(rid, args, timeout)
+        except Exception as exc:
+            rc, stdout, stderr = -1, '', f'{type(exc).__name__}: {exc}'
+        self._finish(rid)
+        self._send({'id': rid, 'rc': rc, 'stdout': stdout, 'stderr': stderr})
+
+    def _finish(self, rid: int) -> None:
+        with self._lock:
+            self._queued.discard(rid)
+            self._cancelled.discard(rid)
+
+    def _execute(self, rid: int, args: List[str], timeout: Optional[float]) -> Tuple[int, str, str]:
+        proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        with self._lock:
+            self._running[rid] = proc
+            cancelled = rid in self._cancelled
+        if cancelled:
+            # 取消请求在开始执行与登记进程之间到达
+            proc.kill()
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            stdout, stderr = proc.communicate()
+            return -1, stdout, f"{stderr}Timed out after {timeout}s"
+        finally:
+            with self._lock:
+                self._running.pop(rid, None)
+        return proc.returncode, stdout, stderr
+
+    def _cancel(self, rid: int) -> None:
+        with self._lock:
+            # 已结束的请求不记录，集合不会无限增长
+            if rid in self._queued:
+                self._cancelled.add(rid)
+            proc = self._running.get(rid)
+        if proc is not None:
+            try:
+                proc.kill()
+            except OSError:
+                pass
+
+
+# ---- 客户端 ----
+
+class _Connection:
+    """One running worker process and the calls waiting on it."""
+
+    def __init__(self, command: List[str]):
+        self.proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     text=True, encoding='ascii', bufsize=1)
+        self.pending: Dict[int, list] = {}
+        self.lock = threading.Lock()
+        self.alive = True
+        self._reader = threading.Thread(target=self._read, name='command-server-reader', daemon=True)
+        self._reader.start()
+
+    def send(self, message: dict) -> None:
+        data = json.dumps(message, ensure_ascii=True) + '\n'
+        with self.lock:
+            self.proc.stdin.write(data)
+            self.proc.stdin.flush()
+
+    def _read(self) -> None:
+        for line in self.proc.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            with self.lock:
+                if message.get('started'):
+                    waiter = self.pending.get(message.get('id'))
+                    if waiter is not None:
+                        waiter[2].set()
+                    continue
+                waiter = self.pending.pop(message.get('id'), None)
+            if waiter is not None:
+                waiter[1] = message
+                waiter[0].set()
+        # 工作进程退出：让所有等待中的调用失败
+        with self.lock:
+            self.alive = False
+            waiters, self.pending = list(self.pending.values()), {}
+        for waiter in waiters:
+            waiter[0].set()
+
+    def close(self) -> None:
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout=TIMEOUT_GRACE)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+    def kill(self) -> None:
+        try:
+            self.proc.kill()
+        except OSError:
+            pass
+
+
+class ServerBackend(Backend):
+    """Runs commands through one persistent worker process.
+
+    ``command`` overrides the worker command line (by default this module
+    run with the current interpreter). The worker is started on first use
+    and restarted after it exits; ``stats`` counts calls, restarts and
+    client-side timeouts.
+    """
+
+    def __init__(self, command: Optional[List[str]] = None, workers: int = 8):
+        self.command = command or [sys.executable, str(WORKER_SCRIPT), '--workers', str(workers)]
+        self._conn: Optional[_Connection] = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.stats = {'calls': 0, 'starts': 0, 'timeouts': 0, 'failures': 0}
+
+    def _connection(self) -> Tuple[_Connection, int]:
+        with self._lock:
+            if self._conn is None or not self._conn.alive or self._conn.proc.poll() is not None:
+                if self._conn is not None:
+                    self._conn.kill()
+                self._conn = _Connection(self.command)
+                self.stats['starts'] += 1
+            self._next_id += 1
+            self.stats['calls'] += 1
+            return self._conn, self._next_id
+
+    def run(self, args: List[str], timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        # [完成事件, 响应, 开始执行事件]
+        waiter = [threading.Event(), None, threading.Event()]
+        for _ in range(2):
+            conn, rid = self._connection()
+            with conn.lock:
+                # 读线程清理等待队列之后登记的调用不会再被唤醒
+                registered = conn.alive
+                if registered:
+                    conn.pending[rid] = waiter
+            try:
+                if not registered:
+                    raise OSError('command server exited')
+                conn.send({'id': rid, 'args': list(args), 'timeout': timeout})
+                break
+            except (OSError, ValueError):
+                # 请求未送达（进程已退出），换新进程重试一次
+                with conn.lock:
+                    conn.pending.pop(rid, None)
+                conn.kill()
+        else:
+            self.stats['failures'] += 1
+            return subprocess.CompletedProcess(args, -1, '', 'Command server is not available')
+
+        batch = current_batch()
+        deadline = None if timeout is None else timeout + TIMEOUT_GRACE
+        waited = 0.0
+        # 分段等待以便及时响应批次取消；超时从工作进程开始执行时计起，排队时间不计
+        while not waiter[0].wait(0.1):
+            if waiter[2].is_set():
+                waited += 0.1
+            if batch is not None and batch.cancelled.is_set():
+                self._cancel(conn, rid)
+                return subprocess.CompletedProcess(args, -1, '', 'Cancelled')
+            if deadline is not None and waited >= deadline:
+                self.stats['timeouts'] += 1
+                self._cancel(conn, rid)
+                return subprocess.CompletedProcess(args, -1, '', f"Timed out after {timeout}s")
+        message = waiter[1]
+        if message is None:
+            self.stats['failures'] += 1
+            return subprocess.CompletedProcess(args, -1, '', 'Command server exited')
+        return subprocess.CompletedProcess(args, message['rc'], message['stdout'], message['stderr'])
+
+    def _cancel(self, conn: _Connection, rid: int) -> None:
+        with conn.lock:
+            conn.pending.pop(rid, None)
+        try:
+            conn.send({'cancel': rid})
+        except (OSError, ValueError):
+            pass
+
+    def close(self) -> None:
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Command server worker; reads JSON requests on stdin.')
+    parser.add_argument('--workers', type=int, default=8, help='commands run concurrently')
+    parser.add_argument('--fake', type=int, metavar='N', help='answer from a FakeScheduler with N tasks')
+    parser.add_argument('--latency', type=float, default=0.0, help='per-call latency of the fake')
+    opts = parser.parse_args(argv)
+    if os.name == 'nt':
+        sys.stdin.reconfigure(encoding='ascii')
+        sys.stdout.reconfigure(encoding='ascii', newline='\n')
+    _Worker(opts.workers, opts.fake, opts.latency).serve(sys.stdin, sys.stdout)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,365 @@
+"""Discrete-event simulation of instance policies and restarts.
+
+Every task's triggers are expanded over the horizon with
+:func:`schedule_load.task_minutes`; each firing launches an instance whose
+duration, outcome and CPU share are drawn from a :class:`DurationModel`
+(given by the user or built from the launcher journal). The task's
+``MultipleInstancesPolicy`` decides what a launch does while an instance is
+still running:
+
+* ``Parallel``     – start another instance;
+* ``IgnoreNew``    – drop the launch;
+* ``Queue``        – start it when the running instance ends;
+* ``StopExisting`` – stop the running instance and start the new one.
+
+A failed run is restarted ``retry_count`` times, ``retry_interval`` after it
+ended; restarts go through the same policy. A stopped instance is not
+restarted.
+
+The policies only look at instances of the same task, so each task is
+simulated on its own: its firings are merged with a heap of pending
+restarts in time order. The instance intervals of all tasks are then swept
+once (:class:`Timeline`, sorted with numpy) for the fleet-wide concurrent processes, queue
+depth and CPU-slot demand.
+"""
+import heapq
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from preview import parse_duration
+from schedule_load import DEFAULT_HORIZON, MINUTE, task_minutes
+from xml_builder import config_from_xml
+
+
+POLICIES = ('Parallel', 'Queue', 'IgnoreNew', 'StopExisting')
+INF = float('inf')
+
+
+@dataclass
+class DurationModel:
+    """How long runs take, how often they fail and how much CPU they use.
+
+    ``samples`` of ``(seconds, failed, cpu)`` (e.g. from the launcher
+    journal) are drawn from uniformly; without samples a run takes
+    ``seconds``, or ``slow_seconds`` with probability ``slow_share``.
+    """
+    seconds: float = 60.0
+    slow_seconds: float = 0.0
+    slow_share: float = 0.0
+    failure_rate: float = 0.0
+    cpu: float = 1.0  # 运行期间占用的 CPU 槽位（CPU 秒 / 运行秒）
+    samples: Tuple[Tuple[float, bool, float], ...] = ()
+
+    def draw(self, rng: np.random.Generator, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """``n`` runs as arrays of durations, failure flags and CPU shares."""
+        if self.samples:
+            picked = np.asarray(self.samples, dtype=np.float64)[rng.integers(len(self.samples), size=n)]
+            return picked[:, 0], picked[:, 1] > 0, picked[:, 2]
+        durations = np.full(n, float(self.seconds))
+        if self.slow_share:
+            durations[rng.random(n) < self.slow_share] = self.slow_seconds
+        failed = rng.random(n) < self.failure_rate if self.failure_rate else np.zeros(n, dtype=bool)
+        return durations, failed, np.full(n, float(self.cpu))
+
+    @property
+    def may_fail(self) -> bool:
+        return any(s[1] for s in self.samples) if self.samples else self.failure_rate > 0
+
+    @classmethod
+    def from_journal(cls, records: Iterable[dict]) -> Optional['DurationModel']:
+        """Model drawing from recorded runs (``launcher`` journal records); ``None`` if empty."""
+        samples = []
+        for r in records:
+            if 's' not in r or 'e' not in r:
+                continue
+            seconds = max(r['e'] - r['s'], 0.0)
+            cpu = min(r['cpu'] / seconds, os.cpu_count() or 1) if r.get('cpu') is not None and seconds else 1.0
+            samples.append((seconds, bool(r.get('rc')), cpu))
+        return cls(samples=tuple(samples)) if samples else None
+
+
+@dataclass
+class TaskSpec:
+    name: str
+    firings: np.ndarray  # 相对模拟起点的分钟偏移，已排序
+    policy: str = 'IgnoreNew'
+    retry_count: int = 0
+    retry_interval: float = 300.0  # 秒
+    model: DurationModel = field(default_factory=DurationModel)
+
+
+def task_spec(name: str, xml: str, start: datetime, minutes: int, model: DurationModel) -> TaskSpec:
+    """Firings and instance settings of one task from its XML."""
+    config, _ = config_from_xml(xml, name)
+    retry = parse_duration(config.retry_interval)
+    policy = config.multiple_instances_policy if config.multiple_instances_policy in POLICIES else 'IgnoreNew'
+    return TaskSpec(name, task_minutes(xml, start, minutes), policy, config.retry_count,
+                    retry.total_seconds() if retry else 300.0, model)
+
+
+@dataclass
+class TaskOutcome:
+    launches: int = 0
+    started: int = 0
+    dropped: int = 0
+    queued: int = 0
+    stopped: int = 0
+    retries: int = 0
+    failed: int = 0  # 重试用尽后仍失败
+    max_wait: float = 0.0  # 排队的最长等待（秒）
+
+
+@dataclass
+class Instances:
+    """Instance intervals of all tasks, one array per task and field."""
+    starts: List[np.ndarray] = field(default_factory=list)
+    ends: List[np.ndarray] = field(default_factory=list)
+    cpu: List[np.ndarray] = field(default_factory=list)
+    queued: List[np.ndarray] = field(default_factory=list)  # 每行 (进入队列, 开始)
+
+    def add(self, starts, ends, cpu, queued=None) -> None:
+        self.starts.append(np.asarray(starts, dtype=np.float64))
+        self.ends.append(np.asarray(ends, dtype=np.float64))
+        self.cpu.append(np.asarray(cpu, dtype=np.float64))
+        if queued is not None and len(queued):
+            self.queued.append(np.asarray(queued, dtype=np.float64).reshape(-1, 2))
+
+    @staticmethod
+    def _join(arrays: List[np.ndarray], shape=(0,)) -> np.ndarray:
+        return np.concatenate(arrays) if arrays else np.empty(shape)
+
+
+def _parallel(spec: TaskSpec, fires: np.ndarray, rng: np.random.Generator, out: Instances,
+              outcome: TaskOutcome, retries: int) -> None:
+    """``Parallel``: launches never interact, so each restart generation is one array."""
+    launches = fires
+    for attempt in range(retries + 1):
+        durations, failed, cpu = spec.model.draw(rng, launches.size)
+        ends = launches + durations
+        out.add(launches, ends, cpu)
+        outcome.launches += launches.size
+        if attempt:
+            outcome.retries += launches.size
+        launches = ends[failed] + spec.retry_interval
+        if not launches.size:
+            break
+    outcome.started = outcome.launches
+    # 最后一代中失败的次数（提前结束时为 0）
+    outcome.failed = launches.size
+
+
+def _without_retries(spec: TaskSpec, fires: np.ndarray, rng: np.random.Generator, out: Instances,
+                     outcome: TaskOutcome) -> bool:
+    """Closed forms of ``Queue`` and ``StopExisting`` when nothing is restarted."""
+    if spec.policy not in ('Queue', 'StopExisting'):
+        return False
+    durations, failed, cpu = spec.model.draw(rng, fires.size)
+    if spec.policy == 'StopExisting':
+        ends = fires + durations
+        cut = ends[:-1] > fires[1:]
+        ends[:-1][cut] = fires[1:][cut]
+        out.add(fires, ends, cpu)
+        outcome.stopped = int(cut.sum())
+        outcome.failed = int((failed[:-1] & ~cut).sum() + failed[-1])
+    elif spec.policy == 'Queue':
+        # end_k = max(fire_k, end_{k-1}) + d_k = D_k + max_{j<=k}(fire_j - D_{j-1})，D 为时长前缀和
+        total = np.cumsum(durations)
+        ends = total + np.maximum.accumulate(fires - (total - durations))
+        starts = ends - durations
+        waiting = starts > fires
+        out.add(starts, ends, cpu, np.column_stack([fires[waiting], starts[waiting]]))
+        outcome.queued = int(waiting.sum())
+        outcome.max_wait = float((starts - fires).max())
+        outcome.failed = int(failed.sum())
+    outcome.launches = outcome.started = fires.size
+    return True
+
+
+def simulate_task(spec: TaskSpec, rng: np.random.Generator, out: Instances) -> TaskOutcome:
+    """Run one task's launches through its policy; instance intervals go to ``out``."""
+    outcome = TaskOutcome()
+    fires = spec.firings * 60.0
+    if not fires.size:
+        return outcome
+    retries = spec.retry_count if spec.model.may_fail else 0
+    if spec.policy == 'Parallel':
+        _parallel(spec, fires, rng, out, outcome, retries)
+        return outcome
+    if not retries and _without_retries(spec, fires, rng, out, outcome):
+        return outcome
+
+    # 其余情况逐个事件模拟：触发时间已排序，与待执行重试的堆按时间归并
+    # 每次启动消耗一次抽样；先按触发次数抽取，重试用尽时再补
+    chunk = fires.size
+    durations, failed, cpu = (a.tolist() for a in spec.model.draw(rng, chunk))
+    fires = fires.tolist()
+    policy = spec.policy
+    starts, ends, cpus, queued = [], [], [], []
+    pending: List[Tuple[float, int, int]] = []  # (时间, 第几次重试, 失败的实例)
+    fires.append(INF)  # 哨兵，省去每次的下标检查
+    next_retry = INF
+    stopped = set()
+    final_failures = []
+    busy_until = -INF
+    last = -1
+    i = draw = 0
+    while True:
+        t = fires[i]
+        if next_retry < t:
+            t, attempt, source = heapq.heappop(pending)
+            next_retry = pending[0][0] if pending else INF
+            if source in stopped:
+                continue
+            outcome.retries += 1
+        elif t == INF:
+            break
+        else:
+            attempt = 0
+            i += 1
+        start = t
+        if t < busy_until:
+            if policy == 'IgnoreNew':
+                outcome.dropped += 1
+                continue
+            if policy == 'StopExisting':
+                ends[last] = t
+                stopped.add(last)
+                outcome.stopped += 1
+            else:  # Queue
+                start = busy_until
+                queued.append((t, start))
+                if start - t > outcome.max_wait:
+                    outcome.max_wait = start - t
+        if draw == len(durations):
+            more = spec.model.draw(rng, max(chunk // 8, 64))
+            for values, extra in zip((durations, failed, cpu), more):
+                values.extend(extra.tolist())
+        end = start + durations[draw]
+        last = len(starts)
+        starts.append(start)
+        ends.append(end)
+        cpus.append(cpu[draw])
+        busy_until = end
+        if failed[draw]:
+            if attempt < retries:
+                heapq.heappush(pending, (end + spec.retry_interval, attempt + 1, last))
+                next_retry = pending[0][0]
+            else:
+                final_failures.append(last)
+        draw += 1
+    out.add(starts, ends, cpus, queued)
+    outcome.launches = draw + outcome.dropped
+    outcome.started = draw
+    outcome.queued = len(queued)
+    outcome.failed = sum(1 for f in final_failures if f not in stopped)
+    return outcome
+
+
+@dataclass
+class Sweep:
+    peak: float
+    peak_at: float  # 秒
+    mean: float
+    per_minute: np.ndarray  # 每分钟内的最大值
+    seconds_above: float = 0.0
+
+
+class Timeline:
+    """Overlapping ``[start, end)`` intervals clipped to ``[0, horizon)``, sorted once.
+
+    :meth:`sweep` then gives the level over time for any per-interval weight
+    (1 for process counts, the CPU share for slot demand).
+    """
+
+    def __init__(self, starts: Sequence[float], ends: Sequence[float], horizon: float):
+        self.horizon = horizon
+        self.minutes = int(-(-horizon // 60))
+        starts = np.clip(np.asarray(starts, dtype=np.float64), 0, horizon)
+        ends = np.clip(np.asarray(ends, dtype=np.float64), 0, horizon)
+        self.keep = ends > starts
+        self.count = int(self.keep.sum())
+        # 结束事件排在前面并使用稳定排序：同一时刻先结束再开始，首尾相接的实例不算重叠
+        times = np.concatenate([ends[self.keep], starts[self.keep]])
+        self.order = np.argsort(times, kind='stable')
+        self.times = times[self.order]
+        self.spans = np.diff(self.times, append=horizon)
+        self.bins = np.minimum((self.times // 60).astype(np.int64), self.minutes - 1)
+        # 每分钟开始时沿用此前最后一个事件之后的水平
+        self.carried = np.searchsorted(self.times, np.arange(self.minutes) * 60.0, side='right') - 1
+
+    def sweep(self, weights: Optional[Sequence[float]] = None, threshold: Optional[float] = None) -> Sweep:
+        if not self.count:
+            return Sweep(0.0, 0.0, 0.0, np.zeros(self.minutes))
+        w = np.ones(self.count) if weights is None else np.asarray(weights, dtype=np.float64)[self.keep]
+        levels = np.cumsum(np.concatenate([-w, w])[self.order])
+        best = int(np.argmax(levels))
+        per_minute = np.where(self.carried >= 0, levels[np.maximum(self.carried, 0)], 0.0)
+        np.maximum.at(per_minute, self.bins, levels)
+        above = float(self.spans[levels > threshold + 1e-9].sum()) if threshold is not None else 0.0
+        return Sweep(float(levels[best]), float(self.times[best]),
+                     float((levels * self.spans).sum() / self.horizon), per_minute, above)
+
+
+@dataclass
+class SimulationReport:
+    start: datetime
+    horizon: timedelta
+    slots: int
+    concurrency: Sweep
+    queue: Sweep
+    cpu: Sweep
+    tasks: Dict[str, TaskOutcome]
+
+    def time_at(self, seconds: float) -> datetime:
+        return self.start + timedelta(seconds=seconds)
+
+    def total(self, name: str) -> int:
+        return sum(getattr(o, name) for o in self.tasks.values())
+
+
+def simulate(specs: Iterable[TaskSpec], start: datetime, horizon: timedelta = DEFAULT_HORIZON,
+             slots: Optional[int] = None, seed: int = 0) -> SimulationReport:
+    """Simulate every task and sweep the fleet-wide timelines."""
+    rng = np.random.default_rng(seed)
+    slots = slots or os.cpu_count() or 1
+    instances = Instances()
+    outcomes = {spec.name: simulate_task(spec, rng, instances) for spec in specs}
+    seconds = horizon.total_seconds()
+    starts, ends = Instances._join(instances.starts), Instances._join(instances.ends)
+    queued = Instances._join(instances.queued, (0, 2))
+    timeline = Timeline(starts, ends, seconds)
+    return SimulationReport(
+        start, horizon, slots,
+        timeline.sweep(),
+        Timeline(queued[:, 0], queued[:, 1], seconds).sweep(),
+        timeline.sweep(Instances._join(instances.cpu), threshold=slots),
+        outcomes,
+    )
+
+
+def simulate_fleet(task_xmls: Dict[str, str], models: Optional[Dict[str, DurationModel]] = None,
+                   default: Optional[DurationModel] = None, start: Optional[datetime] = None,
+                   horizon: timedelta = DEFAULT_HORIZON, slots: Optional[int] = None,
+                   seed: int = 0) -> SimulationReport:
+    """Simulate a fleet given as task XML; ``models`` override ``default`` per task."""
+    start = (start or datetime.now()).replace(second=0, microsecond=0)
+    minutes = int(horizon // MINUTE)
+    models, default = models or {}, default or DurationModel()
+    specs = [task_spec(name, xml, start, minutes, models.get(name, default)) for name, xml in task_xmls.items()]
+    return simulate(specs, start, horizon, slots, seed)
+
+
+def journal_models(names: Iterable[str], count: int = 200) -> Dict[str, DurationModel]:
+    """Models from the newest ``count`` recorded runs of tasks that use the launcher."""
+    from launcher import journal_path, tail_records
+
+    models = {}
+    for name in names:
+        model = DurationModel.from_journal(tail_records(journal_path(name), count))
+        if model is not None:
+            models[name] = model
+    return models
@@ -0,0 +1,127 @@
+import contextvars
+import subprocess
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, Set
+
+
+_local = threading.local()
+
+
+class Batch:
+    """Handle for one fan-out started by :meth:`CommandExecutor.start`.
+
+    Results are returned in input order. :meth:`cancel` skips items that
+    have not started yet and kills the processes of items that are running.
+    """
+
+    def __init__(self, futures: List[Future], timeout: Optional[float]):
+        self.futures = futures
+        self.timeout = timeout
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._processes: Set[subprocess.Popen] = set()
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+        for future in self.futures:
+            future.cancel()
+        with self._lock:
+            processes = list(self._processes)
+        for proc in processes:
+            try:
+                proc.kill()
+            except OSError:
+                pass
+
+    def done(self) -> bool:
+        return all(future.done() for future in self.futures)
+
+    def results(self, timeout: Optional[float] = None) -> List[Any]:
+        """Wait for every item; cancelled items yield ``None``."""
+        out = []
+        for future in self.futures:
+            try:
+                out.append(future.result(timeout=timeout))
+            except CancelledError:
+                # 其它线程可能在任意时刻调用 cancel()，不能先检查再取结果
+                out.append(None)
+        return out
+
+    def track(self, proc: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.add(proc)
+        if self.cancelled.is_set():
+            proc.kill()
+
+    def untrack(self, proc: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.discard(proc)
+
+
+class CommandExecutor:
+    """Bounded thread pool used for batch schtasks operations.
+
+    ``schtasks`` work is spent waiting on child processes, so threads give
+    real parallelism here; ``max_workers`` caps how many processes run at
+    once. ``timeout`` is applied to every command started inside a batch.
+    """
+
+    def __init__(self, max_workers: int = 8, timeout: Optional[float] = None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='schtasks')
+
+    def start(self, func: Callable[..., Any], items: Iterable[Any]) -> Batch:
+        """Submit ``func(item)`` for every item and return without waiting."""
+        futures: List[Future] = []
+        batch = Batch(futures, self.timeout)
+        for item in items:
+            # 每个任务复制一份调用方的上下文，使 metrics 的作用域延续到工作线程
+            context = contextvars.copy_context()
+            futures.append(self._pool.submit(context.run, _run_in_batch, batch, func, item))
+        return batch
+
+    def map(self, func: Callable[..., Any], items: Iterable[Any]) -> List[Any]:
+        """Run ``func`` over ``items`` concurrently; results keep input order."""
+        return self.start(func, items).results()
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+def _run_in_batch(batch: Batch, func: Callable[..., Any], item: Any) -> Any:
+    if batch.cancelled.is_set():
+        return None
+    _local.batch = batch
+    try:
+        return func(item)
+    finally:
+        _local.batch = None
+
+
+def current_batch() -> Optional[Batch]:
+    """Return the batch the calling worker thread is executing, if any."""
+    return getattr(_local, 'batch', None)
+
+
+_executor: Optional[CommandExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> CommandExecutor:
+    """Return the process-wide executor, creating a default one on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = CommandExecutor()
+        return _executor
+
+
+def set_executor(executor: CommandExecutor) -> None:
+    """Replace the process-wide executor (e.g. to change the concurrency limit)."""
+    global _executor
+    with _executor_lock:
+        old, _executor = _executor, executor
+    if old is not None and old is not executor:
+        old.shutdown(wait=False)
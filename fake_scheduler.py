@@ -0,0 +1,512 @@
+"""In-memory stand-in for ``schtasks.exe``.
+
+``FakeScheduler`` is a :class:`backends.Backend` that interprets the same
+argument lists ``scheduler_cli`` builds and answers with output in the
+formats the real tool prints, so the whole list/create/parse path can be
+exercised and benchmarked without Windows::
+
+    from backends import set_backend
+    from fake_scheduler import FakeScheduler
+
+    set_backend(FakeScheduler(latency=0.05).populate(1000))
+"""
+import csv
+import io
+import re
+import subprocess
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from backends import Backend
+from executor import current_batch
+from preview import parse_duration
+from task_records import TASK_NS, parse_task_xml
+
+
+VERBOSE_FIELDS = {
+    'en': [
+        'HostName', 'TaskName', 'Next Run Time', 'Status', 'Logon Mode',
+        'Last Run Time', 'Last Result', 'Author', 'Task To Run', 'Start In',
+        'Comment', 'Scheduled Task State', 'Idle Time', 'Power Management',
+        'Run As User', 'Delete Task If Not Rescheduled',
+        'Stop Task If Runs X Hours and X Mins', 'Schedule', 'Schedule Type',
+        'Start Time', 'Start Date', 'End Date', 'Days', 'Months',
+        'Repeat: Every', 'Repeat: Until: Time', 'Repeat: Until: Duration',
+        'Repeat: Stop If Still Running',
+    ],
+    'zh': [
+        '主机名', '任务名', '下次运行时间', '模式', '登录状态',
+        '上次运行时间', '上次结果', '创建者', '要运行的任务', '起始于',
+        '注释', '计划任务状态', '空闲时间', '电源管理',
+        '作为用户运行', '删除没有计划的任务',
+        '如果运行了 X 小时 X 分钟，停止任务', '计划', '计划类型',
+        '开始时间', '开始日期', '结束日期', '天', '月',
+        '重复: 每', '重复: 截止: 时间', '重复: 截止: 持续时间',
+        '重复: 如果还在运行，停止',
+    ],
+}
+
+SWITCHES = {
+    '/QUERY', '/CREATE', '/CHANGE', '/DELETE', '/RUN', '/TN', '/XML', '/FO',
+    '/V', '/NH', '/F', '/ENABLE', '/DISABLE', '/TR', '/ST', '/SD', '/RI',
+}
+
+# 非详细模式只输出前 5 列
+SHORT_FIELD_COUNT = 5
+
+MESSAGES = {
+    'en': {
+        'folder': 'Folder',
+        'na': 'N/A',
+        'never': 'N/A',
+        'enabled': 'Enabled',
+        'disabled': 'Disabled',
+        'ready': 'Ready',
+        'running': 'Running',
+        'logon': 'Interactive only',
+        'datetime': '%m/%d/%Y %I:%M:%S %p',
+        'date': '%m/%d/%Y',
+        'time': '%I:%M:%S %p',
+        'not_found': 'ERROR: The system cannot find the file specified.',
+        'exists': 'ERROR: Cannot create a file when that file already exists.',
+        'syntax': 'ERROR: Invalid syntax.',
+        'created': 'SUCCESS: The scheduled task "{name}" has successfully been created.',
+        'changed': 'SUCCESS: The parameters of scheduled task "{name}" have been changed.',
+        'deleted': 'SUCCESS: The scheduled task "{name}" was successfully deleted.',
+        'ran': 'SUCCESS: Attempted to run the scheduled task "{name}".',
+    },
+    'zh': {
+        'folder': '文件夹',
+        'na': 'N/A',
+        'never': 'N/A',
+        'enabled': '已启用',
+        'disabled': '已禁用',
+        'ready': '就绪',
+        'running': '正在运行',
+        'logon': '只使用交互方式',
+        'datetime': '%Y/%m/%d %H:%M:%S',
+        'date': '%Y/%m/%d',
+        'time': '%H:%M:%S',
+        'not_found': '错误: 系统找不到指定的文件。',
+        'exists': '错误: 当文件已存在时，无法创建该文件。',
+        'syntax': '错误: 无效语法。',
+        'created': '成功: 成功创建计划任务 "{name}"。',
+        'changed': '成功: 计划任务 "{name}" 的参数已更改。',
+        'deleted': '成功: 计划的任务 "{name}" 被成功删除。',
+        'ran': '成功: 尝试运行 "{name}"。',
+    },
+}
+
+SCHEDULE_TYPES = {
+    'TimeTrigger': 'One Time Only, Minute',
+    'ScheduleByDay': 'Daily',
+    'ScheduleByWeek': 'Weekly',
+    'ScheduleByMonth': 'Monthly',
+    'ScheduleByMonthDayOfWeek': 'Monthly',
+}
+
+SAMPLE_XML = """<?xml version="1.0" encoding="UTF-16"?>
+<Task version="1.4" xmlns="http://schemas.microsoft.com/windows/2004/02/mit/task">
+  <RegistrationInfo>
+    <Date>{start}</Date>
+    <Author>{author}</Author>
+  </RegistrationInfo>
+  <Triggers>
+    <TimeTrigger>
+      <StartBoundary>{start}</StartBoundary>
+      <Enabled>true</Enabled>
+      <Repetition>
+        <Interval>{interval}</Interval>
+      </Repetition>
+    </TimeTrigger>
+  </Triggers>
+  <Settings>
+    <MultipleInstancesPolicy>Parallel</MultipleInstancesPolicy>
+    <StartWhenAvailable>true</StartWhenAvailable>
+  </Settings>
+  <Actions Context="Author">
+    <Exec>
+      <Command>{command}</Command>
+      <Arguments>{arguments}</Arguments>
+      <WorkingDirectory>{workdir}</WorkingDirectory>
+    </Exec>
+  </Actions>
+</Task>"""
+
+
+class FakeTask:
+    """State of one registered task; display fields are derived from its XML."""
+
+    __slots__ = ('name', 'xml', 'enabled', 'last_run', 'last_result', 'author',
+                 'command', 'arguments', 'workdir', 'triggers')
+
+    def __init__(self, name: str, xml: str):
+        self.name = name
+        self.xml = xml
+        self.enabled = True
+        self.last_run: Optional[datetime] = None
+        self.last_result = 267011  # 从未运行
+        self._parse()
+
+    def _parse(self) -> None:
+        root = parse_task_xml(self.xml)
+
+        def text(path: str) -> str:
+            node = root.find(path.replace('/', '/' + TASK_NS))
+            return node.text.strip() if node is not None and node.text else ''
+
+        self.author = text('./RegistrationInfo/Author')
+        self.command = text('./Actions/Exec/Command')
+        self.arguments = text('./Actions/Exec/Arguments')
+        self.workdir = text('./Actions/Exec/WorkingDirectory')
+        self.triggers: List[Tuple[str, str, str]] = []
+        triggers = root.find(f'./{TASK_NS}Triggers')
+        for trigger in list(triggers) if triggers is not None else []:
+            kind = trigger.tag.replace(TASK_NS, '')
+            if kind == 'CalendarTrigger':
+                for child in trigger:
+                    tag = child.tag.replace(TASK_NS, '')
+                    if tag.startswith('Schedule'):
+                        kind = tag
+            start = trigger.findtext(f'{TASK_NS}StartBoundary', '') or ''
+            interval = trigger.findtext(f'{TASK_NS}Repetition/{TASK_NS}Interval', '') or ''
+            self.triggers.append((kind, start.strip(), interval.strip()))
+
+
+class FakeScheduler(Backend):
+    """In-memory ``schtasks`` emulation with optional per-call latency.
+
+    Supports ``/Query`` (``/FO LIST|CSV|TABLE``, ``/V``, ``/XML``, ``/TN``
+    task or folder), ``/Create /XML``, ``/Change`` (``/ENABLE|/DISABLE``,
+    ``/TR``, ``/ST``, ``/SD``, ``/RI``), ``/Delete`` and ``/Run``. ``locale`` selects English or Chinese output.
+    """
+
+    def __init__(self, latency: float = 0.0, locale: str = 'en', host: str = 'FAKEHOST',
+                 system_tasks: int = 0):
+        self.latency = latency
+        self.locale = locale
+        self.host = host
+        self.messages = MESSAGES[locale]
+        self.fields = VERBOSE_FIELDS[locale]
+        self.tasks: Dict[str, FakeTask] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        for i in range(system_tasks):
+            self.add_task(f'\\Microsoft\\Windows\\Fake\\system_{i:05d}', sample_xml(i))
+
+    # ---- 数据准备 ----
+
+    def add_task(self, name: str, xml: str, enabled: bool = True) -> FakeTask:
+        if not name.startswith('\\'):
+            name = '\\' + name
+        task = FakeTask(name, xml)
+        task.enabled = enabled
+        with self._lock:
+            self.tasks[name.lower()] = task
+        return task
+
+    def populate(self, count: int, folder: str = '\\PyTasks\\', prefix: str = 'task_') -> 'FakeScheduler':
+        """Register ``count`` sample tasks under ``folder`` and return ``self``."""
+        for i in range(count):
+            self.add_task(f'{folder}{prefix}{i:05d}', sample_xml(i))
+        return self
+
+    # ---- Backend ----
+
+    def run(self, args: List[str], timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        if self.latency:
+            if timeout is not None and self.latency > timeout:
+                time.sleep(timeout)
+                return subprocess.CompletedProcess(args, -1, '', f"Timed out after {timeout}s")
+            time.sleep(self.latency)
+        batch = current_batch()
+        if batch is not None and batch.cancelled.is_set():
+            return subprocess.CompletedProcess(args, -1, '', 'Cancelled')
+        opts = [a.upper() for a in args[1:]]
+        verb = opts[0] if opts else ''
+        with self._lock:
+            self.calls[verb] = self.calls.get(verb, 0) + 1
+            handler = {
+                '/QUERY': self._query,
+                '/CREATE': self._create,
+                '/CHANGE': self._change,
+                '/DELETE': self._delete,
+                '/RUN': self._run,
+            }.get(verb)
+            if handler is None:
+                return self._error(args, 'syntax')
+            return handler(args, opts)
+
+    # ---- 命令实现 ----
+
+    def _value(self, args: List[str], opts: List[str], flag: str) -> Optional[str]:
+        if flag in opts:
+            i = opts.index(flag) + 1
+            # /XML 在 /Create 中带文件路径，在 /Query 中不带参数
+            if i < len(opts) and opts[i] not in SWITCHES:
+                return args[i + 1]
+        return None
+
+    def _error(self, args: List[str], key: str) -> subprocess.CompletedProcess:
+        return subprocess.CompletedProcess(args, 1, '', self.messages[key] + '\n')
+
+    def _ok(self, args: List[str], key: str, name: str) -> subprocess.CompletedProcess:
+        return subprocess.CompletedProcess(args, 0, self.messages[key].format(name=name) + '\n', '')
+
+    def _select(self, tn: Optional[str]) -> Optional[List[FakeTask]]:
+        if tn is None:
+            return sorted(self.tasks.values(), key=lambda t: t.name.lower())
+        if not tn.startswith('\\'):
+            tn = '\\' + tn
+        if tn.endswith('\\'):
+            folder = tn.lower()
+            selected = [t for key, t in self.tasks.items()
+                        if key.startswith(folder) and '\\' not in key[len(folder):]]
+            has_subfolder = any(key.startswith(folder) for key in self.tasks)
+            if not selected and not has_subfolder:
+                return None
+            return sorted(selected, key=lambda t: t.name.lower())
+        task = self.tasks.get(tn.lower())
+        return [task] if task is not None else None
+
+    def _query(self, args: List[str], opts: List[str]) -> subprocess.CompletedProcess:
+        tasks = self._select(self._value(args, opts, '/TN'))
+        if tasks is None:
+            return self._error(args, 'not_found')
+        if '/XML' in opts:
+            out = '\n'.join(t.xml for t in tasks)
+            return subprocess.CompletedProcess(args, 0, out + '\n', '')
+        fmt = (self._value(args, opts, '/FO') or 'TABLE').upper()
+        verbose = '/V' in opts
+        if fmt == 'CSV':
+            out = self._format_csv(tasks, verbose, '/NH' in opts)
+        elif fmt == 'LIST':
+            out = self._format_list(tasks, verbose)
+        else:
+            out = self._format_table(tasks)
+        return subprocess.CompletedProcess(args, 0, out, '')
+
+    def _create(self, args: List[str], opts: List[str]) -> subprocess.CompletedProcess:
+        tn = self._value(args, opts, '/TN')
+        path = self._value(args, opts, '/XML')
+        if tn is None or path is None:
+            return self._error(args, 'syntax')
+        if not tn.startswith('\\'):
+            tn = '\\' + tn
+        existing = self.tasks.get(tn.lower())
+        if existing is not None and '/F' not in opts:
+            return self._error(args, 'exists')
+        try:
+            xml = read_task_xml(path)
+            task = FakeTask(tn, xml)
+        except (OSError, ET.ParseError):
+            return self._error(args, 'syntax')
+        self.tasks[tn.lower()] = task
+        return self._ok(args, 'created', tn)
+
+    def _change(self, args: List[str], opts: List[str]) -> subprocess.CompletedProcess:
+        task = self._find(args, opts)
+        if task is None:
+            return self._error(args, 'not_found')
+        xml = task.xml
+        try:
+            tr = self._value(args, opts, '/TR')
+            if tr is not None:
+                xml = _set_command(xml, tr)
+            st = self._value(args, opts, '/ST')
+            sd = self._value(args, opts, '/SD')
+            if st is not None or sd is not None:
+                xml = _set_start(xml, st, datetime.strptime(sd, self.messages['date']).date() if sd else None)
+            ri = self._value(args, opts, '/RI')
+            if ri is not None:
+                xml = _set_interval(xml, int(ri))
+        except ValueError:
+            return self._error(args, 'syntax')
+        if not any(flag in opts for flag in ('/TR', '/ST', '/SD', '/RI', '/ENABLE', '/DISABLE')):
+            return self._error(args, 'syntax')
+        if xml != task.xml:
+            task.xml = xml
+            task._parse()
+        if '/ENABLE' in opts:
+            task.enabled = True
+        elif '/DISABLE' in opts:
+            task.enabled = False
+        return self._ok(args, 'changed', task.name)
+
+    def _delete(self, args: List[str], opts: List[str]) -> subprocess.CompletedProcess:
+        task = self._find(args, opts)
+        if task is None:
+            return self._error(args, 'not_found')
+        del self.tasks[task.name.lower()]
+        return self._ok(args, 'deleted', task.name)
+
+    def _run(self, args: List[str], opts: List[str]) -> subprocess.CompletedProcess:
+        task = self._find(args, opts)
+        if task is None:
+            return self._error(args, 'not_found')
+        task.last_run = datetime.now().replace(microsecond=0)
+        task.last_result = 0
+        return self._ok(args, 'ran', task.name)
+
+    def _find(self, args: List[str], opts: List[str]) -> Optional[FakeTask]:
+        tn = self._value(args, opts, '/TN')
+        if tn is None:
+            return None
+        if not tn.startswith('\\'):
+            tn = '\\' + tn
+        return self.tasks.get(tn.lower())
+
+    # ---- 输出格式 ----
+
+    def _fmt_dt(self, value: Optional[datetime]) -> str:
+        return value.strftime(self.messages['datetime']) if value else self.messages['never']
+
+    def _rows(self, task: FakeTask) -> List[List[str]]:
+        """One verbose row per trigger, as the real tool prints them."""
+        m = self.messages
+        status = m['ready'] if task.enabled else m['disabled']
+        triggers = task.triggers or [('', '', '')]
+        rows = []
+        for kind, start, interval in triggers:
+            start_dt = _parse_boundary(start)
+            next_run = start_dt if task.enabled and start_dt and start_dt > datetime.now() else None
+            rows.append([
+                self.host, task.name, self._fmt_dt(next_run), status, m['logon'],
+                self._fmt_dt(task.last_run) if task.last_run else _never(self.locale),
+                str(task.last_result), task.author or m['na'],
+                f'{task.command} {task.arguments}'.strip() or m['na'], task.workdir or m['na'],
+                m['na'], m['enabled'] if task.enabled else m['disabled'], m['na'], m['na'],
+                'user', m['na'], '72:00:00', m['na'], SCHEDULE_TYPES.get(kind, m['na']),
+                start_dt.strftime(m['time']) if start_dt else m['na'],
+                start_dt.strftime(m['date']) if start_dt else m['na'],
+                m['na'], m['na'], m['na'], _repeat(interval, self.locale) if interval else m['na'],
+                m['na'], m['na'], m['na'],
+            ])
+        return rows
+
+    def _folders(self, tasks: List[FakeTask]) -> Dict[str, List[FakeTask]]:
+        folders: Dict[str, List[FakeTask]] = {}
+        for task in tasks:
+            folder = task.name.rsplit('\\', 1)[0] or '\\'
+            folders.setdefault(folder, []).append(task)
+        return folders
+
+    def _format_csv(self, tasks: List[FakeTask], verbose: bool, no_header: bool) -> str:
+        count = len(self.fields) if verbose else SHORT_FIELD_COUNT
+        buf = io.StringIO()
+        writer = csv.writer(buf, quoting=csv.QUOTE_ALL, lineterminator='\n')
+        for folder_tasks in self._folders(tasks).values():
+            # 每个文件夹重复一次表头
+            if not no_header:
+                writer.writerow(self.fields[:count])
+            for task in folder_tasks:
+                rows = self._rows(task) if verbose else self._rows(task)[:1]
+                for row in rows:
+                    writer.writerow(row[:count])
+        return buf.getvalue()
+
+    def _format_list(self, tasks: List[FakeTask], verbose: bool) -> str:
+        count = len(self.fields) if verbose else SHORT_FIELD_COUNT
+        labels = [f'{label}:' for label in self.fields[:count]]
+        width = max(len(label) for label in labels) + 1
+        lines = []
+        for folder, folder_tasks in self._folders(tasks).items():
+            lines.append(f"{self.messages['folder']}: {folder}")
+            for task in folder_tasks:
+                rows = self._rows(task) if verbose else self._rows(task)[:1]
+                for row in rows:
+                    lines.extend(f'{label:<{width}}{value}' for label, value in zip(labels, row))
+                    lines.append('')
+        return '\n'.join(lines) + '\n'
+
+    def _format_table(self, tasks: List[FakeTask]) -> str:
+        lines = []
+        for folder, folder_tasks in self._folders(tasks).items():
+            lines += ['', f"{self.messages['folder']}: {folder}",
+                      f"{'TaskName':<40} {'Next Run Time':<22} {'Status':<15}",
+                      f"{'=' * 40} {'=' * 22} {'=' * 15}"]
+            for task in folder_tasks:
+                row = self._rows(task)[0]
+                lines.append(f"{task.name.rsplit(chr(92), 1)[-1]:<40} {row[2]:<22} {row[3]:<15}")
+        return '\n'.join(lines) + '\n'
+
+
+def sample_xml(i: int) -> str:
+    """Return a task definition like the ones ``xml_builder`` generates."""
+    return SAMPLE_XML.format(
+        start=f'2029-01-01T{i % 24:02d}:{i % 60:02d}:00',
+        author='TaskScheduler',
+        interval=f'PT{i % 30 + 1}M',
+        command='C:\\Python\\python.exe',
+        arguments=f'C:\\scripts\\job_{i}.py',
+        workdir='C:\\scripts',
+    )
+
+
+def read_task_xml(path: str) -> str:
+    """Read a task XML file the way ``schtasks /Create /XML`` does."""
+    data = open(path, 'rb').read()
+    if data[:2] in (b'\xff\xfe', b'\xfe\xff'):
+        return data.decode('utf-16')
+    return data.decode('utf-8-sig')
+
+
+def _set_command(xml: str, task_to_run: str) -> str:
+    """Apply ``/Change /TR``: the first (possibly quoted) word is the command."""
+    task_to_run = task_to_run.strip()
+    if task_to_run.startswith('"'):
+        end = task_to_run.index('"', 1) + 1
+        command, arguments = task_to_run[:end], task_to_run[end:].strip()
+    else:
+        command, _, arguments = task_to_run.partition(' ')
+    xml = re.sub(r'<Command>[^<]*</Command>', lambda m: f'<Command>{escape(command)}</Command>', xml, count=1)
+    return re.sub(r'<Arguments>[^<]*</Arguments>', lambda m: f'<Arguments>{escape(arguments)}</Arguments>', xml, count=1)
+
+
+def _set_start(xml: str, start_time: Optional[str], start_date) -> str:
+    """Apply ``/Change /ST`` (``HH:MM``) and ``/SD`` to the first trigger."""
+    match = re.search(r'<StartBoundary>([^<]+)</StartBoundary>', xml)
+    if match is None:
+        raise ValueError('no trigger')
+    start = datetime.fromisoformat(match.group(1)[:19])
+    if start_time:
+        hour, minute = (int(v) for v in start_time.split(':')[:2])
+        start = start.replace(hour=hour, minute=minute, second=0)
+    if start_date:
+        start = datetime.combine(start_date, start.time())
+    return xml[:match.start(1)] + start.isoformat() + xml[match.end(1):]
+
+
+def _set_interval(xml: str, minutes: int) -> str:
+    """Apply ``/Change /RI`` to the first trigger, adding a repetition if needed."""
+    if minutes <= 0:
+        raise ValueError('interval')
+    if re.search(r'<Repetition>\s*<Interval>', xml):
+        return re.sub(r'(<Repetition>\s*<Interval>)[^<]*(</Interval>)', rf'\g<1>PT{minutes}M\g<2>', xml, count=1)
+    return re.sub(r'(</StartBoundary>)', rf'\1<Repetition><Interval>PT{minutes}M</Interval></Repetition>', xml, count=1)
+
+
+def _parse_boundary(value: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _never(locale: str) -> str:
+    # 从未运行的任务显示为 1999/11/30
+    return '11/30/1999 12:00:00 AM' if locale == 'en' else '1999/11/30 0:00:00'
+
+
+def _repeat(interval: str, locale: str) -> str:
+    # 间隔可以是 PT1H30M、P1D 之类的复合写法；schtasks 把天数折算为小时显示
+    duration = parse_duration(interval)
+    total = int(duration.total_seconds()) // 60 if duration else 0
+    hours, minutes = divmod(total, 60)
+    if locale == 'en':
+        return f'{hours} Hour(s), {minutes} Minute(s)'
+    return f'{hours} 小时， {minutes} 分钟'
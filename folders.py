@@ -0,0 +1,51 @@
+"""Folder tree of the managed namespaces.
+
+The tree starts at the configured root folders (``PYTASKS_FOLDERS``,
+separated by ``;``, default ``\\PyTasks\\``). ``schtasks`` cannot list
+folders, so the children of a folder come from the task store directory
+when it is readable (a directory listing, no subprocess) plus every folder
+:data:`scheduler_cli.folder_cache` has seen exist, e.g. one a task was just
+created in. Children are only looked up for folders that are expanded.
+"""
+import os
+from pathlib import Path
+from typing import List, Optional, Union
+
+import scheduler_cli as sc
+from task_store import DEFAULT_ROOT
+
+
+def configured_roots() -> List[str]:
+    """Root folders to show, normalised and without duplicates."""
+    value = os.environ.get('PYTASKS_FOLDERS', '')
+    roots = [sc.folder_path(f) for f in value.split(';') if f.strip()] or [sc.TASK_FOLDER]
+    return list(dict.fromkeys(roots))
+
+
+def _store_children(folder: str, store_root: Path) -> List[str]:
+    base = store_root.joinpath(*[p for p in folder.split('\\') if p])
+    try:
+        with os.scandir(base) as entries:
+            return [f"{folder}{e.name}\\" for e in entries if e.is_dir()]
+    except OSError:
+        # 任务存储通常需要管理员权限
+        return []
+
+
+def subfolders(folder: str, store_root: Optional[Union[str, Path]] = None) -> List[str]:
+    """Direct children of ``folder`` that are known to exist, sorted by name."""
+    folder = sc.folder_path(folder)
+    children = _store_children(folder, Path(store_root or DEFAULT_ROOT))
+    for known in sc.folder_cache.known_folders():
+        if known.lower().startswith(folder.lower()) and known != folder:
+            # 只取下一级；更深的已知文件夹意味着中间一级也存在
+            rest = known[len(folder):].split('\\', 1)[0]
+            children.append(f"{folder}{rest}\\")
+    unique = {c.lower(): c for c in children}
+    return [unique[k] for k in sorted(unique)]
+
+
+def folder_name(folder: str) -> str:
+    """Last component of a folder path (``\\`` for the root folder)."""
+    parts = [p for p in folder.split('\\') if p]
+    return parts[-1] if parts else '\\'
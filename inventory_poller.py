@@ -0,0 +1,212 @@
+"""Background refresher that publishes inventory snapshots.
+
+One :class:`InventoryPoller` per process queries the inventory on its own
+thread, every ``interval`` seconds or as soon as :meth:`refresh` is called
+after a mutation, and publishes the result as an immutable
+:class:`Snapshot`. Readers (every browser session of the UI) take the
+latest snapshot without touching ``schtasks``, so the subprocess load does
+not grow with the number of users.
+
+The last good inventory is also written to disk (pickled record tuples plus
+a schema version). A new process publishes it immediately as a ``cached``
+snapshot and revalidates with a fresh query in the background, so the
+first page can render before ``schtasks`` has answered.
+"""
+import os
+import pickle
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, replace
+from functools import cached_property
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import scheduler_cli as sc
+from task_records import TaskRecord
+
+
+DEFAULT_INTERVAL = float(os.environ.get('PYTASKS_REFRESH_INTERVAL', 30))
+DEFAULT_SNAPSHOT_PATH = Path(os.environ.get('PYTASKS_SNAPSHOT', Path.home() / '.pytasks' / 'inventory.pickle'))
+
+# TaskRecord 字段或格式变化时递增，旧文件会被忽略
+SNAPSHOT_SCHEMA = 1
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """One published inventory; the records are shared and must not be modified."""
+
+    result: subprocess.CompletedProcess
+    records: Tuple[TaskRecord, ...]
+    taken_at: float
+    version: int
+    # 来自磁盘上的上一次结果，后台正在重新查询
+    cached: bool = False
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.taken_at
+
+    @property
+    def ok(self) -> bool:
+        return self.result.returncode == 0
+
+    @cached_property
+    def _by_name(self) -> Dict[str, TaskRecord]:
+        return {r.name.lower(): r for r in self.records}
+
+    def find(self, task_name: str) -> Optional[TaskRecord]:
+        """Record of one task (short name or full path), ``None`` if not in the snapshot."""
+        return self._by_name.get(sc.task_path(task_name).lower())
+
+
+def save_snapshot(snapshot: Snapshot, path: Union[str, Path] = DEFAULT_SNAPSHOT_PATH) -> None:
+    """Write the records of a successful snapshot atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    slots = TaskRecord.__slots__
+    data = {
+        'schema': SNAPSHOT_SCHEMA,
+        'slots': slots,
+        'taken_at': snapshot.taken_at,
+        'rows': [tuple(getattr(r, s) for s in slots) for r in snapshot.records],
+    }
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_snapshot(path: Union[str, Path] = DEFAULT_SNAPSHOT_PATH) -> Optional[Snapshot]:
+    """Read a snapshot written by :func:`save_snapshot`; ``None`` if missing or outdated."""
+    try:
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(data, dict) or data.get('schema') != SNAPSHOT_SCHEMA or data.get('slots') != TaskRecord.__slots__:
+        return None
+    records = []
+    for row in data['rows']:
+        record = TaskRecord.__new__(TaskRecord)
+        for slot, value in zip(TaskRecord.__slots__, row):
+            setattr(record, slot, value)
+        records.append(record)
+    result = subprocess.CompletedProcess([sc.SCHTASKS, '/Query'], 0, '', '')
+    return Snapshot(result, tuple(records), data['taken_at'], 0, cached=True)
+
+
+class InventoryPoller:
+    def __init__(self, interval: float = DEFAULT_INTERVAL,
+                 snapshot_path: Optional[Union[str, Path]] = DEFAULT_SNAPSHOT_PATH):
+        self.interval = interval
+        self.snapshot_path = snapshot_path
+        self._saved_version: Optional[int] = None
+        self._snapshot: Optional[Snapshot] = None
+        self._published = threading.Condition()
+        self._wake = threading.Event()
+        self._full = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[Snapshot], None]] = []
+        self.stats = {'refreshes': 0, 'requested': 0, 'errors': 0}
+
+    def start(self) -> 'InventoryPoller':
+        if self._snapshot is None and self.snapshot_path:
+            cached = load_snapshot(self.snapshot_path)
+            if cached is not None:
+                with self._published:
+                    self._snapshot = cached
+                    self._published.notify_all()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='inventory-poller', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def subscribe(self, callback: Callable[[Snapshot], None]) -> None:
+        """Call ``callback(snapshot)`` on the poller thread after each publish."""
+        self._listeners.append(callback)
+
+    def snapshot(self, timeout: Optional[float] = None) -> Optional[Snapshot]:
+        """Latest snapshot; waits for the first one (up to ``timeout``) after start-up."""
+        with self._published:
+            if self._snapshot is None:
+                self._published.wait_for(lambda: self._snapshot is not None, timeout)
+            return self._snapshot
+
+    def refresh(self, full: bool = False, wait: bool = False, timeout: Optional[float] = 30.0) -> Optional[Snapshot]:
+        """Ask for a refresh now; with ``wait`` block until a newer snapshot is published.
+
+        Without ``full`` only tasks invalidated by mutations are re-queried.
+        """
+        with self._published:
+            seen = self._snapshot.taken_at if self._snapshot else 0.0
+            self.stats['requested'] += 1
+            self._full = self._full or full
+        self._wake.set()
+        if not wait:
+            return self._snapshot
+        with self._published:
+            self._published.wait_for(lambda: self._snapshot is not None and self._snapshot.taken_at > seen, timeout)
+            return self._snapshot
+
+    def patch(self, task_name: str, record: Optional[TaskRecord]) -> Optional[Snapshot]:
+        """Publish the latest snapshot with one task replaced, added or (``None``) removed.
+
+        Used after a single-task action whose new state was already queried
+        (:func:`scheduler_cli.refresh_task`), so readers see it without
+        waiting for the next inventory query. Tasks outside
+        :data:`scheduler_cli.TASK_FOLDER` are ignored.
+        """
+        if sc.folder_of(task_name).lower() != sc.TASK_FOLDER.lower():
+            return None
+        key = sc.task_path(task_name).lower()
+        with self._published:
+            current = self._snapshot
+            if current is None:
+                return None
+            records = [r for r in current.records if r.name.lower() != key]
+            if record is not None:
+                # 保持原来的位置，新任务追加在末尾
+                index = next((i for i, r in enumerate(current.records) if r.name.lower() == key), len(records))
+                records.insert(index, record)
+            self._snapshot = replace(current, records=tuple(records), version=sc.inventory_cache.version)
+            self._published.notify_all()
+            return self._snapshot
+
+    def _loop(self) -> None:
+        full = True
+        while not self._stop.is_set():
+            try:
+                self._publish(full)
+            except Exception:
+                # 查询异常时保留上一份快照，下个周期重试
+                self.stats['errors'] += 1
+            requested = self._wake.wait(self.interval)
+            self._wake.clear()
+            with self._published:
+                full, self._full = (self._full or not requested), False
+
+    def _publish(self, full: bool) -> None:
+        result, records = sc.load_inventory(force=full)
+        snapshot = Snapshot(result, tuple(records), time.time(), sc.inventory_cache.version)
+        with self._published:
+            self._snapshot = snapshot
+            self.stats['refreshes'] += 1
+            self._published.notify_all()
+        if self.snapshot_path and snapshot.ok and snapshot.version != self._saved_version:
+            try:
+                save_snapshot(snapshot, self.snapshot_path)
+                self._saved_version = snapshot.version
+            except OSError:
+                pass
+        for callback in list(self._listeners):
+            callback(snapshot)
@@ -0,0 +1,233 @@
+"""Thin launcher that runs a task script and journals how the run went.
+
+Tasks built with ``TaskConfig(launcher=True)`` execute::
+
+    python launcher.py --journal <file> [--log <file>] -- script.py args...
+
+The launcher runs the script with the same interpreter, waits for it and
+appends one JSON line ``{"s": start, "e": end, "rc": exit code, "rss": peak
+RSS bytes, "cpu": CPU seconds}`` (times as Unix timestamps) to the journal,
+rotating it when it grows past ``--max-bytes``. With ``--log`` the script's
+stdout and stderr are appended to that file, which is rotated the same way
+(``--log-max-bytes``) before a run starts. It exits with the script's
+exit code so Task Scheduler still reports the real Last Result.
+
+Only the standard library is used, because the launcher runs under the
+task's interpreter. :func:`tail_records` reads the newest entries by seeking
+from the end of the journal.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+LAUNCHER_PATH = Path(__file__).resolve()
+JOURNAL_DIR = Path(os.environ.get('PYTASKS_JOURNALS', Path.home() / '.pytasks' / 'journals'))
+MAX_BYTES = 1024 * 1024
+LOG_MAX_BYTES = 64 * 1024 * 1024
+BACKUPS = 3
+
+
+def journal_path(task_name: str) -> Path:
+    """Journal file of a task; ``\\`` in folder paths become ``__``."""
+    safe = task_name.strip('\\').replace('\\', '__')
+    return JOURNAL_DIR / f'{safe}.jsonl'
+
+
+# ---- 进程资源统计 ----
+
+def _windows_usage(proc: subprocess.Popen) -> Tuple[Optional[int], Optional[float]]:
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in (
+                'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+
+    handle = int(proc._handle)
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    rss = None
+    if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+        rss = counters.PeakWorkingSetSize
+    times = [wintypes.FILETIME() for _ in range(4)]
+    cpu = None
+    if ctypes.windll.kernel32.GetProcessTimes(handle, *(ctypes.byref(t) for t in times)):
+        # FILETIME 以 100 纳秒为单位；后两个分别是内核态和用户态时间
+        cpu = sum((t.dwHighDateTime << 32 | t.dwLowDateTime) for t in times[2:]) / 1e7
+    return rss, cpu
+
+
+def _posix_usage() -> Tuple[Optional[int], Optional[float]]:
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # Linux 上 ru_maxrss 以 KB 为单位，macOS 上以字节为单位
+    rss = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+    return rss, usage.ru_utime + usage.ru_stime
+
+
+def run(command: Sequence[str], log: Optional[Union[str, Path]] = None) -> Dict[str, Union[int, float, None]]:
+    """Run ``command`` and return its journal record; output goes to ``log`` if given."""
+    start = time.time()
+    if log is None:
+        proc = subprocess.Popen(list(command))
+    else:
+        with open(log, 'ab') as out:
+            proc = subprocess.Popen(list(command), stdout=out, stderr=subprocess.STDOUT)
+    returncode = proc.wait()
+    end = time.time()
+    try:
+        rss, cpu = _windows_usage(proc) if os.name == 'nt' else _posix_usage()
+    except (OSError, AttributeError, ImportError):
+        rss = cpu = None
+    return {'s': round(start, 3), 'e': round(end, 3), 'rc': returncode, 'rss': rss,
+            'cpu': None if cpu is None else round(cpu, 3)}
+
+
+# ---- 日志写入与轮转 ----
+
+def _rotate(path: Path, backups: int) -> None:
+    for i in range(backups - 1, 0, -1):
+        older = path.with_name(f'{path.name}.{i}')
+        if older.exists():
+            os.replace(older, path.with_name(f'{path.name}.{i + 1}'))
+    os.replace(path, path.with_name(f'{path.name}.1'))
+
+
+def rotate_if_large(path: Union[str, Path], max_bytes: int, backups: int = BACKUPS) -> None:
+    """Rotate ``path`` to ``path.1`` … when it has reached ``max_bytes``."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if path.stat().st_size >= max_bytes:
+            _rotate(path, backups)
+    except FileNotFoundError:
+        pass
+
+
+def append_record(path: Union[str, Path], record: dict, max_bytes: int = MAX_BYTES, backups: int = BACKUPS) -> None:
+    """Append one compact JSON line, rotating ``path`` first if it is too large."""
+    path = Path(path)
+    rotate_if_large(path, max_bytes, backups)
+    line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+    # 追加模式下单次写入一整行，并行实例的记录不会交错
+    fd = os.open(str(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+# ---- 读取 ----
+
+def _tail_lines(path: Path, count: int, block: int = 8192) -> List[bytes]:
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b''
+        # 从文件末尾按块向前读，直到凑够 count 行
+        while pos > 0 and data.count(b'\n') <= count:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.splitlines()
+    if pos > 0:
+        lines = lines[1:]
+    return lines[-count:]
+
+
+def tail_records(path: Union[str, Path], count: int = 200) -> List[dict]:
+    """The newest ``count`` records, oldest first; reads the first backup only if needed."""
+    path = Path(path)
+    lines: List[bytes] = []
+    for candidate in (path, path.with_name(f'{path.name}.1')):
+        if len(lines) >= count:
+            break
+        try:
+            lines = _tail_lines(candidate, count - len(lines)) + lines
+        except FileNotFoundError:
+            continue
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            # 写入中途被截断的行
+            continue
+    return records
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted ``values``."""
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * pct // 100))
+    return values[int(rank) - 1]
+
+
+def summarize(records: List[dict], percentiles: Sequence[int] = (50, 90, 99)) -> dict:
+    """Duration percentiles, failure count and peak RSS of journal records."""
+    durations = sorted(r['e'] - r['s'] for r in records if 'e' in r and 's' in r)
+    rss = [r['rss'] for r in records if r.get('rss')]
+    return {
+        'runs': len(records),
+        'failures': sum(1 for r in records if r.get('rc')),
+        'durations': {p: percentile(durations, p) for p in percentiles},
+        'peak_rss': max(rss) if rss else None,
+    }
+
+
+@lru_cache(maxsize=1024)
+def _cached_summary(path: str, mtime_ns: int, size: int, count: int) -> dict:
+    return summarize(tail_records(path, count))
+
+
+def journal_summary(task_name: str, count: int = 200) -> Optional[dict]:
+    """Summary of a task's newest ``count`` runs; ``None`` without a journal.
+
+    Cached by the journal's mtime and size, so unchanged journals are not reread.
+    """
+    path = journal_path(task_name)
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return _cached_summary(str(path), st.st_mtime_ns, st.st_size, count)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Run a script and journal its duration and resource use.')
+    parser.add_argument('--journal', required=True)
+    parser.add_argument('--max-bytes', type=int, default=MAX_BYTES)
+    parser.add_argument('--backups', type=int, default=BACKUPS)
+    parser.add_argument('--log', help='append the script\'s stdout/stderr to this file')
+    parser.add_argument('--log-max-bytes', type=int, default=LOG_MAX_BYTES)
+    parser.add_argument('command', nargs=argparse.REMAINDER, help='-- script.py [args...]')
+    opts = parser.parse_args(argv)
+    command = opts.command[1:] if opts.command[:1] == ['--'] else opts.command
+    if not command:
+        parser.error('no script given')
+    if opts.log:
+        try:
+            rotate_if_large(opts.log, opts.log_max_bytes, opts.backups)
+        except OSError as exc:
+            # 另一个实例正占用日志文件时（Windows）本次不轮转，继续追加
+            print(f'launcher: cannot rotate log {opts.log}: {exc}', file=sys.stderr)
+    record = run([sys.executable] + command, opts.log)
+    try:
+        append_record(opts.journal, record, opts.max_bytes, opts.backups)
+    except OSError as exc:
+        print(f'launcher: cannot write journal {opts.journal}: {exc}', file=sys.stderr)
+    return record['rc']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
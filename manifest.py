@@ -0,0 +1,129 @@
+"""Load task definitions from CSV/JSON manifests and register them in bulk.
+
+A JSON manifest is a list of objects (or ``{"tasks": [...]}``); a CSV
+manifest has one row per task. Keys are the ``TaskConfig`` field names plus
+an optional trigger spec. In JSON the spec is a ``trigger`` object; in CSV
+the same keys are given as columns, with lists separated by ``;``::
+
+    {"name": "backup", "python_path": "C:\\\\Python\\\\python.exe",
+     "script_path": "C:\\\\jobs\\\\backup.py",
+     "trigger": {"type": "daily", "start": "2030-01-01T02:00", "every": 1}}
+
+Trigger types: ``minutes``, ``hours``, ``daily``, ``weekly``,
+``monthly_days``, ``monthly_last_day`` and ``monthly_nth_dow``.
+"""
+import csv
+import json
+import shutil
+import subprocess
+import tempfile
+from dataclasses import fields
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Union
+
+import scheduler_cli as sc
+from executor import get_executor
+from xml_builder import (
+    TaskConfig,
+    write_xml,
+    minutes_trigger,
+    daily_trigger,
+    weekly_trigger,
+    monthly_days_trigger,
+    monthly_last_day_trigger,
+    monthly_nth_dow_trigger,
+)
+
+
+CONFIG_FIELDS = {f.name for f in fields(TaskConfig)}
+TRIGGER_KEYS = ('type', 'start', 'every', 'days', 'weekdays', 'week', 'day')
+
+
+def _as_list(value) -> List[str]:
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value]
+    return [v.strip() for v in str(value or '').split(';') if v.strip()]
+
+
+def trigger_from_spec(spec: dict) -> str:
+    """Build trigger XML from a manifest trigger spec."""
+    kind = spec.get('type', '')
+    start = spec.get('start')
+    start = datetime.fromisoformat(start) if start else datetime.now().replace(second=0, microsecond=0)
+    if kind in ('minutes', 'hours'):
+        return minutes_trigger(start, int(spec.get('every', 1)), kind)
+    if kind == 'daily':
+        return daily_trigger(start, int(spec.get('every', 1)))
+    if kind == 'weekly':
+        return weekly_trigger(start, _as_list(spec.get('weekdays')))
+    if kind == 'monthly_days':
+        return monthly_days_trigger(start, [int(d) for d in _as_list(spec.get('days'))])
+    if kind == 'monthly_last_day':
+        return monthly_last_day_trigger(start)
+    if kind == 'monthly_nth_dow':
+        return monthly_nth_dow_trigger(start, spec['week'], spec['day'])
+    raise ValueError(f"Unknown trigger type: {kind!r}")
+
+
+def config_from_entry(entry: dict) -> TaskConfig:
+    """Turn one manifest entry into a ``TaskConfig``."""
+    values = {k: v for k, v in entry.items() if k in CONFIG_FIELDS and v not in (None, '')}
+    if 'retry_count' in values:
+        values['retry_count'] = int(values['retry_count'])
+    if 'launcher' in values:
+        values['launcher'] = str(values['launcher']).lower() in ('true', '1', 'yes')
+    spec = entry.get('trigger')
+    if not isinstance(spec, dict):
+        # CSV 中触发器以平铺的列给出，type 列名为 trigger
+        spec = {k: entry.get(k) for k in TRIGGER_KEYS if entry.get(k) not in (None, '')}
+        if entry.get('trigger'):
+            spec['type'] = entry['trigger']
+    if spec.get('type') and not values.get('trigger_xml'):
+        values['trigger_xml'] = trigger_from_spec(spec)
+    return TaskConfig(**values)
+
+
+def iter_entries(path: Union[str, Path]) -> Iterator[dict]:
+    """Yield the raw manifest entries; CSV rows are streamed."""
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            yield from csv.DictReader(f)
+        return
+    data = json.loads(path.read_text(encoding='utf-8'))
+    yield from (data['tasks'] if isinstance(data, dict) else data)
+
+
+def iter_manifest(path: Union[str, Path]) -> Iterator[TaskConfig]:
+    """Yield one ``TaskConfig`` per manifest entry."""
+    for entry in iter_entries(path):
+        yield config_from_entry(entry)
+
+
+def load_manifest(path: Union[str, Path]) -> List[TaskConfig]:
+    return list(iter_manifest(path))
+
+
+def register_tasks(configs: Iterable[TaskConfig], force_overwrite: bool = False) -> List[Optional[subprocess.CompletedProcess]]:
+    """Render and register many tasks concurrently; results keep input order.
+
+    Each worker streams its XML straight to a UTF-16 file and calls
+    ``schtasks /Create``, so throughput is bounded by the executor's
+    concurrency limit rather than by Python.
+    """
+    registration_date = datetime.now().isoformat()
+    workdir = Path(tempfile.mkdtemp(prefix='pytasks_'))
+
+    def register(item):
+        index, config = item
+        xml_path = write_xml(config, workdir / f'{index}.xml', registration_date)
+        try:
+            return sc.create_task(xml_path, config.name, force_overwrite)
+        finally:
+            xml_path.unlink()
+
+    try:
+        return get_executor().map(register, enumerate(configs))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,256 @@
+"""Timing of every scheduler call, aggregated per verb and per UI rerun.
+
+:func:`scheduler_cli.run_command` reports each call (verb, task, duration,
+return code, output size) to :func:`observe`. Calls are aggregated into
+fixed-bucket histograms per verb; the most recent calls are kept for the
+debug panel. A :class:`Scope` (see :func:`begin_scope`) additionally counts
+the subprocesses and milliseconds spent on behalf of one Streamlit rerun,
+including calls made on executor threads started from it.
+
+Everything can be exported as Prometheus text exposition format
+(:func:`to_prometheus`, :func:`write_prometheus` for the node exporter's
+textfile collector) or as JSON (:func:`to_json`).
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+
+# 直方图桶上限（秒）
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+RECENT_CALLS = 200
+RECENT_SCOPES = 50
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the ``q`` quantile (an estimate)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds + (float('inf'),), self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        out, seen = [], 0
+        for bound, n in zip(self.bounds + (float('inf'),), self.counts):
+            seen += n
+            out.append(('+Inf' if bound == float('inf') else repr(bound), seen))
+        return out
+
+
+@dataclass
+class Call:
+    verb: str
+    task: str
+    duration: float
+    returncode: int
+    output_bytes: int
+    at: float
+
+
+class Scope:
+    """Subprocess count and time spent within one unit of work (e.g. a rerun)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.time()
+        self.wall: Optional[float] = None
+        self.calls = 0
+        self.seconds = 0.0
+        self.verbs: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, verb: str, duration: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.seconds += duration
+            self.verbs[verb] = self.verbs.get(verb, 0) + 1
+
+    @property
+    def finished(self) -> bool:
+        return self.wall is not None
+
+    def as_dict(self) -> dict:
+        return {'name': self.name, 'started': self.started, 'wall_ms': None if self.wall is None else self.wall * 1e3,
+                'calls': self.calls, 'subprocess_ms': self.seconds * 1e3, 'verbs': dict(self.verbs)}
+
+
+def describe(args: Sequence[str]) -> Tuple[str, str]:
+    """``(verb, task)`` of a schtasks command line, e.g. ``('Query/XML', 'job')``."""
+    verb = args[1].lstrip('/') if len(args) > 1 else ''
+    if verb == 'Query' and '/XML' in args:
+        verb = 'Query/XML'
+    task = ''
+    if '/TN' in args:
+        i = list(args).index('/TN')
+        task = args[i + 1] if i + 1 < len(args) else ''
+    return verb, task
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations: Dict[str, Histogram] = {}
+        self.errors: Dict[str, int] = {}
+        self.output_bytes: Dict[str, int] = {}
+        self.recent: Deque[Call] = deque(maxlen=RECENT_CALLS)
+        self.scopes: Deque[Scope] = deque(maxlen=RECENT_SCOPES)
+        self.scope_calls = Histogram(COUNT_BUCKETS)
+        self.scope_seconds = Histogram(DURATION_BUCKETS)
+
+    def observe(self, args: Sequence[str], duration: float, returncode: int, output_bytes: int) -> None:
+        verb, task = describe(args)
+        with self._lock:
+            hist = self.durations.get(verb)
+            if hist is None:
+                hist = self.durations[verb] = Histogram(DURATION_BUCKETS)
+            hist.observe(duration)
+            if returncode != 0:
+                self.errors[verb] = self.errors.get(verb, 0) + 1
+            self.output_bytes[verb] = self.output_bytes.get(verb, 0) + output_bytes
+            self.recent.append(Call(verb, task, duration, returncode, output_bytes, time.time()))
+        scope = _scope.get()
+        if scope is not None:
+            scope.add(verb, duration)
+
+    def finish(self, scope: Scope, wall: Optional[float]) -> None:
+        scope.wall = wall
+        with self._lock:
+            self.scopes.append(scope)
+            self.scope_calls.observe(scope.calls)
+            self.scope_seconds.observe(scope.seconds)
+
+    def verb_table(self) -> List[dict]:
+        with self._lock:
+            return [{
+                'verb': verb,
+                'calls': hist.count,
+                'errors': self.errors.get(verb, 0),
+                'mean_ms': hist.total / hist.count * 1e3,
+                'p50_ms': hist.quantile(0.5) * 1e3,
+                'p95_ms': hist.quantile(0.95) * 1e3,
+                'output_kb': self.output_bytes.get(verb, 0) / 1024,
+            } for verb, hist in sorted(self.durations.items())]
+
+    def to_json(self) -> dict:
+        with self._lock:
+            return {
+                'verbs': {verb: {'count': h.count, 'sum_seconds': h.total, 'buckets': h.cumulative(),
+                                 'errors': self.errors.get(verb, 0), 'output_bytes': self.output_bytes.get(verb, 0)}
+                          for verb, h in self.durations.items()},
+                'scopes': [s.as_dict() for s in self.scopes],
+                'recent_calls': [asdict(c) for c in self.recent],
+            }
+
+    def to_prometheus(self, prefix: str = 'pytasks') -> str:
+        lines = []
+
+        def histogram(name: str, help_text: str, items: List[Tuple[str, Histogram]]) -> None:
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} histogram')
+            for labels, hist in items:
+                sep = ',' if labels else ''
+                for le, n in hist.cumulative():
+                    lines.append(f'{prefix}_{name}_bucket{{{labels}{sep}le="{le}"}} {n}')
+                suffix = f'{{{labels}}}' if labels else ''
+                lines.append(f'{prefix}_{name}_sum{suffix} {hist.total}')
+                lines.append(f'{prefix}_{name}_count{suffix} {hist.count}')
+
+        def counter(name: str, help_text: str, values: Dict[str, int]) -> None:
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} counter')
+            for verb, value in sorted(values.items()):
+                lines.append(f'{prefix}_{name}{{verb="{verb}"}} {value}')
+
+        with self._lock:
+            histogram('schtasks_duration_seconds', 'Duration of schtasks calls.',
+                      [(f'verb="{v}"', h) for v, h in sorted(self.durations.items())])
+            counter('schtasks_errors_total', 'schtasks calls with a non-zero return code.', self.errors)
+            counter('schtasks_output_bytes_total', 'Bytes of schtasks output.', self.output_bytes)
+            histogram('rerun_subprocesses', 'schtasks calls per UI rerun.', [('', self.scope_calls)])
+            histogram('rerun_subprocess_seconds', 'Time spent in schtasks per UI rerun.', [('', self.scope_seconds)])
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+        self.__init__()
+
+
+metrics = Metrics()
+_scope: contextvars.ContextVar = contextvars.ContextVar('metrics_scope', default=None)
+
+
+def observe(args: Sequence[str], duration: float, returncode: int, output_bytes: int) -> None:
+    metrics.observe(args, duration, returncode, output_bytes)
+
+
+def begin_scope(name: str = 'rerun') -> Scope:
+    """Attribute later calls in this context (and batches it starts) to a new scope."""
+    scope = Scope(name)
+    _scope.set(scope)
+    return scope
+
+
+def end_scope(scope: Scope, completed: bool = True) -> None:
+    """Record a scope; ``completed=False`` when it was cut short and has no wall time."""
+    if scope.finished or scope in metrics.scopes:
+        return
+    metrics.finish(scope, time.time() - scope.started if completed else None)
+    if _scope.get() is scope:
+        _scope.set(None)
+
+
+def current_scope() -> Optional[Scope]:
+    return _scope.get()
+
+
+def to_json() -> dict:
+    return metrics.to_json()
+
+
+def to_prometheus() -> str:
+    return metrics.to_prometheus()
+
+
+def write_prometheus(path: Union[str, Path]) -> None:
+    """Atomically write the Prometheus text file (for a textfile collector)."""
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(to_prometheus(), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def write_json(path: Union[str, Path]) -> None:
+    Path(path).write_text(json.dumps(to_json(), indent=2), encoding='utf-8')
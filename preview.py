@@ -1,11 +1,324 @@
-from datetime import datetime
-from typing import List
-
-from croniter import croniter
+import calendar
+import heapq
+import xml.etree.ElementTree as ET
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
 
 
 def preview_next_runs(cron_expression: str, count: int = 10) -> List[str]:
     """Return the next `count` run times for the given cron expression."""
+    from croniter import croniter
+
     now = datetime.now()
     itr = croniter(cron_expression, now)
     return [itr.get_next(datetime).isoformat(sep=' ') for _ in range(count)]
+
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MONTHS = [calendar.month_name[i] for i in range(1, 13)]
+WEEKS = {'First': 1, 'Second': 2, 'Third': 3, 'Fourth': 4, 'Last': 5}
+
+# 月份计划最多向后搜索的月数（如只在 2 月 30 日触发的计划永远不会触发）
+MAX_MONTH_SCAN = 12 * 8
+
+
+def parse_duration(value: str) -> Optional[timedelta]:
+    """Parse an XML ``xs:duration`` such as ``PT5M``, ``P1D`` or ``P1DT2H``."""
+    value = (value or '').strip()
+    if not value.startswith('P'):
+        return None
+    total = timedelta()
+    number = ''
+    in_time = False
+    units = {('D', False): 'days', ('W', False): 'weeks', ('H', True): 'hours',
+             ('M', True): 'minutes', ('S', True): 'seconds'}
+    for ch in value[1:]:
+        if ch == 'T':
+            in_time = True
+        elif ch.isdigit() or ch == '.':
+            number += ch
+        else:
+            unit = units.get((ch, in_time))
+            if unit is None or not number:
+                return None
+            total += timedelta(**{unit: float(number)})
+            number = ''
+    return total or None
+
+
+class Trigger:
+    """One trigger compiled from task XML into plain numbers.
+
+    ``kind`` is ``time``, ``daily``, ``weekly``, ``monthly`` or
+    ``monthly_dow``. Firings are computed arithmetically from
+    ``StartBoundary`` rather than by stepping through time.
+    """
+
+    __slots__ = ('kind', 'start', 'end', 'enabled', 'interval', 'duration', 'days_interval',
+                 'weeks_interval', 'weekdays', 'months', 'days', 'last_day', 'weeks')
+
+    def __init__(self, kind: str, start: datetime, end: Optional[datetime] = None, enabled: bool = True,
+                 interval: Optional[timedelta] = None, duration: Optional[timedelta] = None,
+                 days_interval: int = 1, weeks_interval: int = 1, weekdays: FrozenSet[int] = frozenset(),
+                 months: FrozenSet[int] = frozenset(range(1, 13)), days: Tuple[int, ...] = (),
+                 last_day: bool = False, weeks: FrozenSet[int] = frozenset()):
+        self.kind = kind
+        self.start = start
+        self.end = end
+        self.enabled = enabled
+        self.interval = interval
+        self.duration = duration
+        self.days_interval = max(days_interval, 1)
+        self.weeks_interval = max(weeks_interval, 1)
+        self.weekdays = weekdays
+        self.months = months
+        self.days = days
+        self.last_day = last_day
+        self.weeks = weeks
+
+    def __repr__(self) -> str:
+        return f"Trigger(kind={self.kind!r}, start={self.start!r}, interval={self.interval!r})"
+
+    # ---- 基础触发时间（不含重复） ----
+
+    def base_runs(self, after: datetime) -> Iterator[datetime]:
+        """Base firings (before repetition) at or after ``after``, in order."""
+        start = self.start
+        tod = start.time()
+        if after < start:
+            after = start
+        if self.kind == 'time':
+            if after <= start:
+                yield start
+            return
+        if self.kind == 'daily':
+            # 从开始日期起每隔 N 天，直接算出第一个不早于 after 的日期
+            first = datetime.combine(after.date(), tod)
+            if first < after:
+                first += timedelta(days=1)
+            offset = (first.date() - start.date()).days
+            k = -(-offset // self.days_interval)
+            current = datetime.combine(start.date() + timedelta(days=k * self.days_interval), tod)
+            step = timedelta(days=self.days_interval)
+            while True:
+                yield current
+                current += step
+        elif self.kind == 'weekly':
+            if not self.weekdays:
+                return
+            # 以开始日期所在周的周日为第 0 周
+            week0 = start.date() - timedelta(days=(start.weekday() + 1) % 7)
+            day = after.date()
+            while True:
+                week = (day - week0).days // 7
+                remainder = week % self.weeks_interval
+                if remainder:
+                    day = week0 + timedelta(weeks=week + self.weeks_interval - remainder)
+                    continue
+                if day.weekday() in self.weekdays:
+                    candidate = datetime.combine(day, tod)
+                    if candidate >= after:
+                        yield candidate
+                day += timedelta(days=1)
+        else:
+            year, month = after.year, after.month
+            empty = 0
+            while empty < MAX_MONTH_SCAN:
+                found = False
+                if month in self.months:
+                    for day in self._month_days(year, month):
+                        candidate = datetime.combine(date(year, month, day), tod)
+                        if candidate >= after:
+                            found = True
+                            yield candidate
+                empty = 0 if found else empty + 1
+                month += 1
+                if month > 12:
+                    year, month = year + 1, 1
+
+    def _month_days(self, year: int, month: int) -> List[int]:
+        last = calendar.monthrange(year, month)[1]
+        if self.kind == 'monthly':
+            # 当月不存在的日期（如 2 月 30 日）不触发
+            days = {d for d in self.days if d <= last}
+            if self.last_day:
+                days.add(last)
+            return sorted(days)
+        days = set()
+        first_weekday = date(year, month, 1).weekday()
+        for weekday in self.weekdays:
+            first = 1 + (weekday - first_weekday) % 7
+            for week in self.weeks:
+                if week == 5:
+                    day = first + 7 * ((last - first) // 7)
+                else:
+                    day = first + 7 * (week - 1)
+                if day <= last:
+                    days.add(day)
+        return sorted(days)
+
+    # ---- 含重复间隔的触发时间 ----
+
+    def iter_runs(self, after: datetime) -> Iterator[datetime]:
+        """Yield firings strictly after ``after`` in chronological order."""
+        if not self.enabled:
+            return
+        runs = self._iter_runs(after)
+        for run in runs:
+            if self.end is not None and run > self.end:
+                return
+            yield run
+
+    def _iter_runs(self, after: datetime) -> Iterator[datetime]:
+        interval = self.interval
+        if interval is None:
+            for base in self.base_runs(after + timedelta(microseconds=1)):
+                yield base
+            return
+        if self.duration is None:
+            # 无限期重复：从第一个基础触发时间起形成等差序列
+            first = next(self.base_runs(self.start), None)
+            if first is None:
+                return
+            if after < first:
+                k = 0
+            else:
+                k = int((after - first) // interval) + 1
+            current = first + k * interval
+            while True:
+                yield current
+                current += interval
+        # 有持续时间：每个基础触发时间展开为一个窗口，窗口之间可能重叠
+        pending: List[datetime] = []
+        last = None
+        bases = self.base_runs(after - self.duration)
+        next_base = next(bases, None)
+        while True:
+            while next_base is not None and (not pending or next_base <= pending[0]):
+                count = int((self.duration - timedelta(microseconds=1)) // interval) + 1
+                first = 0 if next_base > after else int((after - next_base) // interval) + 1
+                for j in range(first, count):
+                    heapq.heappush(pending, next_base + j * interval)
+                next_base = next(bases, None)
+            if not pending:
+                return
+            run = heapq.heappop(pending)
+            if run > after and run != last:
+                last = run
+                yield run
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _child(node, name: str):
+    for child in node:
+        if _local(child.tag) == name:
+            return child
+    return None
+
+
+def _text(node, *path: str) -> str:
+    for name in path:
+        if node is None:
+            return ''
+        node = _child(node, name)
+    return (node.text or '').strip() if node is not None else ''
+
+
+def _parse_dt(value: str) -> Optional[datetime]:
+    try:
+        # 去掉时区后缀，按本地时间计算
+        return datetime.fromisoformat(value[:19]) if value else None
+    except ValueError:
+        return None
+
+
+def _names(node, names: List[str], base: int = 0) -> FrozenSet[int]:
+    if node is None:
+        return frozenset()
+    return frozenset(names.index(_local(c.tag)) + base for c in node if _local(c.tag) in names)
+
+
+def _compile_one(node) -> Optional[Trigger]:
+    tag = _local(node.tag)
+    start = _parse_dt(_text(node, 'StartBoundary'))
+    if start is None or tag not in ('TimeTrigger', 'CalendarTrigger'):
+        return None
+    common = dict(
+        start=start,
+        end=_parse_dt(_text(node, 'EndBoundary')),
+        enabled=_text(node, 'Enabled').lower() != 'false',
+        interval=parse_duration(_text(node, 'Repetition', 'Interval')),
+        duration=parse_duration(_text(node, 'Repetition', 'Duration')),
+    )
+    if tag == 'TimeTrigger':
+        return Trigger('time', **common)
+    by_day = _child(node, 'ScheduleByDay')
+    if by_day is not None:
+        return Trigger('daily', days_interval=int(_text(by_day, 'DaysInterval') or 1), **common)
+    by_week = _child(node, 'ScheduleByWeek')
+    if by_week is not None:
+        return Trigger('weekly', weeks_interval=int(_text(by_week, 'WeeksInterval') or 1),
+                       weekdays=_names(_child(by_week, 'DaysOfWeek'), WEEKDAYS), **common)
+    by_month = _child(node, 'ScheduleByMonth')
+    if by_month is not None:
+        days_node = _child(by_month, 'DaysOfMonth')
+        days = tuple(sorted(int(d.text) for d in days_node if _local(d.tag) == 'Day' and d.text)) if days_node is not None else ()
+        last_day = days_node is not None and _child(days_node, 'LastDay') is not None
+        months = _names(_child(by_month, 'Months'), MONTHS, 1) or frozenset(range(1, 13))
+        return Trigger('monthly', days=days, last_day=last_day, months=months, **common)
+    by_dow = _child(node, 'ScheduleByMonthDayOfWeek')
+    if by_dow is not None:
+        weeks_node = _child(by_dow, 'Weeks')
+        weeks = frozenset(WEEKS[_local(w.tag)] for w in weeks_node if _local(w.tag) in WEEKS) if weeks_node is not None else frozenset()
+        # 部分系统把“最后一周”写成 <Week>Last</Week>
+        if weeks_node is not None:
+            weeks |= frozenset(WEEKS[w.text.strip()] for w in weeks_node if _local(w.tag) == 'Week' and w.text and w.text.strip() in WEEKS)
+        months = _names(_child(by_dow, 'Months'), MONTHS, 1) or frozenset(range(1, 13))
+        return Trigger('monthly_dow', weekdays=_names(_child(by_dow, 'DaysOfWeek'), WEEKDAYS),
+                       weeks=weeks, months=months, **common)
+    return None
+
+
+@lru_cache(maxsize=4096)
+def compile_triggers(xml: str) -> Tuple[Trigger, ...]:
+    """Compile trigger XML into :class:`Trigger` objects; memoized per XML text.
+
+    Accepts a fragment from the ``xml_builder`` ``*_trigger`` helpers, several
+    concatenated fragments, or a full task definition (``query_task_xml``).
+    """
+    text = xml.lstrip('﻿').strip()
+    if text.startswith('<?xml'):
+        text = text.split('?>', 1)[1]
+    root = ET.fromstring(f'<Triggers>{text}</Triggers>')
+    nodes = []
+    for node in root.iter():
+        if _local(node.tag) in ('TimeTrigger', 'CalendarTrigger'):
+            nodes.append(node)
+    return tuple(t for t in (_compile_one(n) for n in nodes) if t is not None)
+
+
+def iter_runs(triggers: Iterable[Trigger], after: datetime) -> Iterator[datetime]:
+    """Merge the firings of several triggers; simultaneous firings are reported once."""
+    last = None
+    for run in heapq.merge(*(t.iter_runs(after) for t in triggers)):
+        if run != last:
+            last = run
+            yield run
+
+
+def next_runs(xml: str, count: int = 10, after: Optional[datetime] = None) -> List[datetime]:
+    """Return the next ``count`` firings described by trigger or task XML."""
+    after = after or datetime.now()
+    runs = iter_runs(compile_triggers(xml), after)
+    return [run for run, _ in zip(runs, range(count))]
+
+
+def fleet_next_runs(task_xmls: Dict[str, str], count: int = 10,
+                    after: Optional[datetime] = None) -> Dict[str, List[datetime]]:
+    """Next firings for many tasks at once, keyed like ``task_xmls``."""
+    after = after or datetime.now()
+    return {name: next_runs(xml, count, after) for name, xml in task_xmls.items()}
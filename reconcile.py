@@ -0,0 +1,276 @@
+"""Bring the live ``\\PyTasks\\`` folder in line with a manifest.
+
+Each desired task is rendered with ``xml_builder`` and reduced to a
+canonical form (triggers, action and settings; registration date and other
+volatile parts dropped) whose SHA-256 is compared with the hash of the live
+task. Live hashes are cached together with a fingerprint taken from the
+bulk inventory, so a task's XML is only fetched again when its inventory
+row changed or the cached hash is older than ``max_age`` (one hour by
+default). Some settings, such as the instance policy, show up in no
+inventory column; the age limit bounds how long a change made outside the
+app to those goes unnoticed. A no-op sync therefore usually costs a single
+``schtasks`` call.
+
+Manifest entries may carry ``"enabled": false`` in addition to the
+``manifest`` keys. Usage::
+
+    python reconcile.py tasks.json            # dry run, prints the plan
+    python reconcile.py tasks.json --apply --prune
+"""
+import argparse
+import hashlib
+import json
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import scheduler_cli as sc
+from manifest import config_from_entry, iter_entries, register_tasks
+from task_records import TASK_NS, TaskRecord, parse_task_xml
+from xml_builder import TaskConfig, build_xml
+
+
+# 参与比较的节点；其余（注册日期、URI、主体等）会被 schtasks 改写或与定义无关
+SIGNIFICANT_PATHS = (
+    'RegistrationInfo/Author',
+    'Triggers',
+    'Settings/MultipleInstancesPolicy',
+    'Settings/StartWhenAvailable',
+    'Settings/RestartOnFailure',
+    'Actions/Exec',
+)
+
+# schtasks 导出时可能补上的默认值
+DEFAULT_VALUES = {('Enabled', 'true'), ('StopAtDurationEnd', 'false')}
+
+
+def canonical_node(node) -> str:
+    """Whitespace- and order-insensitive text form of an element and its children."""
+    tag = node.tag.replace(TASK_NS, '')
+    text = ' '.join((node.text or '').split())
+    children = sorted(
+        canonical_node(child) for child in node
+        if (child.tag.replace(TASK_NS, ''), ' '.join((child.text or '').split())) not in DEFAULT_VALUES
+    )
+    return f"{tag}({text})[{','.join(children)}]"
+
+
+def canonical_xml(xml: str) -> str:
+    """Return the parts of a task definition that reconcile compares."""
+    root = parse_task_xml(xml)
+    parts = []
+    for path in SIGNIFICANT_PATHS:
+        node = root.find('./' + '/'.join(TASK_NS + p for p in path.split('/')))
+        parts.append(f"{path}={canonical_node(node) if node is not None else ''}")
+    return '\n'.join(parts)
+
+
+def xml_hash(xml: str) -> str:
+    return hashlib.sha256(canonical_xml(xml).encode('utf-8')).hexdigest()
+
+
+def definition_fingerprint(record: TaskRecord) -> str:
+    # 定义变化时这些列通常也会变化；用于判断缓存的 XML 哈希是否仍可信。
+    # 实例策略等设置不在任何列中，由 HashCache.max_age 兜底
+    return '|'.join((record.task_to_run, record.start_in, record.author, record.run_as_user,
+                     record.comment, record.schedule_type, record.start_time, record.start_date,
+                     record.repeat_every))
+
+
+class HashCache:
+    """Live XML hashes keyed by task name, optionally persisted as JSON.
+
+    An entry is trusted while the task's inventory fingerprint is unchanged
+    and it is at most ``max_age`` seconds old.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, max_age: float = 3600.0):
+        self.path = Path(path) if path else None
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # 任务名（小写）-> (指纹, 哈希, 取得时间)；持久化后跨进程使用，故用墙钟时间
+        self.entries: Dict[str, Tuple[str, str, float]] = {}
+        if self.path and self.path.exists():
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            # 旧格式没有取得时间，视为已过期
+            self.entries = {name: tuple(value) for name, value in data.items() if len(value) == 3}
+
+    def get(self, name: str, fingerprint: str) -> Optional[str]:
+        with self._lock:
+            cached = self.entries.get(name.lower())
+        if cached and cached[0] == fingerprint and time.time() - cached[2] <= self.max_age:
+            return cached[1]
+        return None
+
+    def put(self, name: str, fingerprint: str, digest: str) -> None:
+        with self._lock:
+            self.entries[name.lower()] = (fingerprint, digest, time.time())
+
+    def forget(self, name: str) -> None:
+        with self._lock:
+            self.entries.pop(name.lower(), None)
+
+    def save(self) -> None:
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self.entries), encoding='utf-8')
+
+
+# 未指定缓存文件时在进程内共享
+_default_cache = HashCache()
+
+
+@dataclass
+class Action:
+    op: str  # create / update / enable / disable / delete
+    name: str
+    reason: str = ''
+    config: Optional[TaskConfig] = None
+
+
+@dataclass
+class Plan:
+    actions: List[Action] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    # 无法读取线上 XML 的任务（超时、无权限）：(任务名, 错误)，本次不做任何操作
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+    xml_queries: int = 0
+
+    def by_op(self, op: str) -> List[Action]:
+        return [a for a in self.actions if a.op == op]
+
+
+SYMBOLS = {'create': '+', 'update': '~', 'enable': '>', 'disable': '|', 'delete': '-'}
+
+
+def format_plan(plan: Plan) -> str:
+    lines = [f"{SYMBOLS[a.op]} {a.op:<7} {a.name}" + (f"  ({a.reason})" if a.reason else '')
+             for a in plan.actions]
+    counts = ', '.join(f"{len(plan.by_op(op))} {op}" for op in SYMBOLS)
+    lines += [f"! error   {name}  ({error})" for name, error in plan.errors]
+    lines.append(f"{counts}, {len(plan.unchanged)} unchanged, {len(plan.errors)} errors "
+                 f"({plan.xml_queries} XML queries)")
+    return '\n'.join(lines)
+
+
+def plan(entries: List[dict], prune: bool = False, cache: Optional[HashCache] = None) -> Plan:
+    """Compare manifest entries with the live folder and return the needed actions.
+
+    Tasks whose live XML cannot be read are listed in ``Plan.errors`` and
+    left alone rather than recreated.
+    """
+    cache = cache or _default_cache
+    result, records = sc.load_inventory(force=True)
+    if result.returncode != 0 and not sc.is_not_found(result):
+        raise RuntimeError(f"Failed to query tasks: {result.stderr.strip()}")
+    live = {r.short_name.lower(): r for r in records}
+
+    desired = []
+    for entry in entries:
+        config = config_from_entry(entry)
+        enabled = str(entry.get('enabled', True)).lower() not in ('false', '0', 'no')
+        desired.append((config, enabled, xml_hash(build_xml(config))))
+
+    # 只为缓存失效的任务并发拉取 XML
+    unknown = [(c.name, live[c.name.lower()]) for c, _, _ in desired
+               if c.name.lower() in live and cache.get(c.name, definition_fingerprint(live[c.name.lower()])) is None]
+    out = Plan(xml_queries=len(unknown))
+    failed = {}
+    for (name, record), res in zip(unknown, sc.query_task_xml_batch([n for n, _ in unknown])):
+        if res is not None and res.returncode == 0:
+            cache.put(name, definition_fingerprint(record), xml_hash(res.stdout))
+        elif res is not None and sc.is_not_found(res):
+            # 查询清单后被删除，按缺失处理
+            live.pop(name.lower(), None)
+        else:
+            # 暂时性失败不能当作定义变化，否则会用 /Create /F 重建任务
+            failed[name.lower()] = res.stderr.strip() if res is not None else 'cancelled'
+
+    for config, enabled, digest in desired:
+        if config.name.lower() in failed:
+            live.pop(config.name.lower(), None)
+            out.errors.append((config.name, failed[config.name.lower()]))
+            continue
+        record = live.pop(config.name.lower(), None)
+        if record is None:
+            out.actions.append(Action('create', config.name, config=config))
+            if not enabled:
+                out.actions.append(Action('disable', config.name))
+            continue
+        live_digest = cache.get(config.name, definition_fingerprint(record))
+        if live_digest != digest:
+            out.actions.append(Action('update', config.name, 'definition changed', config))
+            # /Create /F 会按 XML 重新启用任务
+            if not enabled:
+                out.actions.append(Action('disable', config.name))
+        elif record.enabled != enabled:
+            out.actions.append(Action('enable' if enabled else 'disable', config.name))
+        else:
+            out.unchanged.append(config.name)
+
+    if prune:
+        for record in live.values():
+            out.actions.append(Action('delete', record.short_name, 'not in manifest'))
+    out.actions.sort(key=lambda a: list(SYMBOLS).index(a.op))
+    return out
+
+
+def apply(plan: Plan, cache: Optional[HashCache] = None) -> List[Tuple[Action, Optional[subprocess.CompletedProcess]]]:
+    """Execute a plan in parallel: creates/updates, then state changes, then deletes."""
+    cache = cache or _default_cache
+    results = []
+    writes = plan.by_op('create') + plan.by_op('update')
+    if writes:
+        outcomes = register_tasks([a.config for a in writes], force_overwrite=True)
+        results += list(zip(writes, outcomes))
+    for op, enable in (('enable', True), ('disable', False)):
+        actions = plan.by_op(op)
+        if actions:
+            results += list(zip(actions, sc.change_enable_batch([a.name for a in actions], enable)))
+    deletes = plan.by_op('delete')
+    if deletes:
+        results += list(zip(deletes, sc.delete_task_batch([a.name for a in deletes])))
+    # 变更过的任务下次重新取 XML
+    for action, _ in results:
+        cache.forget(action.name)
+    cache.save()
+    return results
+
+
+def sync(manifest_path: Union[str, Path], dry_run: bool = True, prune: bool = False,
+         state_path: Optional[Union[str, Path]] = None, max_age: Optional[float] = None):
+    """Plan (and unless ``dry_run``, apply) a manifest; returns ``(plan, results)``."""
+    cache = HashCache(state_path) if state_path else _default_cache
+    if max_age is not None:
+        cache.max_age = max_age
+    the_plan = plan(list(iter_entries(manifest_path)), prune=prune, cache=cache)
+    cache.save()
+    if dry_run:
+        return the_plan, []
+    return the_plan, apply(the_plan, cache)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Reconcile \\PyTasks\\ with a CSV/JSON manifest.')
+    parser.add_argument('manifest')
+    parser.add_argument('--apply', action='store_true', help='execute the plan (default: dry run)')
+    parser.add_argument('--prune', action='store_true', help='delete live tasks missing from the manifest')
+    parser.add_argument('--state', help='JSON file caching live task hashes between runs')
+    parser.add_argument('--max-age', type=float, help='seconds a cached live hash is trusted (default 3600)')
+    opts = parser.parse_args(argv)
+
+    the_plan, results = sync(opts.manifest, dry_run=not opts.apply, prune=opts.prune, state_path=opts.state,
+                             max_age=opts.max_age)
+    print(format_plan(the_plan))
+    failed = [(a, r) for a, r in results if r is None or r.returncode != 0]
+    for action, res in failed:
+        print(f"FAILED {action.op} {action.name}: {res.stderr.strip() if res else 'cancelled'}", file=sys.stderr)
+    return 1 if failed or the_plan.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""Run history of PyTasks tasks collected from inventory snapshots.
+
+``schtasks /Query /V`` only reports the last run of a task. Every snapshot
+published by the inventory poller is passed to :meth:`RunHistory.record`,
+which compares it with the previous one and appends a row to an SQLite
+database whenever a task's Last Run Time changes. A run that was still in
+progress when it was seen has its result corrected on a later snapshot, and
+a Next Run Time that passed without a new run is recorded as missed.
+Per-day rollups are maintained on write, so the per-task summaries shown
+on the Tasks page read only a few rows per task and day.
+"""
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from task_records import TaskRecord
+
+
+DEFAULT_PATH = Path(os.environ.get('PYTASKS_HISTORY', Path.home() / '.pytasks' / 'history.sqlite3'))
+
+# 任务仍在运行时 schtasks 报告的结果码（SCHED_S_TASK_RUNNING）
+RESULT_RUNNING = 0x41301
+
+# 超过下次运行时间这么久仍未出现新的运行，记为错过
+MISSED_GRACE = timedelta(minutes=2)
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    task TEXT NOT NULL,
+    run_time TEXT NOT NULL,
+    result INTEGER,
+    PRIMARY KEY (task, run_time)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS runs_by_time ON runs (run_time);
+CREATE TABLE IF NOT EXISTS missed (
+    task TEXT NOT NULL,
+    due_time TEXT NOT NULL,
+    PRIMARY KEY (task, due_time)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS daily (
+    task TEXT NOT NULL,
+    day TEXT NOT NULL,
+    runs INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    missed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (task, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS daily_by_day ON daily (day);
+CREATE TABLE IF NOT EXISTS task_state (
+    task TEXT PRIMARY KEY,
+    last_run TEXT,
+    last_result INTEGER,
+    next_run TEXT
+) WITHOUT ROWID;
+"""
+
+
+def _fmt(value: Optional[datetime]) -> Optional[str]:
+    return value.strftime(TIME_FORMAT) if value else None
+
+
+def _failed(result: Optional[int]) -> int:
+    return int(result not in (0, None, RESULT_RUNNING))
+
+
+@dataclass
+class TaskStats:
+    runs: int = 0
+    failures: int = 0
+    missed: int = 0
+    days: int = 1
+
+    @property
+    def success_rate(self) -> Optional[float]:
+        return (self.runs - self.failures) / self.runs if self.runs else None
+
+    @property
+    def runs_per_day(self) -> float:
+        return self.runs / self.days
+
+
+class RunHistory:
+    """SQLite store of observed runs with daily rollups; safe to share between threads."""
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_PATH):
+        self.path = str(path)
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        # 上一次快照中的状态：任务 -> (上次运行, 上次结果, 下次运行)
+        self._state: Dict[str, Tuple[Optional[str], Optional[int], Optional[str]]] = {
+            task: (last_run, last_result, next_run)
+            for task, last_run, last_result, next_run in self._db.execute('SELECT * FROM task_state')
+        }
+        self.stats = {'snapshots': 0, 'runs': 0, 'updated': 0, 'missed': 0}
+
+    def record(self, records: Iterable[TaskRecord], now: Optional[datetime] = None) -> int:
+        """Compare a snapshot with the previous one and store the differences.
+
+        Returns the number of rows written (new runs, corrected results and
+        missed runs); unchanged tasks cost a dictionary lookup only.
+        """
+        now = now or datetime.now()
+        cutoff = _fmt(now - MISSED_GRACE)
+        written = 0
+        with self._lock, self._db:
+            self.stats['snapshots'] += 1
+            for record in records:
+                task = record.name
+                last_run, next_run = _fmt(record.last_run), _fmt(record.next_run)
+                state = (last_run, record.last_result, next_run)
+                prev_run, prev_result, prev_next = self._state.get(task) or (None, None, None)
+                # 上次快照预计的运行时间已过去，却没有观察到新的运行
+                overdue = (record.enabled and prev_next is not None and prev_next < cutoff
+                           and (last_run or '') < prev_next)
+                if (prev_run, prev_result, prev_next) == state and not overdue:
+                    continue
+                if last_run and last_run != prev_run:
+                    written += self._add_run(task, last_run, record.last_result)
+                elif last_run and record.last_result != prev_result:
+                    written += self._update_result(task, last_run, prev_result, record.last_result)
+                if overdue:
+                    written += self._add_missed(task, prev_next)
+                if state != (prev_run, prev_result, prev_next):
+                    self._state[task] = state
+                    self._db.execute('INSERT OR REPLACE INTO task_state VALUES (?, ?, ?, ?)', (task,) + state)
+        return written
+
+    def _add_run(self, task: str, run_time: str, result: Optional[int]) -> int:
+        cur = self._db.execute('INSERT OR IGNORE INTO runs VALUES (?, ?, ?)', (task, run_time, result))
+        if not cur.rowcount:
+            return 0
+        self._db.execute(
+            'INSERT INTO daily (task, day, runs, failures) VALUES (?, ?, 1, ?) '
+            'ON CONFLICT (task, day) DO UPDATE SET runs = runs + 1, failures = failures + excluded.failures',
+            (task, run_time[:10], _failed(result)))
+        self.stats['runs'] += 1
+        return 1
+
+    def _update_result(self, task: str, run_time: str, old: Optional[int], new: Optional[int]) -> int:
+        cur = self._db.execute('UPDATE runs SET result = ? WHERE task = ? AND run_time = ?', (new, task, run_time))
+        if not cur.rowcount:
+            return self._add_run(task, run_time, new)
+        delta = _failed(new) - _failed(old)
+        if delta:
+            self._db.execute('UPDATE daily SET failures = failures + ? WHERE task = ? AND day = ?',
+                             (delta, task, run_time[:10]))
+        self.stats['updated'] += 1
+        return 1
+
+    def _add_missed(self, task: str, due_time: str) -> int:
+        cur = self._db.execute('INSERT OR IGNORE INTO missed VALUES (?, ?)', (task, due_time))
+        if not cur.rowcount:
+            return 0
+        self._db.execute(
+            'INSERT INTO daily (task, day, missed) VALUES (?, ?, 1) '
+            'ON CONFLICT (task, day) DO UPDATE SET missed = missed + 1',
+            (task, due_time[:10]))
+        self.stats['missed'] += 1
+        return 1
+
+    def summary(self, days: int = 30, now: Optional[datetime] = None) -> Dict[str, TaskStats]:
+        """Per-task totals over the last ``days`` days, read from the daily rollups."""
+        since = ((now or datetime.now()) - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT task, SUM(runs), SUM(failures), SUM(missed) FROM daily WHERE day >= ? GROUP BY task',
+                (since,)).fetchall()
+        return {task: TaskStats(runs, failures, missed, days) for task, runs, failures, missed in rows}
+
+    def runs(self, task: str, limit: int = 50) -> List[Tuple[datetime, Optional[int]]]:
+        """Most recent runs of one task, newest first."""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT run_time, result FROM runs WHERE task = ? ORDER BY run_time DESC LIMIT ?',
+                (task, limit)).fetchall()
+        return [(datetime.strptime(t, TIME_FORMAT), result) for t, result in rows]
+
+    def prune(self, keep_days: int = 365, now: Optional[datetime] = None) -> None:
+        """Drop runs, missed runs and rollups older than ``keep_days``."""
+        cutoff = ((now or datetime.now()) - timedelta(days=keep_days)).strftime('%Y-%m-%d')
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM runs WHERE run_time < ?', (cutoff,))
+            self._db.execute('DELETE FROM missed WHERE due_time < ?', (cutoff,))
+            self._db.execute('DELETE FROM daily WHERE day < ?', (cutoff,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+_history: Optional[RunHistory] = None
+_lock = threading.Lock()
+
+
+def get_history() -> RunHistory:
+    global _history
+    with _lock:
+        if _history is None:
+            _history = RunHistory()
+        return _history
+
@@ -0,0 +1,219 @@
+"""Fleet-wide schedule timeline: how many tasks fire in each minute.
+
+Every task's triggers are expanded over a horizon into arrays of minute
+offsets (``numpy.arange`` for repeating series, broadcasting for repetition
+windows of calendar triggers) and binned with ``numpy.bincount``. The
+resulting histogram shows hotspots, and :func:`suggest_offsets` /
+:func:`suggest_offset` pick ``StartBoundary`` shifts that flatten the peak;
+apply them with :func:`xml_builder.shift_trigger`.
+"""
+import itertools
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import scheduler_cli as sc
+from preview import Trigger, compile_triggers
+from reconcile import definition_fingerprint
+from task_records import TaskRecord
+
+
+MINUTE = timedelta(minutes=1)
+DAY_MINUTES = 24 * 60
+DEFAULT_HORIZON = timedelta(days=7)
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def _minutes(delta: timedelta) -> int:
+    return int(delta // MINUTE)
+
+
+def trigger_minutes(trigger: Trigger, start: datetime, minutes: int) -> np.ndarray:
+    """Minute offsets from ``start`` (``0 <= m < minutes``) at which ``trigger`` fires."""
+    if not trigger.enabled:
+        return _EMPTY
+    end = start + minutes * MINUTE
+    step = max(_minutes(trigger.interval), 1) if trigger.interval is not None else 0
+    if step and trigger.duration is None:
+        # 无限期重复：整个序列就是一个等差数列
+        first = next(trigger.base_runs(trigger.start), None)
+        if first is None:
+            return _EMPTY
+        offset = _minutes(first - start)
+        if offset < 0:
+            offset %= step
+        out = np.arange(offset, minutes, step, dtype=np.int64)
+    else:
+        window = trigger.duration or timedelta()
+        bases = itertools.takewhile(lambda b: b < end, trigger.base_runs(start - window))
+        out = np.fromiter((_minutes(b - start) for b in bases), dtype=np.int64)
+        if step and out.size:
+            repeats = np.arange(-(-_minutes(window) // step), dtype=np.int64) * step
+            out = np.unique((out[:, None] + repeats[None, :]).ravel())
+    if trigger.end is not None:
+        out = out[out <= _minutes(trigger.end - start)]
+    return out[(out >= 0) & (out < minutes)]
+
+
+def task_minutes(xml: str, start: datetime, minutes: int) -> np.ndarray:
+    """All firings of one task (every trigger) as sorted unique minute offsets."""
+    arrays = [trigger_minutes(t, start, minutes) for t in compile_triggers(xml)]
+    if not arrays:
+        return _EMPTY
+    return np.unique(np.concatenate(arrays))
+
+
+def task_period(xml: str) -> int:
+    """Smallest repeat period of a task in minutes; shifting by it changes nothing."""
+    periods = []
+    for trigger in compile_triggers(xml):
+        if trigger.interval is not None:
+            periods.append(max(_minutes(trigger.interval), 1))
+        elif trigger.kind == 'daily':
+            periods.append(DAY_MINUTES * trigger.days_interval)
+        else:
+            periods.append(DAY_MINUTES)
+    # 偏移量限制在一天以内，避免把任务挪到别的日期
+    return min(periods + [DAY_MINUTES])
+
+
+@dataclass
+class LoadProfile:
+    start: datetime
+    minutes: int
+    histogram: np.ndarray
+    firings: Dict[str, np.ndarray]
+
+    @property
+    def peak(self) -> int:
+        return int(self.histogram.max()) if self.minutes else 0
+
+    def time_at(self, minute: int) -> datetime:
+        return self.start + int(minute) * MINUTE
+
+    def resample(self, bucket: int = 15) -> np.ndarray:
+        """Peak firings per ``bucket`` minutes, for plotting long horizons."""
+        size = -(-self.minutes // bucket) * bucket
+        padded = np.zeros(size, dtype=self.histogram.dtype)
+        padded[:self.minutes] = self.histogram
+        return padded.reshape(-1, bucket).max(axis=1)
+
+
+def load_profile(task_xmls: Dict[str, str], start: Optional[datetime] = None,
+                 horizon: timedelta = DEFAULT_HORIZON) -> LoadProfile:
+    """Expand every task over ``horizon`` and bin the firings per minute."""
+    start = (start or datetime.now()).replace(second=0, microsecond=0)
+    minutes = _minutes(horizon)
+    firings = {name: task_minutes(xml, start, minutes) for name, xml in task_xmls.items()}
+    arrays = [a for a in firings.values() if a.size]
+    histogram = np.bincount(np.concatenate(arrays), minlength=minutes) if arrays else np.zeros(minutes, dtype=np.int64)
+    return LoadProfile(start, minutes, histogram, firings)
+
+
+def hotspots(profile: LoadProfile, top: int = 10, min_count: int = 2) -> List[Tuple[datetime, int, List[str]]]:
+    """The busiest minutes as ``(time, count, task names)``, busiest first."""
+    hist = profile.histogram
+    order = np.argsort(hist, kind='stable')[::-1][:top]
+    out = []
+    for minute in order:
+        count = int(hist[minute])
+        if count < min_count:
+            break
+        names = [name for name, arr in profile.firings.items()
+                 if arr.size and arr[min(np.searchsorted(arr, minute), arr.size - 1)] == minute]
+        out.append((profile.time_at(minute), count, sorted(names)))
+    return out
+
+
+def _best_shift(firings: np.ndarray, histogram: np.ndarray, period: int) -> Tuple[int, int]:
+    """Shift in ``[0, period)`` minimising the peak (then the squared load) at ``firings``."""
+    shifts = np.arange(period, dtype=np.int64)
+    positions = firings[None, :] + shifts[:, None]
+    valid = positions < histogram.size
+    load = np.where(valid, histogram[np.minimum(positions, histogram.size - 1)], 0) + 1
+    peak = load.max(axis=1)
+    spread = (load.astype(np.float64) ** 2).sum(axis=1)
+    best = int(np.lexsort((shifts, spread, peak))[0])
+    return best, int(peak[best])
+
+
+@dataclass
+class OffsetSuggestion:
+    name: str
+    offset: timedelta
+    peak_before: int
+    peak_after: int
+
+
+def suggest_offsets(profile: LoadProfile, task_xmls: Dict[str, str],
+                    names: Optional[Iterable[str]] = None) -> List[OffsetSuggestion]:
+    """Greedily shift tasks (most frequent first) to flatten the fleet peak.
+
+    Only tasks in ``names`` are moved (all by default); suggestions with a
+    zero offset are omitted.
+    """
+    histogram = profile.histogram.copy()
+    movable = set(task_xmls) if names is None else set(names)
+    order = sorted((n for n in movable if profile.firings.get(n, _EMPTY).size),
+                   key=lambda n: -profile.firings[n].size)
+    suggestions = []
+    for name in order:
+        firings = profile.firings[name]
+        peak_before = int(histogram.max())
+        np.subtract.at(histogram, firings, 1)
+        shift, _ = _best_shift(firings, histogram, task_period(task_xmls[name]))
+        shifted = firings + shift
+        np.add.at(histogram, shifted[shifted < histogram.size], 1)
+        if shift:
+            suggestions.append(OffsetSuggestion(name, shift * MINUTE, peak_before, int(histogram.max())))
+    return suggestions
+
+
+def suggest_offset(trigger_xml: str, profile: LoadProfile) -> timedelta:
+    """Offset for a new trigger so it lands in the quietest minutes of ``profile``."""
+    firings = task_minutes(trigger_xml, profile.start, profile.minutes)
+    if not firings.size:
+        return timedelta()
+    shift, _ = _best_shift(firings, profile.histogram, task_period(trigger_xml))
+    return shift * MINUTE
+
+
+# 缓存的 XML 最长使用时间（秒）：实例策略、重试等设置不在清单列中，在别处修改后最多过这么久才会重新查询
+XML_MAX_AGE = 600.0
+
+# 任务名（小写） -> (缓存键, 取得时间, XML)
+_xml_cache: Dict[str, Tuple[str, float, str]] = {}
+
+
+def _xml_key(record: TaskRecord) -> str:
+    # 清单行指纹 + 本进程修改该任务的次数：经 scheduler_cli 的创建/修改/删除立即使缓存失效
+    return f"{definition_fingerprint(record)}|{sc.definition_generation(record.name)}"
+
+
+def fleet_xml(records: Iterable[TaskRecord], max_age: float = XML_MAX_AGE) -> Dict[str, str]:
+    """Task XML for every record, fetched in parallel and cached.
+
+    An entry is reused while the task's inventory fingerprint is unchanged,
+    the task was not created, changed or deleted through
+    :mod:`scheduler_cli` since, and it is at most ``max_age`` seconds old.
+    Entries of tasks no longer in ``records`` are dropped.
+    """
+    records = list(records)
+    now = time.monotonic()
+    current = {r.name.lower() for r in records}
+    for name in [n for n in _xml_cache if n not in current]:
+        del _xml_cache[name]
+    missing = [r for r in records
+               if _xml_cache.get(r.name.lower(), ('', 0.0, ''))[0] != _xml_key(r)
+               or now - _xml_cache[r.name.lower()][1] > max_age]
+    results = sc.query_task_xml_batch([r.short_name for r in missing])
+    for record, res in zip(missing, results):
+        if res is not None and res.returncode == 0:
+            _xml_cache[record.name.lower()] = (_xml_key(record), now, res.stdout)
+        else:
+            _xml_cache.pop(record.name.lower(), None)
+    return {r.short_name: _xml_cache[r.name.lower()][2] for r in records if r.name.lower() in _xml_cache}
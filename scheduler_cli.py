@@ -1,48 +1,147 @@
 import subprocess
+import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import metrics
+from backends import get_backend
+from executor import current_batch, get_executor
+from task_records import TaskRecord, iter_csv_records
 
 
 SCHTASKS = 'schtasks'
+TASK_FOLDER = '\\PyTasks\\'
+
+
+def task_path(task_name: str) -> str:
+    """Full scheduler path of a task; short names live in :data:`TASK_FOLDER`.
+
+    A name starting with ``\\`` is already a full path (e.g.
+    ``\\PyTasks\\team_a\\backup``) and is returned unchanged.
+    """
+    return task_name if task_name.startswith('\\') else f"{TASK_FOLDER}{task_name}"
 
 
-def run_command(args: List[str]) -> subprocess.CompletedProcess:
-    """Run a schtasks command and return the process result."""
-    return subprocess.run(args, capture_output=True, text=True, shell=True)
+def folder_path(folder: str) -> str:
+    """Normalise a folder to ``\\A\\B\\`` form."""
+    folder = folder.strip().strip('\\')
+    return f"\\{folder}\\" if folder else '\\'
+
+
+def folder_of(task_name: str) -> str:
+    """Folder containing a task, in :func:`folder_path` form."""
+    return task_path(task_name).rsplit('\\', 1)[0] + '\\'
+
+
+def run_command(args: List[str], timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+    """Run a schtasks command through the active backend and return the result.
+
+    Inside an executor batch the batch timeout applies when ``timeout`` is
+    not given. Every call is timed and reported to :mod:`metrics`.
+    """
+    batch = current_batch()
+    if timeout is None and batch is not None:
+        timeout = batch.timeout
+    started = time.perf_counter()
+    result = get_backend().run(args, timeout)
+    metrics.observe(args, time.perf_counter() - started, result.returncode,
+                    len(result.stdout or '') + len(result.stderr or ''))
+    return result
+
+
+def is_not_found(result: subprocess.CompletedProcess) -> bool:
+    """Whether a failed call means the task or folder does not exist (not a timeout or access error)."""
+    stderr = result.stderr or ''
+    return result.returncode != 0 and ('cannot find' in stderr.lower() or '找不到' in stderr)
 
 
 def create_task(xml_path: Path, task_name: str, force_overwrite: bool = False) -> subprocess.CompletedProcess:
     """创建任务，可选择是否强制覆盖同名任务"""
     if force_overwrite:
-        return run_command([SCHTASKS, '/Create', '/XML', str(xml_path), '/TN', f"\\PyTasks\\{task_name}", '/F'])
+        result = run_command([SCHTASKS, '/Create', '/XML', str(xml_path), '/TN', task_path(task_name), '/F'])
     else:
         # 不使用 /F 参数，如果任务存在会报错
-        return run_command([SCHTASKS, '/Create', '/XML', str(xml_path), '/TN', f"\\PyTasks\\{task_name}"])
+        result = run_command([SCHTASKS, '/Create', '/XML', str(xml_path), '/TN', task_path(task_name)])
+    if result.returncode == 0:
+        # schtasks 会自动创建缺少的文件夹
+        folder_cache.mark(folder_of(task_name))
+        _touch(task_name)
+        _invalidate(task_name)
+    return result
+
+
+def create_task_from_xml(xml_content: str, task_name: str, force_overwrite: bool = False) -> subprocess.CompletedProcess:
+    """Write the XML to a UTF-16 temp file, register it and remove the file."""
+    # Windows `schtasks` requires the XML file to be UTF-16 encoded
+    with tempfile.NamedTemporaryFile("w", encoding="utf-16", delete=False, suffix=".xml") as f:
+        f.write(xml_content)
+        temp_path = Path(f.name)
+    try:
+        return create_task(temp_path, task_name, force_overwrite)
+    finally:
+        try:
+            temp_path.unlink()
+        except OSError:
+            pass
 
 
 def task_exists(task_name: str) -> bool:
     """检查任务是否存在"""
-    result = run_command([SCHTASKS, '/Query', '/TN', f"\\PyTasks\\{task_name}", '/FO', 'LIST'])
+    result = run_command([SCHTASKS, '/Query', '/TN', task_path(task_name), '/FO', 'LIST'])
     return result.returncode == 0
 
 
 def delete_task(task_name: str) -> subprocess.CompletedProcess:
-    return run_command([SCHTASKS, '/Delete', '/TN', f"\\PyTasks\\{task_name}", '/F'])
+    result = run_command([SCHTASKS, '/Delete', '/TN', task_path(task_name), '/F'])
+    if result.returncode == 0:
+        _touch(task_name)
+        cache = _cache_for(task_name)
+        if cache is not None:
+            cache.discard(task_name)
+    return result
 
 
 def run_task(task_name: str) -> subprocess.CompletedProcess:
-    return run_command([SCHTASKS, '/Run', '/TN', f"\\PyTasks\\{task_name}"])
+    result = run_command([SCHTASKS, '/Run', '/TN', task_path(task_name)])
+    if result.returncode == 0:
+        _invalidate(task_name)
+    return result
 
 
 def query_task(task_name: str) -> subprocess.CompletedProcess:
-    return run_command([SCHTASKS, '/Query', '/TN', f"\\PyTasks\\{task_name}", '/V', '/FO', 'LIST'])
+    return run_command([SCHTASKS, '/Query', '/TN', task_path(task_name), '/V', '/FO', 'LIST'])
 
 
 def query_task_xml(task_name: str) -> subprocess.CompletedProcess:
-    return run_command([SCHTASKS, '/Query', '/TN', f"\\PyTasks\\{task_name}", '/XML'])
+    return run_command([SCHTASKS, '/Query', '/TN', task_path(task_name), '/XML'])
+
+
+def query_inventory(folder: str = TASK_FOLDER) -> subprocess.CompletedProcess:
+    """Query verbose details of every task in one folder in a single scoped call.
+
+    Subfolders are not included; query them separately (see :func:`load_folders`).
+    """
+    return run_command([SCHTASKS, '/Query', '/TN', folder_path(folder), '/V', '/FO', 'CSV'])
+
+
+def query_task_record(task_name: str) -> subprocess.CompletedProcess:
+    """Query one task in the same CSV format as :func:`query_inventory`."""
+    return run_command([SCHTASKS, '/Query', '/TN', task_path(task_name), '/V', '/FO', 'CSV'])
+
+
+def iter_inventory(lines: Iterable[str]) -> Iterator[TaskRecord]:
+    """Stream-parse `/V /FO CSV` output into :class:`TaskRecord` objects."""
+    return iter_csv_records(lines)
 
 
 def query_all_tasks() -> subprocess.CompletedProcess:
+    """Legacy inventory path: one full listing plus one query per task.
+
+    Kept for comparison in ``benchmarks/bench_inventory.py``; use
+    :func:`query_inventory` instead.
+    """
     # 先简单查询所有任务，过滤出 PyTasks 相关的，然后再逐个获取详细信息
     all_result = run_command([SCHTASKS, '/Query', '/FO', 'LIST'])
     if all_result.returncode == 0 and all_result.stdout:
@@ -71,7 +170,7 @@ def query_all_tasks() -> subprocess.CompletedProcess:
         # 逐个查询每个PyTasks任务的详细信息
         all_detailed_output = []
         for task_name in pytask_names:
-            detailed_result = run_command([SCHTASKS, '/Query', '/TN', f"\\PyTasks\\{task_name}", '/V', '/FO', 'LIST'])
+            detailed_result = run_command([SCHTASKS, '/Query', '/TN', task_path(task_name), '/V', '/FO', 'LIST'])
             if detailed_result.returncode == 0 and detailed_result.stdout:
                 all_detailed_output.append(detailed_result.stdout.strip())
         
@@ -100,7 +199,20 @@ def query_all_tasks() -> subprocess.CompletedProcess:
 
 def change_enable(task_name: str, enable: bool) -> subprocess.CompletedProcess:
     flag = '/ENABLE' if enable else '/DISABLE'
-    return run_command([SCHTASKS, '/Change', '/TN', f"\\PyTasks\\{task_name}", flag])
+    result = run_command([SCHTASKS, '/Change', '/TN', task_path(task_name), flag])
+    if result.returncode == 0:
+        _touch(task_name)
+        _invalidate(task_name)
+    return result
+
+
+def change_task(task_name: str, options: List[str]) -> subprocess.CompletedProcess:
+    """``schtasks /Change`` with the given switches (e.g. ``['/TR', cmd, '/ST', '09:30']``)."""
+    result = run_command([SCHTASKS, '/Change', '/TN', task_path(task_name)] + list(options))
+    if result.returncode == 0:
+        _touch(task_name)
+        _invalidate(task_name)
+    return result
 
 
 def list_all_tasks() -> subprocess.CompletedProcess:
@@ -108,43 +220,313 @@ def list_all_tasks() -> subprocess.CompletedProcess:
     return run_command([SCHTASKS, '/Query', '/FO', 'LIST'])
 
 
-def query_task_folder() -> subprocess.CompletedProcess:
-    """查询 PyTasks 文件夹是否存在"""
-    # 通过查询所有任务来检查是否有 PyTasks 文件夹
-    all_result = run_command([SCHTASKS, '/Query', '/FO', 'LIST'])
-    if all_result.returncode == 0 and all_result.stdout:
-        # 检查输出中是否包含 PyTasks 文件夹标识
-        output_lines = all_result.stdout.splitlines()
-        has_pytasks_folder = False
-        
-        for line in output_lines:
-            # 检查是否有 "文件夹: \PyTasks" 这样的行
-            if ('文件夹:' in line and '\\PyTasks' in line) or ('Folder:' in line and '\\PyTasks' in line):
-                has_pytasks_folder = True
-                break
-            # 或者检查是否有 PyTasks 任务（间接证明文件夹存在）
-            if '\\PyTasks\\' in line:
-                has_pytasks_folder = True
-                break
-        
-        if has_pytasks_folder:
-            # 创建成功的结果
-            result = subprocess.CompletedProcess(
-                args=all_result.args,
-                returncode=0,
-                stdout='PyTasks folder exists',
-                stderr=''
-            )
+def query_task_folder(folder: str = TASK_FOLDER) -> subprocess.CompletedProcess:
+    """查询文件夹是否存在（只查询该文件夹，结果有缓存）"""
+    folder = folder_path(folder)
+    args = [SCHTASKS, '/Query', '/TN', folder]
+    exists = folder_cache.exists(folder)
+    if exists:
+        return subprocess.CompletedProcess(args, 0, f'{folder} folder exists', '')
+    if exists is None:
+        return subprocess.CompletedProcess(args, 1, '', f'{folder} folder could not be queried')
+    return subprocess.CompletedProcess(args, 1, '', f'{folder} folder does not exist')
+
+
+def _batch(func: Callable[..., subprocess.CompletedProcess], task_names: Iterable[str], *args) -> list:
+    return get_executor().map(lambda name: func(name, *args), task_names)
+
+
+# 批量版本：通过共享执行器并发执行，结果顺序与输入一致；被取消的项为 None
+def create_task_batch(items: Iterable[Tuple[Path, str]], force_overwrite: bool = False) -> List[Optional[subprocess.CompletedProcess]]:
+    """Register ``(xml_path, task_name)`` pairs concurrently."""
+    return get_executor().map(lambda item: create_task(item[0], item[1], force_overwrite), items)
+
+
+def query_task_batch(task_names: Iterable[str]) -> List[Optional[subprocess.CompletedProcess]]:
+    return _batch(query_task, task_names)
+
+
+def query_task_xml_batch(task_names: Iterable[str]) -> List[Optional[subprocess.CompletedProcess]]:
+    return _batch(query_task_xml, task_names)
+
+
+def change_enable_batch(task_names: Iterable[str], enable: bool) -> List[Optional[subprocess.CompletedProcess]]:
+    return _batch(change_enable, task_names, enable)
+
+
+def run_task_batch(task_names: Iterable[str]) -> List[Optional[subprocess.CompletedProcess]]:
+    return _batch(run_task, task_names)
+
+
+def delete_task_batch(task_names: Iterable[str]) -> List[Optional[subprocess.CompletedProcess]]:
+    return _batch(delete_task, task_names)
+
+
+def task_exists_batch(task_names: Iterable[str]) -> List[Optional[bool]]:
+    return _batch(task_exists, task_names)
+
+
+class InventoryCache:
+    """Process-wide cache of the parsed inventory of one folder.
+
+    The full inventory is reloaded with :func:`query_inventory` once it is
+    older than ``ttl`` seconds. Mutations made through this module only
+    touch the affected entries: deleted tasks are dropped in place, other
+    changes mark the task dirty so the next read re-queries just that task.
+    Streamlit imports the module once per process, so all browser sessions
+    share the same cache. :func:`get_folder_cache` returns the cache of any
+    other folder; :data:`inventory_cache` is the one of :data:`TASK_FOLDER`.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entry_refreshes: int = 3, folder: str = TASK_FOLDER):
+        self.ttl = ttl
+        self.folder = folder_path(folder)
+        # 脏条目过多时（如批量操作后）一次全量查询比逐个查询更便宜
+        self.max_entry_refreshes = max_entry_refreshes
+        self._lock = threading.Lock()
+        self._records: Dict[str, TaskRecord] = {}
+        self._result: Optional[subprocess.CompletedProcess] = None
+        self._valid = False
+        self._loaded_at = 0.0
+        # 每次内容变化都递增，供界面复用基于快照构建的索引
+        self.version = 0
+        self._dirty = set()
+        self.stats = {
+            'hits': 0,             # 直接由缓存返回
+            'misses': 0,           # 首次加载或被强制刷新
+            'stale': 0,            # 超过 TTL 后的重新加载
+            'entry_refreshes': 0,  # 单任务的定向查询
+            'subprocess_calls': 0,
+            'saved_calls': 0,      # 相比每次都全量查询节省的子进程数
+        }
+
+    def get(self, force: bool = False) -> Tuple[subprocess.CompletedProcess, List[TaskRecord]]:
+        """Return ``(result, records)``; ``result`` is the last full query."""
+        with self._lock:
+            if force or not self._valid:
+                self.stats['misses'] += 1
+                self._reload()
+            elif time.monotonic() - self._loaded_at > self.ttl:
+                self.stats['stale'] += 1
+                self._reload()
+            elif len(self._dirty) > self.max_entry_refreshes:
+                self.stats['misses'] += 1
+                self._reload()
+            else:
+                self.stats['hits'] += 1
+                # 只有一个脏条目时定向查询与全量查询的开销相同，多个时更贵；不计负数
+                self.stats['saved_calls'] += max(0, 1 - len(self._dirty))
+                dirty, self._dirty = sorted(self._dirty), set()
+                for path in dirty:
+                    self._refresh_entry(path)
+            return self._result, list(self._records.values())
+
+    def invalidate(self, task_name: Optional[str] = None) -> None:
+        """Mark one task (or, without a name, the whole inventory) stale."""
+        with self._lock:
+            if task_name is None:
+                self._valid = False
+            elif self._valid:
+                self._dirty.add(task_path(task_name))
+
+    def refresh(self, task_name: str) -> Tuple[subprocess.CompletedProcess, Optional[TaskRecord]]:
+        """Re-query one task now and patch it into the cache.
+
+        Returns ``(result, record)``; ``record`` is ``None`` when the task is
+        gone. When the query failed for another reason the cached record is
+        returned unchanged and the task stays dirty.
+        """
+        path = task_path(task_name)
+        with self._lock:
+            self._dirty.discard(path)
+            result = self._refresh_entry(path)
+            return result, self._records.get(path.lower())
+
+    def discard(self, task_name: str) -> None:
+        """Drop a deleted task from the cached inventory."""
+        path = task_path(task_name)
+        with self._lock:
+            if self._records.pop(path.lower(), None) is not None:
+                self.version += 1
+            self._dirty.discard(path)
+
+    def _reload(self) -> None:
+        self.stats['subprocess_calls'] += 1
+        result = query_inventory(self.folder)
+        self._dirty.clear()
+        self._result = result
+        # 失败结果不缓存，下次读取时重试
+        self._valid = result.returncode == 0
+        if self._valid or is_not_found(result):
+            folder_cache.mark(self.folder, self._valid)
+        if self._valid:
+            self._records = {r.name.lower(): r for r in iter_inventory(result.stdout)}
         else:
-            # 创建失败的结果（文件夹不存在）
-            result = subprocess.CompletedProcess(
-                args=all_result.args,
-                returncode=1,
-                stdout='',
-                stderr='PyTasks folder does not exist'
-            )
-    else:
-        # 如果查询全部任务都失败了，返回原始错误
-        result = all_result
-    
-    return result
+            self._records = {}
+        self._loaded_at = time.monotonic()
+        self.version += 1
+
+    def _refresh_entry(self, path: str) -> subprocess.CompletedProcess:
+        self.stats['subprocess_calls'] += 1
+        self.stats['entry_refreshes'] += 1
+        result = query_task_record(path)
+        if result.returncode != 0 and not is_not_found(result):
+            # 超时、无权限等失败不代表任务已删除：保留旧记录，下次读取时重查
+            self._dirty.add(path)
+            return result
+        records = list(iter_inventory(result.stdout)) if result.returncode == 0 else []
+        if records:
+            self._records[path.lower()] = records[0]
+        else:
+            self._records.pop(path.lower(), None)
+        self.version += 1
+        return result
+
+
+class FolderCache:
+    """Cached existence of scheduler folders.
+
+    Each unknown folder costs one scoped ``/Query /TN <folder>`` instead of
+    a dump of the whole system task list. Missing folders are re-checked
+    after ``negative_ttl`` seconds, existing ones after ``ttl``. Only the
+    scheduler's not-found error counts as missing; other failures (timeout,
+    access denied) are not cached. Folder
+    queries made by :class:`InventoryCache` and task creation update the
+    cache for free.
+    """
+
+    def __init__(self, ttl: float = 300.0, negative_ttl: float = 30.0):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        # 文件夹（小写）-> (是否存在, 检查时间, 原始写法)
+        self._known: Dict[str, Tuple[bool, float, str]] = {}
+        self.stats = {'hits': 0, 'queries': 0}
+
+    def _cached(self, folder: str) -> Optional[bool]:
+        entry = self._known.get(folder.lower())
+        if entry is None:
+            return None
+        exists, checked, _ = entry
+        if time.monotonic() - checked > (self.ttl if exists else self.negative_ttl):
+            return None
+        return exists
+
+    def known(self, folder: str) -> Optional[bool]:
+        """Cached answer without querying; ``None`` when unknown or expired."""
+        with self._lock:
+            return self._cached(folder_path(folder))
+
+    def exists(self, folder: str, force: bool = False) -> Optional[bool]:
+        """Whether ``folder`` exists; ``None`` when the query failed for another reason."""
+        folder = folder_path(folder)
+        with self._lock:
+            cached = None if force else self._cached(folder)
+            if cached is not None:
+                self.stats['hits'] += 1
+                return cached
+            self.stats['queries'] += 1
+        result = run_command([SCHTASKS, '/Query', '/TN', folder, '/FO', 'CSV', '/NH'])
+        if result.returncode != 0 and not is_not_found(result):
+            return None
+        self.mark(folder, result.returncode == 0)
+        return result.returncode == 0
+
+    def exists_many(self, folders: Iterable[str]) -> Dict[str, Optional[bool]]:
+        """Check several folders; unknown ones are queried in parallel."""
+        folders = [folder_path(f) for f in folders]
+        return dict(zip(folders, get_executor().map(self.exists, folders)))
+
+    def mark(self, folder: str, exists: bool = True) -> None:
+        folder = folder_path(folder)
+        with self._lock:
+            self._known[folder.lower()] = (exists, time.monotonic(), folder)
+
+    def known_folders(self) -> List[str]:
+        """Folders last seen existing, in their original spelling."""
+        with self._lock:
+            return [entry[2] for entry in self._known.values() if entry[0]]
+
+    def invalidate(self, folder: Optional[str] = None) -> None:
+        with self._lock:
+            if folder is None:
+                self._known.clear()
+            else:
+                self._known.pop(folder_path(folder).lower(), None)
+
+
+folder_cache = FolderCache()
+inventory_cache = InventoryCache()
+_folder_caches: Dict[str, InventoryCache] = {inventory_cache.folder.lower(): inventory_cache}
+_folder_caches_lock = threading.Lock()
+
+
+def get_folder_cache(folder: str) -> InventoryCache:
+    """Return the shared inventory cache of ``folder``, creating it on first use."""
+    key = folder_path(folder).lower()
+    with _folder_caches_lock:
+        cache = _folder_caches.get(key)
+        if cache is None:
+            cache = _folder_caches[key] = InventoryCache(inventory_cache.ttl, inventory_cache.max_entry_refreshes, folder)
+        return cache
+
+
+def _cache_for(task_name: str) -> Optional[InventoryCache]:
+    return _folder_caches.get(folder_of(task_name).lower())
+
+
+# 任务路径（小写） -> 经本模块修改定义的次数（创建、/Change、删除）
+_generations: Dict[str, int] = {}
+
+
+def _touch(task_name: str) -> None:
+    key = task_path(task_name).lower()
+    _generations[key] = _generations.get(key, 0) + 1
+
+
+def definition_generation(task_name: str) -> int:
+    """How often this process changed a task's definition; key caches of its XML on it."""
+    return _generations.get(task_path(task_name).lower(), 0)
+
+
+def _invalidate(task_name: str) -> None:
+    cache = _cache_for(task_name)
+    if cache is not None:
+        cache.invalidate(task_name)
+
+
+def refresh_task(task_name: str) -> Tuple[subprocess.CompletedProcess, Optional[TaskRecord]]:
+    """``(result, record)`` of one task with a single scoped query, patched into its folder's cache."""
+    return get_folder_cache(folder_of(task_name)).refresh(task_name)
+
+
+def load_inventory(force: bool = False) -> Tuple[subprocess.CompletedProcess, List[TaskRecord]]:
+    """Return the cached inventory, reloading it when stale or forced."""
+    return inventory_cache.get(force)
+
+
+def load_folder(folder: str, force: bool = False) -> Tuple[subprocess.CompletedProcess, List[TaskRecord]]:
+    """Return the cached inventory of one folder (one scoped query when stale)."""
+    return get_folder_cache(folder).get(force)
+
+
+def load_folders(folders: Iterable[str], force: bool = False) -> Dict[str, Tuple[subprocess.CompletedProcess, List[TaskRecord]]]:
+    """Load several folders in parallel, one scoped query per stale folder.
+
+    Folders known not to exist are answered from :data:`folder_cache`
+    without a query.
+    """
+    folders = list(dict.fromkeys(folder_path(f) for f in folders))
+
+    def load(folder: str):
+        if not force and folder_cache.known(folder) is False:
+            args = [SCHTASKS, '/Query', '/TN', folder]
+            return subprocess.CompletedProcess(args, 1, '', f'{folder} folder does not exist'), []
+        return load_folder(folder, force)
+
+    return dict(zip(folders, get_executor().map(load, folders)))
+
+
+def inventory_cache_stats() -> Dict[str, int]:
+    """Return a copy of the inventory cache counters."""
+    return dict(inventory_cache.stats)
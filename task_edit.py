@@ -0,0 +1,221 @@
+"""Edit live tasks with the cheapest scheduler mutation.
+
+:func:`plan_edit` parses the live XML back into a
+:class:`xml_builder.TaskConfig`, compares it field by field with the edited
+config (the command as the rendered command line, durations by value) and
+picks one of:
+
+* ``none``   – nothing changed;
+* ``change`` – one ``schtasks /Change`` carrying every supported switch:
+  ``/TR`` (command, script, arguments, launcher, log file), ``/ST``/``/SD``
+  (start time/date of a single trigger), ``/RI`` (its repetition interval)
+  and ``/ENABLE``/``/DISABLE``;
+* ``create`` – ``/Create /F`` with the re-rendered XML, when anything else
+  changed (trigger structure, working directory, settings). The enabled
+  state is restored afterwards if the task was disabled.
+
+The task keeps its name either way, so its run history is preserved.
+"""
+import re
+import subprocess
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+import scheduler_cli as sc
+from executor import get_executor
+from launcher import LAUNCHER_PATH, journal_path
+from preview import parse_duration
+from reconcile import canonical_node
+from task_records import parse_task_xml
+from xml_builder import TaskConfig, build_xml, config_from_xml
+
+
+# /Change /SD 的日期格式随系统区域而变；非 en-US 系统需相应修改
+CHANGE_DATE_FORMAT = '%m/%d/%Y'
+CHANGE_TIME_FORMAT = '%H:%M'
+
+# schtasks 对 /TR 的长度限制
+MAX_TR_LENGTH = 261
+
+# 可由 /Change /TR 修改的字段
+COMMAND_FIELDS = ('python_path', 'script_path', 'args', 'launcher', 'log_path')
+
+# 按时长比较的字段：PT1H 与 PT60M 相同
+DURATION_FIELDS = ('retry_interval',)
+
+
+@dataclass
+class EditPlan:
+    name: str
+    op: str  # none / change / create
+    config: TaskConfig
+    enabled: bool
+    changes: List[str] = field(default_factory=list)
+    switches: List[str] = field(default_factory=list)
+    reason: str = ''
+
+    def describe(self) -> str:
+        if self.op == 'none':
+            return '无变化'
+        detail = ', '.join(self.changes)
+        if self.op == 'change':
+            return f"/Change {' '.join(self.switches)}（{detail}）"
+        return f"/Create /F（{detail}；{self.reason}）"
+
+
+def parse_triggers(trigger_xml: str) -> list:
+    """Trigger elements of a trigger XML fragment (namespace-free or not)."""
+    root = parse_task_xml(f'<Triggers>{trigger_xml}</Triggers>')
+    return list(root)
+
+
+def find_element(node, name: str):
+    """First descendant of ``node`` with the local tag ``name``."""
+    for elem in node.iter():
+        if elem.tag.rsplit('}', 1)[-1] == name:
+            return elem
+    return None
+
+
+def _same_duration(a: Optional[str], b: Optional[str]) -> bool:
+    if a == b:
+        return True
+    a, b = parse_duration((a or '').strip()), parse_duration((b or '').strip())
+    return a is not None and a == b
+
+
+def _shape(trigger) -> str:
+    """Canonical form of a trigger without its start boundary and repetition interval."""
+    return re.sub(r'(StartBoundary|Interval)\([^)]*\)', r'\1()', canonical_node(trigger))
+
+
+def _trigger_switches(live_xml: str, desired_xml: str) -> Optional[List[str]]:
+    """``/Change`` switches turning the live trigger into the desired one, ``None`` if impossible."""
+    live, desired = parse_triggers(live_xml), parse_triggers(desired_xml)
+    if [canonical_node(t) for t in live] == [canonical_node(t) for t in desired]:
+        return []
+    # /ST /SD /RI 只作用于一个触发器，且结构必须一致
+    if len(live) != 1 or len(desired) != 1 or _shape(live[0]) != _shape(desired[0]):
+        return None
+    switches = []
+    live_start, new_start = find_element(live[0], 'StartBoundary'), find_element(desired[0], 'StartBoundary')
+    if live_start is not None and new_start is not None and live_start.text != new_start.text:
+        old = datetime.fromisoformat(live_start.text.strip()[:19])
+        new = datetime.fromisoformat(new_start.text.strip()[:19])
+        # /ST 只精确到分钟
+        if new.second:
+            return None
+        if new.time() != old.time():
+            switches += ['/ST', new.strftime(CHANGE_TIME_FORMAT)]
+        if new.date() != old.date():
+            switches += ['/SD', new.strftime(CHANGE_DATE_FORMAT)]
+    live_interval, new_interval = find_element(live[0], 'Interval'), find_element(desired[0], 'Interval')
+    if (live_interval is not None and new_interval is not None
+            and not _same_duration(live_interval.text, new_interval.text)):
+        interval = parse_duration(new_interval.text.strip())
+        if interval is None or interval.total_seconds() % 60:
+            return None
+        switches += ['/RI', str(int(interval.total_seconds() // 60))]
+    return switches
+
+
+def task_to_run(config: TaskConfig) -> str:
+    """The ``/TR`` command line equivalent to the template's Exec action."""
+    prefix = ''
+    if config.launcher or config.log_path:
+        log = f' --log "{config.log_path}"' if config.log_path else ''
+        prefix = f'"{LAUNCHER_PATH}" --journal "{journal_path(config.name)}"{log} -- '
+    command = config.python_path if config.python_path.startswith('"') else f'"{config.python_path}"'
+    return f"{command} {prefix}{config.script_path} {config.args}".strip()
+
+
+def plan_edit(name: str, live_xml: str, live_enabled: bool, desired: TaskConfig,
+              enabled: Optional[bool] = None) -> EditPlan:
+    """Compare the live definition with ``desired`` and choose the mutation."""
+    enabled = live_enabled if enabled is None else enabled
+    live, _ = config_from_xml(live_xml, name)
+    plan = EditPlan(name, 'none', desired, enabled)
+    changed = [f.name for f in fields(TaskConfig)
+               if f.name not in ('name', 'trigger_xml') + COMMAND_FIELDS + DURATION_FIELDS
+               and str(getattr(live, f.name)) != str(getattr(desired, f.name))]
+    changed += [f for f in DURATION_FIELDS if not _same_duration(getattr(live, f), getattr(desired, f))]
+    # 模板中脚本路径不带引号，含空格的路径解析回来时会与参数错位；按渲染出的命令行比较
+    if task_to_run(live) != task_to_run(desired):
+        # 列出变化的字段时与同样解析回来的期望值比较，避免错位造成误报
+        parsed, _ = config_from_xml(build_xml(desired), name)
+        changed += [f for f in COMMAND_FIELDS if str(getattr(live, f)) != str(getattr(parsed, f))] or ['command']
+    switches = _trigger_switches(live.trigger_xml, desired.trigger_xml)
+    if switches is None or switches:
+        changed.append('trigger')
+    plan.changes = changed + (['enabled'] if enabled != live_enabled else [])
+    if not plan.changes:
+        return plan
+
+    other = [f for f in changed if f not in COMMAND_FIELDS + ('command', 'trigger')]
+    tr = task_to_run(desired)
+    if other or switches is None or len(tr) > MAX_TR_LENGTH:
+        plan.op = 'create'
+        plan.reason = ('触发器结构变化' if switches is None else
+                       f"{', '.join(other)} 无法用 /Change 修改" if other else '/TR 超过长度限制')
+        return plan
+    plan.op = 'change'
+    if any(f in COMMAND_FIELDS + ('command',) for f in changed):
+        plan.switches += ['/TR', tr]
+    plan.switches += switches or []
+    if enabled != live_enabled:
+        plan.switches.append('/ENABLE' if enabled else '/DISABLE')
+    return plan
+
+
+def apply_edit(plan: EditPlan) -> Optional[subprocess.CompletedProcess]:
+    """Execute a plan; returns the last scheduler result (``None`` for ``none``)."""
+    if plan.op == 'none':
+        return None
+    if plan.op == 'change':
+        return sc.change_task(plan.name, plan.switches)
+    res = sc.create_task_from_xml(build_xml(plan.config), plan.name, force_overwrite=True)
+    # /Create /F 按 XML 重新启用任务
+    if res.returncode == 0 and not plan.enabled:
+        res = sc.change_enable(plan.name, False)
+    return res
+
+
+def edit_task(name: str, desired: TaskConfig, enabled: Optional[bool] = None,
+              live_enabled: Optional[bool] = None) -> Tuple[EditPlan, Optional[subprocess.CompletedProcess]]:
+    """Fetch the live XML, plan and apply one edit."""
+    res = sc.query_task_xml(name)
+    if res.returncode != 0:
+        raise ValueError(f"Cannot read {name}: {res.stderr.strip()}")
+    if live_enabled is None:
+        _, live_enabled = config_from_xml(res.stdout, name)
+    plan = plan_edit(name, res.stdout, live_enabled, desired, enabled)
+    return plan, apply_edit(plan)
+
+
+def edit_tasks(edits: Iterable[Tuple[str, TaskConfig, Optional[bool]]]) -> list:
+    """Apply ``(name, desired, enabled)`` edits in parallel; results keep input order.
+
+    Each task costs one XML query plus one mutation (two when a disabled
+    task has to be recreated).
+    """
+    def run(item):
+        name, desired, enabled = item
+        try:
+            return edit_task(name, desired, enabled)
+        except ValueError as exc:
+            return None, subprocess.CompletedProcess([], 1, '', str(exc))
+
+    return get_executor().map(run, list(edits))
+
+
+def set_trigger_start(trigger_xml: str, start: datetime) -> str:
+    """Replace the first ``StartBoundary`` of a trigger fragment."""
+    return re.sub(r'<StartBoundary>[^<]*</StartBoundary>',
+                  f'<StartBoundary>{start.isoformat()}</StartBoundary>', trigger_xml, count=1)
+
+
+def set_trigger_interval(trigger_xml: str, minutes: int) -> str:
+    """Replace the first repetition ``Interval`` of a trigger fragment."""
+    return re.sub(r'(<Repetition>\s*<Interval>)[^<]*(</Interval>)', rf'\g<1>PT{int(minutes)}M\g<2>',
+                  trigger_xml, count=1)
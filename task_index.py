@@ -0,0 +1,74 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from task_records import TaskRecord
+
+
+RESULT_FILTERS = ('ok', 'failed', 'never')
+
+
+class TaskIndex:
+    """Search index over one inventory snapshot.
+
+    Status and next-run lookups use precomputed buckets and a sorted list,
+    so filtering does not rescan every record; matches keep inventory order.
+    """
+
+    def __init__(self, records: Iterable[TaskRecord]):
+        self.records: List[TaskRecord] = list(records)
+        self._names = [r.name.lower() for r in self.records]
+        self._by_status: Dict[str, List[int]] = defaultdict(list)
+        for i, record in enumerate(self.records):
+            self._by_status[record.status].append(i)
+        timed = sorted((r.next_run, i) for i, r in enumerate(self.records) if r.next_run)
+        self._next_runs = [t for t, _ in timed]
+        self._next_run_ids = [i for _, i in timed]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def statuses(self) -> List[str]:
+        return sorted(s for s in self._by_status if s)
+
+    def search(self, text: str = '', statuses: Sequence[str] = (), result: Optional[str] = None,
+               next_run_before: Optional[datetime] = None) -> List[TaskRecord]:
+        """Return the records matching every given filter.
+
+        ``text`` is a case-insensitive substring of the task path, ``result``
+        is one of ``RESULT_FILTERS`` and ``next_run_before`` keeps tasks whose
+        next run is due before that time.
+        """
+        if result is not None and result not in RESULT_FILTERS:
+            raise ValueError(f"result must be one of {RESULT_FILTERS}")
+        candidates = None
+        if next_run_before is not None:
+            candidates = set(self._next_run_ids[:bisect_right(self._next_runs, next_run_before)])
+        if statuses:
+            by_status = {i for s in statuses for i in self._by_status.get(s, ())}
+            candidates = by_status if candidates is None else candidates & by_status
+        ids = range(len(self.records)) if candidates is None else sorted(candidates)
+        text = text.strip().lower()
+        out = []
+        for i in ids:
+            if text and text not in self._names[i]:
+                continue
+            if result is not None and not _result_matches(self.records[i], result):
+                continue
+            out.append(self.records[i])
+        return out
+
+
+def _result_matches(record: TaskRecord, result: str) -> bool:
+    if result == 'never':
+        return record.last_run is None
+    if record.last_run is None:
+        return False
+    return (record.last_result == 0) == (result == 'ok')
+
+
+def paginate(items: Sequence, page: int, page_size: int) -> Sequence:
+    """Return the 1-based ``page`` of ``items``."""
+    start = (max(page, 1) - 1) * page_size
+    return items[start:start + page_size]
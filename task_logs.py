@@ -0,0 +1,195 @@
+"""Incremental reading and bounded search of task log files.
+
+A task's log is the file its launcher redirects the script's output to
+(``TaskConfig.log_path``, ``--log`` in the task's arguments) or, for scripts
+that write their own log, a path configured per task in ``PYTASKS_LOG_CONFIG``
+(default ``~/.pytasks/logs.json``).
+
+:class:`LogTail` remembers a byte offset and the identity of the file, so
+each :meth:`LogTail.read_new` costs only the bytes appended since the last
+call; the first read starts at most ``initial_bytes`` before the end. When
+the file was rotated (other identity, or shorter than the offset) the rest of
+the old file is read from its ``.1`` backup before continuing at the start of
+the new one. :func:`search` scans backwards from the end in blocks and stops
+after ``max_bytes`` or ``max_matches``, whatever the file size.
+"""
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+LOG_DIR = Path(os.environ.get('PYTASKS_LOGS', Path.home() / '.pytasks' / 'logs'))
+LOG_CONFIG = Path(os.environ.get('PYTASKS_LOG_CONFIG', Path.home() / '.pytasks' / 'logs.json'))
+INITIAL_BYTES = 64 * 1024
+MAX_READ = 1024 * 1024
+SEARCH_BYTES = 16 * 1024 * 1024
+BLOCK = 64 * 1024
+
+
+# ---- 每个任务的日志路径 ----
+
+def default_log_path(task_name: str) -> Path:
+    """Suggested log file of a task; ``\\`` in folder paths become ``__``."""
+    safe = task_name.strip('\\').replace('\\', '__')
+    return LOG_DIR / f'{safe}.log'
+
+
+def configured_logs(config: Union[str, Path, None] = None) -> Dict[str, str]:
+    try:
+        with open(config or LOG_CONFIG, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def set_log_path(task_name: str, path: str, config: Union[str, Path, None] = None) -> None:
+    """Remember the log file of a task; an empty ``path`` forgets it."""
+    config = Path(config or LOG_CONFIG)
+    logs = configured_logs(config)
+    if path:
+        logs[task_name] = path
+    else:
+        logs.pop(task_name, None)
+    config.parent.mkdir(parents=True, exist_ok=True)
+    tmp = config.with_name(config.name + '.tmp')
+    tmp.write_text(json.dumps(logs, indent=1, ensure_ascii=False), encoding='utf-8')
+    os.replace(tmp, config)
+
+
+def log_path_for(task_name: str, task_xml: Optional[str] = None) -> Optional[str]:
+    """The configured log of a task, else the ``--log`` file in its XML."""
+    configured = configured_logs().get(task_name)
+    if configured or not task_xml:
+        return configured
+    from xml_builder import config_from_xml
+    return config_from_xml(task_xml, task_name)[0].log_path or None
+
+
+# ---- 增量读取 ----
+
+def _identity(st: os.stat_result) -> Tuple[int, int]:
+    # Windows 上 st_ino 是 NTFS 文件索引，轮转（改名）后新文件的值不同
+    return st.st_dev, st.st_ino
+
+
+def _read_range(path: Path, start: int, end: int) -> bytes:
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return f.read(end - start)
+
+
+class LogTail:
+    """Read what was appended to a log file since the previous call."""
+
+    def __init__(self, path: Union[str, Path], initial_bytes: int = INITIAL_BYTES,
+                 max_read: int = MAX_READ, encoding: str = 'utf-8'):
+        self.path = Path(path)
+        self.initial_bytes = initial_bytes
+        self.max_read = max_read
+        self.encoding = encoding
+        self.offset: Optional[int] = None
+        self.identity: Optional[Tuple[int, int]] = None
+        self.rotations = 0
+        self.skipped = 0  # 首次读取及积压过多时跳过的字节数
+        self.bytes_read = 0
+        self._partial = False
+
+    def _rotated_rest(self) -> bytes:
+        """Unread end of the previous file, if its backup can be identified."""
+        backup = self.path.with_name(self.path.name + '.1')
+        try:
+            st = backup.stat()
+        except OSError:
+            return b''
+        if _identity(st) != self.identity or st.st_size <= self.offset:
+            return b''
+        return _read_range(backup, self.offset, min(st.st_size, self.offset + self.max_read))
+
+    def read_new(self) -> List[str]:
+        """Complete lines appended since the last call (a trailing partial line waits).
+
+        A missing file yields no lines; other read errors raise ``OSError``.
+        """
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return []
+        size, identity = st.st_size, _identity(st)
+        data = b''
+        if self.offset is None:
+            self.offset = max(0, size - self.initial_bytes)
+            self.skipped += self.offset
+            self._partial = self.offset > 0
+        elif identity != self.identity or size < self.offset:
+            # 文件被轮转或截断：先读完旧文件剩余部分，再从新文件开头读
+            self.rotations += 1
+            if identity != self.identity:
+                data = self._rotated_rest()
+            self.offset = 0
+            self._partial = False
+        self.identity = identity
+
+        start = self.offset
+        if size - start > self.max_read:
+            # 积压过多时只读最后 max_read 字节，保证每次读取的开销有上限
+            self.skipped += size - self.max_read - start
+            start = size - self.max_read
+            self._partial = True
+        chunk = _read_range(self.path, start, size) if size > start else b''
+        if self._partial:
+            # 从行中间开始读，丢掉第一行的残片
+            cut = chunk.find(b'\n') + 1 or len(chunk)
+            self._partial = cut == len(chunk) and not chunk.endswith(b'\n')
+            self.skipped += cut
+            chunk = chunk[cut:]
+            start += cut
+        end = chunk.rfind(b'\n') + 1
+        self.offset = start + end
+        self.bytes_read += len(data) + end
+        text = (data + chunk[:end]).decode(self.encoding, errors='replace')
+        return text.splitlines()
+
+
+# ---- 有界搜索 ----
+
+@dataclass
+class SearchResult:
+    matches: List[Tuple[int, str]] = field(default_factory=list)  # (字节偏移, 行)，最新的在前
+    scanned: int = 0
+    complete: bool = False  # 是否扫描到了文件开头
+
+
+def search(path: Union[str, Path], text: str, max_bytes: int = SEARCH_BYTES, max_matches: int = 100,
+           ignore_case: bool = True, encoding: str = 'utf-8', block: int = BLOCK) -> SearchResult:
+    """Lines containing ``text``, scanning backwards from the end of ``path``.
+
+    At most ``max_bytes`` are read, so a search costs the same on a multi-GB
+    log as on a small one; ``complete`` tells whether the whole file was seen.
+    """
+    needle = text.encode(encoding)
+    if ignore_case:
+        needle = needle.lower()
+    result = SearchResult()
+    with open(path, 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        limit = max(0, end - max_bytes)
+        pos, carry = end, b''
+        while pos > limit and len(result.matches) < max_matches:
+            step = min(block, pos - limit)
+            pos -= step
+            f.seek(pos)
+            lines = (f.read(step) + carry).split(b'\n')
+            # 块首的行可能不完整，留给下一块拼接；已到文件开头时它是完整的
+            carry = lines.pop(0) if pos > 0 else b''
+            offset = pos + (len(carry) + 1 if pos > 0 else 0)
+            found = []
+            for line in lines:
+                if needle in (line.lower() if ignore_case else line):
+                    found.append((offset, line.rstrip(b'\r').decode(encoding, errors='replace')))
+                offset += len(line) + 1
+            result.matches.extend(reversed(found))
+        result.scanned = end - pos
+        result.complete = pos == 0
+    del result.matches[max_matches:]
+    return result
@@ -0,0 +1,230 @@
+import csv
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+TASK_NS = '{http://schemas.microsoft.com/windows/2004/02/mit/task}'
+
+
+class TaskRecord:
+    """One task from a ``schtasks /Query /V`` listing, independent of UI language."""
+
+    __slots__ = (
+        'name', 'host', 'status', 'enabled', 'last_run', 'next_run', 'last_result',
+        'author', 'task_to_run', 'start_in', 'run_as_user', 'schedule_type',
+        'start_time', 'start_date', 'repeat_every', 'comment',
+    )
+
+    def __init__(self, name: str = '', host: str = '', status: str = '', enabled: bool = True,
+                 last_run: Optional[datetime] = None, next_run: Optional[datetime] = None,
+                 last_result: Optional[int] = None, author: str = '', task_to_run: str = '',
+                 start_in: str = '', run_as_user: str = '', schedule_type: str = '',
+                 start_time: str = '', start_date: str = '', repeat_every: str = '',
+                 comment: str = ''):
+        self.name = name
+        self.host = host
+        self.status = status
+        self.enabled = enabled
+        self.last_run = last_run
+        self.next_run = next_run
+        self.last_result = last_result
+        self.author = author
+        self.task_to_run = task_to_run
+        self.start_in = start_in
+        self.run_as_user = run_as_user
+        self.schedule_type = schedule_type
+        self.start_time = start_time
+        self.start_date = start_date
+        self.repeat_every = repeat_every
+        self.comment = comment
+
+    @property
+    def short_name(self) -> str:
+        return self.name.split('\\')[-1]
+
+    def to_dict(self) -> Dict[str, object]:
+        """JSON-ready fields; datetimes become ISO strings."""
+        out = {}
+        for slot in self.__slots__:
+            value = getattr(self, slot)
+            out[slot] = value.isoformat() if isinstance(value, datetime) else value
+        return out
+
+    def __repr__(self) -> str:
+        return f"TaskRecord(name={self.name!r}, status={self.status!r}, enabled={self.enabled!r})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TaskRecord):
+            return NotImplemented
+        return all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+
+# 表头 -> 字段；新增语言时调用 register_locale 扩展
+FIELD_LABELS: Dict[str, str] = {
+    'HostName': 'host', '主机名': 'host',
+    'TaskName': 'name', '任务名': 'name',
+    'Next Run Time': 'next_run', '下次运行时间': 'next_run',
+    'Status': 'status', '模式': 'status',
+    'Last Run Time': 'last_run', '上次运行时间': 'last_run',
+    'Last Result': 'last_result', '上次结果': 'last_result',
+    'Author': 'author', '创建者': 'author',
+    'Task To Run': 'task_to_run', '要运行的任务': 'task_to_run',
+    'Start In': 'start_in', '起始于': 'start_in',
+    'Comment': 'comment', '注释': 'comment',
+    'Scheduled Task State': 'enabled', '计划任务状态': 'enabled',
+    'Run As User': 'run_as_user', '作为用户运行': 'run_as_user',
+    'Schedule Type': 'schedule_type', '计划类型': 'schedule_type',
+    'Start Time': 'start_time', '开始时间': 'start_time',
+    'Start Date': 'start_date', '开始日期': 'start_date',
+    'Repeat: Every': 'repeat_every', '重复: 每': 'repeat_every',
+}
+
+# 状态值统一为英文
+STATUS_VALUES: Dict[str, str] = {
+    'Ready': 'Ready', '就绪': 'Ready',
+    'Running': 'Running', '正在运行': 'Running',
+    'Disabled': 'Disabled', '已禁用': 'Disabled',
+    'Queued': 'Queued', '已排队': 'Queued',
+    'Could not start': 'Could not start', '无法启动': 'Could not start',
+}
+
+STATE_DISABLED = {'Disabled', '已禁用'}
+
+DATETIME_FORMATS: List[str] = [
+    '%m/%d/%Y %I:%M:%S %p',  # en-US
+    '%Y/%m/%d %H:%M:%S',     # zh-CN
+    '%d/%m/%Y %H:%M:%S',
+    '%m/%d/%Y %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S',
+]
+
+
+def register_locale(labels: Dict[str, str], statuses: Optional[Dict[str, str]] = None,
+                    disabled_states: Iterable[str] = (), datetime_formats: Iterable[str] = ()) -> None:
+    """Teach the parser the headers and values of another Windows display language."""
+    unknown = set(labels.values()) - set(TaskRecord.__slots__)
+    if unknown:
+        raise ValueError(f"Unknown TaskRecord fields: {', '.join(sorted(unknown))}")
+    FIELD_LABELS.update(labels)
+    STATUS_VALUES.update(statuses or {})
+    STATE_DISABLED.update(disabled_states)
+    DATETIME_FORMATS.extend(f for f in datetime_formats if f not in DATETIME_FORMATS)
+    parse_datetime.cache_clear()
+
+
+@lru_cache(maxsize=4096)
+def parse_datetime(value: str) -> Optional[datetime]:
+    """Parse a schtasks timestamp; ``N/A``/``Never`` and the 1999 sentinel give ``None``."""
+    value = value.strip()
+    for fmt in DATETIME_FORMATS:
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        # 从未运行的任务显示为 1999/11/30
+        return None if parsed.year < 2000 else parsed
+    return None
+
+
+def parse_result(value: str) -> Optional[int]:
+    try:
+        return int(value.strip(), 0)
+    except ValueError:
+        return None
+
+
+def _convert(field: str, value: str):
+    if field in ('last_run', 'next_run'):
+        return parse_datetime(value)
+    if field == 'last_result':
+        return parse_result(value)
+    if field == 'status':
+        return STATUS_VALUES.get(value, value)
+    if field == 'enabled':
+        return value not in STATE_DISABLED
+    return value
+
+
+def _finish(record: TaskRecord) -> TaskRecord:
+    # 没有“计划任务状态”列时退回到模式判断
+    if record.status == 'Disabled':
+        record.enabled = False
+    return record
+
+
+def iter_csv_records(lines: Iterable[str]) -> Iterator[TaskRecord]:
+    """Stream-parse ``/V /FO CSV`` output into :class:`TaskRecord` objects.
+
+    Repeated header rows (one per folder) are skipped, and tasks with several
+    triggers, which produce one row per trigger, are yielded once.
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    header = None
+    columns = []
+    seen = set()
+    for row in csv.reader(lines):
+        if not row:
+            continue
+        if header is None or row == header:
+            header = row
+            # 预先计算列序号到字段的映射，逐行只做查表
+            columns = [(i, FIELD_LABELS[label]) for i, label in enumerate(row) if label in FIELD_LABELS]
+            continue
+        # 第二列固定为任务名（第一列为主机名），与语言无关
+        name = row[1] if len(row) > 1 else row[0]
+        if name in seen:
+            continue
+        seen.add(name)
+        record = TaskRecord(name=name)
+        for i, field in columns:
+            if i < len(row):
+                setattr(record, field, _convert(field, row[i]))
+        yield _finish(record)
+
+
+def _split_list_line(line: str):
+    # 键本身可能含冒号（如“重复: 每”），取第一个能在表中找到的前缀
+    pos = line.find(':')
+    while pos != -1:
+        field = FIELD_LABELS.get(line[:pos].strip())
+        if field is not None:
+            return field, line[pos + 1:].strip()
+        pos = line.find(':', pos + 1)
+    return None, None
+
+
+def iter_list_records(lines: Iterable[str]) -> Iterator[TaskRecord]:
+    """Stream-parse ``/V /FO LIST`` output; blocks are separated by blank lines."""
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    record = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            if record is not None and record.name:
+                yield _finish(record)
+            record = None
+            continue
+        field, value = _split_list_line(line)
+        if field is None:
+            continue
+        if record is None:
+            record = TaskRecord()
+        setattr(record, field, _convert(field, value))
+    if record is not None and record.name:
+        yield _finish(record)
+
+
+def parse_task_xml(xml: str) -> ET.Element:
+    """Parse task XML text (e.g. ``query_task_xml`` output) into an element tree.
+
+    The ``encoding="UTF-16"`` declaration is dropped first because the text
+    has already been decoded.
+    """
+    xml = xml.lstrip('\ufeff').lstrip()
+    if xml.startswith('<?xml'):
+        xml = xml.split('?>', 1)[1]
+    return ET.fromstring(xml)
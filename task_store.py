@@ -0,0 +1,178 @@
+"""Read task definitions straight from the Windows task store.
+
+Registered tasks are kept as XML files under ``%SystemRoot%\\System32\\Tasks``
+(one file per task, folders as directories). :class:`TaskStoreReader` walks
+the ``PyTasks`` subtree, parses each file with a streaming parser into a
+:class:`task_records.TaskRecord` and on later scans re-reads only files whose
+mtime or size changed. Runtime state (status, last/next run, last result) is
+not stored in the XML; :meth:`TaskStoreReader.load` fills it from one bulk
+``schtasks`` query.
+
+Reading the store usually needs administrator rights. ``root`` can point at
+any directory with the same layout, e.g. a fixture directory on Linux.
+"""
+import os
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from task_records import TASK_NS, TaskRecord
+
+
+DEFAULT_ROOT = Path(os.environ.get('SystemRoot', 'C:\\Windows')) / 'System32' / 'Tasks'
+
+SCHEDULE_TYPES = {
+    'TimeTrigger': 'One Time Only',
+    'ScheduleByDay': 'Daily',
+    'ScheduleByWeek': 'Weekly',
+    'ScheduleByMonth': 'Monthly',
+    'ScheduleByMonthDayOfWeek': 'Monthly',
+    'LogonTrigger': 'At logon time',
+    'BootTrigger': 'At system start up',
+}
+
+# 运行时状态字段，只能从 schtasks 查询获得
+STATE_FIELDS = ('status', 'last_run', 'next_run', 'last_result')
+
+
+def parse_task_file(path: Union[str, Path], name: str) -> TaskRecord:
+    """Stream-parse one task XML file into a record without runtime state."""
+    record = TaskRecord(name=name)
+    command = arguments = ''
+    first_trigger = True
+    stack: List[str] = []
+    for event, elem in ET.iterparse(str(path), events=('start', 'end')):
+        tag = elem.tag.replace(TASK_NS, '')
+        if event == 'start':
+            stack.append(tag)
+            continue
+        text = (elem.text or '').strip()
+        parent = stack[-2] if len(stack) > 1 else ''
+        if tag == 'Author' and parent == 'RegistrationInfo':
+            record.author = text
+        elif tag == 'Description' and parent == 'RegistrationInfo':
+            record.comment = text
+        elif tag == 'Command' and parent == 'Exec':
+            command = text
+        elif tag == 'Arguments' and parent == 'Exec':
+            arguments = text
+        elif tag == 'WorkingDirectory' and parent == 'Exec':
+            record.start_in = text
+        elif tag == 'UserId' and parent == 'Principal':
+            record.run_as_user = text
+        elif tag == 'Enabled' and parent == 'Settings':
+            record.enabled = text.lower() != 'false'
+        elif first_trigger and 'Triggers' in stack:
+            # 与 schtasks /V 一样只展示第一个触发器
+            if parent == 'Triggers':
+                record.schedule_type = record.schedule_type or SCHEDULE_TYPES.get(tag, tag)
+                first_trigger = False
+            elif tag == 'StartBoundary':
+                _set_start(record, text)
+            elif tag == 'Interval' and parent == 'Repetition':
+                record.repeat_every = text
+            elif tag in SCHEDULE_TYPES:
+                record.schedule_type = SCHEDULE_TYPES[tag]
+        stack.pop()
+        # 逐个释放已处理的节点，内存不随文件大小增长
+        elem.clear()
+    record.task_to_run = f'{command} {arguments}'.strip()
+    record.status = '' if record.enabled else 'Disabled'
+    return record
+
+
+def _set_start(record: TaskRecord, value: str) -> None:
+    try:
+        start = datetime.fromisoformat(value)
+    except ValueError:
+        return
+    record.start_date = start.date().isoformat()
+    record.start_time = start.time().isoformat()
+
+
+class TaskStoreReader:
+    """Incremental reader of one folder of the task store."""
+
+    def __init__(self, root: Union[str, Path] = DEFAULT_ROOT, folder: str = 'PyTasks'):
+        self.root = Path(root)
+        self.folder = folder
+        self._lock = threading.Lock()
+        # 相对路径 -> (mtime_ns, size, record)
+        self._entries: Dict[str, Tuple[int, int, TaskRecord]] = {}
+        self.stats = {'scans': 0, 'parsed': 0, 'reused': 0, 'removed': 0, 'errors': 0}
+
+    def scan(self) -> List[TaskRecord]:
+        """Return definition-only records, re-parsing only changed files."""
+        base = self.root / self.folder
+        if not base.is_dir():
+            raise FileNotFoundError(f"Task store folder not found: {base}")
+        with self._lock:
+            self.stats['scans'] += 1
+            seen = set()
+            for dirpath, _, filenames in os.walk(base):
+                for filename in filenames:
+                    path = Path(dirpath) / filename
+                    rel = path.relative_to(base).as_posix()
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        continue
+                    seen.add(rel)
+                    cached = self._entries.get(rel)
+                    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                        self.stats['reused'] += 1
+                        continue
+                    name = '\\' + self.folder + '\\' + rel.replace('/', '\\')
+                    try:
+                        record = parse_task_file(path, name)
+                    except (OSError, ET.ParseError):
+                        self.stats['errors'] += 1
+                        continue
+                    self.stats['parsed'] += 1
+                    self._entries[rel] = (st.st_mtime_ns, st.st_size, record)
+            for rel in set(self._entries) - seen:
+                del self._entries[rel]
+                self.stats['removed'] += 1
+            return [entry[2] for _, entry in sorted(self._entries.items(), key=lambda kv: kv[0].lower())]
+
+    def load(self, with_state: bool = True) -> List[TaskRecord]:
+        """Scan the store and, optionally, merge runtime state from one bulk query."""
+        records = self.scan()
+        if not with_state:
+            return records
+        import scheduler_cli as sc
+        result, live = sc.load_inventory()
+        if result.returncode != 0:
+            return records
+        states = {r.name.lower(): r for r in live}
+        merged = []
+        for record in records:
+            state = states.get(record.name.lower())
+            if state is not None:
+                # 不修改缓存中的记录，复制一份再填充状态
+                record = _copy(record)
+                for field in STATE_FIELDS:
+                    setattr(record, field, getattr(state, field))
+                record.enabled = state.enabled
+            merged.append(record)
+        return merged
+
+
+def _copy(record: TaskRecord) -> TaskRecord:
+    clone = TaskRecord()
+    for slot in TaskRecord.__slots__:
+        setattr(clone, slot, getattr(record, slot))
+    return clone
+
+
+_readers: Dict[Tuple[str, str], TaskStoreReader] = {}
+
+
+def get_reader(root: Optional[Union[str, Path]] = None, folder: str = 'PyTasks') -> TaskStoreReader:
+    """Return a shared reader per ``(root, folder)`` so scans stay incremental."""
+    key = (str(root or DEFAULT_ROOT), folder)
+    if key not in _readers:
+        _readers[key] = TaskStoreReader(key[0], folder)
+    return _readers[key]
@@ -0,0 +1,227 @@
+"""Headless command line for PyTasks with newline-delimited JSON output.
+
+Usage::
+
+    python -m taskctl list [--pattern 'backup*'] [--folder '\\PyTasks\\team_a' ...]
+    python -m taskctl show NAME [--xml]
+    python -m taskctl create NAME --python C:\\Python\\python.exe --script job.py \\
+        [--args ...] [--workdir ...] [--trigger '{"type": "daily", "every": 1}'] [--force]
+    python -m taskctl enable|disable|run|delete NAME [NAME ...]
+    python -m taskctl export [NAME ...]
+    python -m taskctl batch < ops.ndjson
+
+Every command prints one JSON object per line. Task names may be full
+paths (``\\PyTasks\\team_a\\backup``) to address other folders.
+Operations on several tasks run in parallel on the shared executor.
+``batch`` reads one operation per line, e.g. ``{"op": "disable", "task":
+"backup"}`` or ``{"op": "create", "name": "backup", ...}`` with the same
+keys as a manifest entry, runs them in parallel and prints the results in
+input order. The exit code is 1 if any operation failed.
+
+Only the scheduler modules are imported; streamlit is never loaded and
+jinja2 only when a task is created.
+"""
+import argparse
+import fnmatch
+import json
+import subprocess
+import sys
+from typing import Callable, Dict, Iterable, List, Optional, TextIO
+
+import scheduler_cli as sc
+from executor import CommandExecutor, get_executor, set_executor
+
+
+def _emit(obj: dict, out: TextIO) -> None:
+    out.write(json.dumps(obj, ensure_ascii=False, default=str) + '\n')
+
+
+def _outcome(op: str, task: str, result: Optional[subprocess.CompletedProcess]) -> dict:
+    if result is None:
+        return {'op': op, 'task': task, 'ok': False, 'error': 'cancelled'}
+    out = {'op': op, 'task': task, 'ok': result.returncode == 0, 'returncode': result.returncode}
+    if result.returncode == 0:
+        out['message'] = result.stdout.strip()
+    else:
+        out['error'] = result.stderr.strip()
+    return out
+
+
+def _create(entry: dict) -> subprocess.CompletedProcess:
+    from manifest import config_from_entry
+    from xml_builder import build_xml
+
+    config = config_from_entry(entry)
+    force = str(entry.get('force', False)).lower() in ('true', '1', 'yes')
+    return sc.create_task_from_xml(build_xml(config), config.name, force)
+
+
+# 单任务操作：名称 -> 函数(task, entry)
+OPERATIONS: Dict[str, Callable[[str, dict], subprocess.CompletedProcess]] = {
+    'enable': lambda task, entry: sc.change_enable(task, True),
+    'disable': lambda task, entry: sc.change_enable(task, False),
+    'run': lambda task, entry: sc.run_task(task),
+    'delete': lambda task, entry: sc.delete_task(task),
+    'export': lambda task, entry: sc.query_task_xml(task),
+    'create': lambda task, entry: _create(entry),
+}
+
+
+def execute(entry: dict) -> dict:
+    """Run one operation described by a dict; never raises."""
+    op = entry.get('op', '')
+    task = entry.get('task') or entry.get('name') or ''
+    func = OPERATIONS.get(op)
+    if func is None:
+        return {'op': op, 'task': task, 'ok': False, 'error': f'unknown op {op!r}'}
+    if not task:
+        return {'op': op, 'task': task, 'ok': False, 'error': 'missing task name'}
+    try:
+        result = func(task, entry)
+    except (ValueError, KeyError, TypeError, OSError) as exc:
+        return {'op': op, 'task': task, 'ok': False, 'error': str(exc)}
+    outcome = _outcome(op, task, result)
+    if op == 'export' and outcome['ok']:
+        outcome.pop('message')
+        outcome['xml'] = result.stdout
+    return outcome
+
+
+def execute_many(entries: Iterable[dict]) -> List[dict]:
+    """Run operations in parallel; results keep input order."""
+    results = get_executor().map(execute, list(entries))
+    return [r if r is not None else {'ok': False, 'error': 'cancelled'} for r in results]
+
+
+def cmd_list(opts, out: TextIO) -> bool:
+    ok = True
+    pattern = (opts.pattern or '*').lower()
+    # 多个文件夹并发查询，按参数顺序输出
+    for folder, (result, records) in sc.load_folders(opts.folder or [sc.TASK_FOLDER]).items():
+        if result.returncode != 0:
+            _emit({'op': 'list', 'folder': folder, 'ok': False, 'error': result.stderr.strip()}, out)
+            ok = False
+            continue
+        for record in records:
+            if fnmatch.fnmatch(record.short_name.lower(), pattern):
+                _emit(record.to_dict(), out)
+    return ok
+
+
+def cmd_show(opts, out: TextIO) -> bool:
+    result = sc.query_task_record(opts.name)
+    records = list(sc.iter_inventory(result.stdout)) if result.returncode == 0 else []
+    if not records:
+        _emit({'op': 'show', 'task': opts.name, 'ok': False, 'error': result.stderr.strip() or 'not found'}, out)
+        return False
+    data = records[0].to_dict()
+    if opts.xml:
+        xml = sc.query_task_xml(opts.name)
+        data['xml'] = xml.stdout if xml.returncode == 0 else None
+    _emit(data, out)
+    return True
+
+
+def cmd_create(opts, out: TextIO) -> bool:
+    entry = {'op': 'create', 'name': opts.name, 'python_path': opts.python, 'script_path': opts.script,
+             'args': opts.args, 'workdir': opts.workdir, 'force': opts.force, 'launcher': opts.launcher,
+             'log_path': opts.log}
+    if opts.trigger:
+        try:
+            entry['trigger'] = json.loads(opts.trigger)
+        except ValueError as exc:
+            _emit({'op': 'create', 'task': opts.name, 'ok': False, 'error': f'invalid --trigger JSON: {exc}'}, out)
+            return False
+    outcome = execute(entry)
+    _emit(outcome, out)
+    return outcome['ok']
+
+
+def cmd_tasks(opts, out: TextIO) -> bool:
+    names = opts.names
+    if opts.command == 'export' and not names:
+        result, records = sc.load_inventory()
+        # 文件夹不存在时没有可导出的任务；其它查询失败不能当作空列表
+        if result.returncode != 0 and not sc.is_not_found(result):
+            _emit({'op': 'export', 'folder': sc.TASK_FOLDER, 'ok': False, 'error': result.stderr.strip()}, out)
+            return False
+        names = [r.short_name for r in records]
+    ok = True
+    for outcome in execute_many({'op': opts.command, 'task': name} for name in names):
+        _emit(outcome, out)
+        ok = ok and outcome['ok']
+    return ok
+
+
+def cmd_batch(opts, out: TextIO) -> bool:
+    lines = [line for line in (raw.strip() for raw in sys.stdin) if line]
+    parsed: List[Optional[dict]] = []
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            entry = None
+        parsed.append(entry if isinstance(entry, dict) else None)
+    outcomes = iter(execute_many(e for e in parsed if e is not None))
+    ok = True
+    for line, entry in zip(lines, parsed):
+        # 无法解析的行原样报告，结果顺序与输入一致
+        outcome = next(outcomes) if entry is not None else {'op': '', 'ok': False, 'error': f'invalid JSON: {line[:80]}'}
+        _emit(outcome, out)
+        ok = ok and outcome['ok']
+    return ok
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m taskctl', description='Manage \\PyTasks\\ tasks; prints NDJSON.')
+    parser.add_argument('--workers', type=int, help='parallel schtasks processes (default 8)')
+    parser.add_argument('--timeout', type=float, help='seconds before a parallel command is killed')
+    parser.add_argument('--server', action='store_true', help='send commands to one persistent worker process')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('list', help='list tasks')
+    p.add_argument('--pattern', help='wildcard on the task name')
+    p.add_argument('--folder', action='append', help='folder to list (repeatable, default \\PyTasks\\)')
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser('show', help='show one task')
+    p.add_argument('name')
+    p.add_argument('--xml', action='store_true', help='include the task XML')
+    p.set_defaults(func=cmd_show)
+
+    p = sub.add_parser('create', help='create a task')
+    p.add_argument('name')
+    p.add_argument('--python', required=True, help='python interpreter path')
+    p.add_argument('--script', required=True, help='script path')
+    p.add_argument('--args', default='')
+    p.add_argument('--workdir', default='')
+    p.add_argument('--trigger', help='trigger spec as JSON, as in a manifest')
+    p.add_argument('--launcher', action='store_true', help='run through launcher.py')
+    p.add_argument('--log', help='append the script\'s stdout/stderr to this file')
+    p.add_argument('--force', action='store_true', help='overwrite an existing task')
+    p.set_defaults(func=cmd_create)
+
+    for name in ('enable', 'disable', 'run', 'delete', 'export'):
+        p = sub.add_parser(name, help=f'{name} tasks')
+        p.add_argument('names', nargs='*' if name == 'export' else '+')
+        p.set_defaults(func=cmd_tasks)
+
+    p = sub.add_parser('batch', help='read NDJSON operations from stdin and run them in parallel')
+    p.set_defaults(func=cmd_batch)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None, out: Optional[TextIO] = None) -> int:
+    out = out or sys.stdout
+    opts = build_parser().parse_args(argv)
+    if opts.server:
+        from backends import set_backend
+        from command_server import ServerBackend
+        set_backend(ServerBackend(workers=opts.workers or 8))
+    if opts.workers or opts.timeout:
+        set_executor(CommandExecutor(max_workers=opts.workers or 8, timeout=opts.timeout))
+    return 0 if opts.func(opts, out) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import backends  # noqa: E402
+import scheduler_cli as sc  # noqa: E402
+from fake_scheduler import FakeScheduler  # noqa: E402
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    """A FakeScheduler with three tasks in ``\\PyTasks\\`` and empty scheduler caches."""
+    scheduler = FakeScheduler().populate(3)
+    old = backends.set_backend(scheduler)
+    # 缓存是模块级共享对象，每个测试换成新的
+    cache = sc.InventoryCache()
+    monkeypatch.setattr(sc, 'inventory_cache', cache)
+    monkeypatch.setattr(sc, 'folder_cache', sc.FolderCache())
+    monkeypatch.setattr(sc, '_folder_caches', {cache.folder.lower(): cache})
+    monkeypatch.setattr(sc, '_generations', {})
+    yield scheduler
+    backends.set_backend(old)
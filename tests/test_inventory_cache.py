@@ -0,0 +1,105 @@
+import subprocess
+
+import scheduler_cli as sc
+
+
+def queries(fake):
+    return fake.calls.get('/QUERY', 0)
+
+
+def names(records):
+    return [r.short_name for r in records]
+
+
+def test_second_read_is_served_from_cache(fake):
+    result, records = sc.load_inventory()
+    assert result.returncode == 0 and len(records) == 3
+    sc.load_inventory()
+    assert queries(fake) == 1
+    assert sc.inventory_cache.stats['hits'] == 1
+
+
+def test_mutation_requeries_only_the_dirty_task(fake):
+    sc.load_inventory()
+    assert sc.change_enable('task_00001', False).returncode == 0
+    _, records = sc.load_inventory()
+    assert queries(fake) == 2
+    assert sc.inventory_cache.stats['entry_refreshes'] == 1
+    assert [r.enabled for r in records] == [True, False, True]
+
+
+def test_many_dirty_tasks_trigger_one_full_reload(fake):
+    fake.populate(3, prefix='more_')
+    sc.load_inventory()
+    for name in ('task_00000', 'task_00001', 'task_00002', 'more_00000'):
+        sc.run_task(name)
+    sc.load_inventory()
+    assert queries(fake) == 2
+    assert sc.inventory_cache.stats['entry_refreshes'] == 0
+
+
+def test_saved_calls_never_negative(fake):
+    sc.load_inventory()
+    sc.run_task('task_00000')
+    sc.run_task('task_00001')
+    sc.load_inventory()
+    assert sc.inventory_cache.stats['saved_calls'] == 0
+
+
+def test_stale_inventory_is_reloaded(fake):
+    sc.load_inventory()
+    sc.inventory_cache._loaded_at -= sc.inventory_cache.ttl + 1
+    sc.load_inventory()
+    assert queries(fake) == 2
+    assert sc.inventory_cache.stats['stale'] == 1
+
+
+def test_delete_drops_the_task_without_a_query(fake):
+    sc.load_inventory()
+    sc.delete_task('task_00001')
+    _, records = sc.load_inventory()
+    assert names(records) == ['task_00000', 'task_00002']
+    assert queries(fake) == 1
+
+
+def test_new_task_is_picked_up_by_a_scoped_query(fake):
+    sc.load_inventory()
+    xml = fake.tasks['\\pytasks\\task_00000'].xml
+    assert sc.create_task_from_xml(xml, 'added').returncode == 0
+    _, records = sc.load_inventory()
+    assert names(records) == ['task_00000', 'task_00001', 'task_00002', 'added']
+
+
+def test_failed_refresh_keeps_the_record_and_retries(fake, monkeypatch):
+    sc.load_inventory()
+    run = fake.run
+    monkeypatch.setattr(fake, 'run', lambda args, timeout=None: subprocess.CompletedProcess(
+        args, -1, '', 'Timed out after 30s'))
+    result, record = sc.refresh_task('task_00001')
+    assert result.returncode == -1 and record is not None
+    assert names(sc.load_inventory()[1]) == ['task_00000', 'task_00001', 'task_00002']
+
+    monkeypatch.setattr(fake, 'run', run)
+    fake.tasks['\\pytasks\\task_00001'].enabled = False
+    _, records = sc.load_inventory()
+    assert not records[1].enabled
+
+
+def test_refresh_of_a_deleted_task_drops_it(fake):
+    sc.load_inventory()
+    del fake.tasks['\\pytasks\\task_00001']
+    result, record = sc.refresh_task('task_00001')
+    assert sc.is_not_found(result) and record is None
+    assert names(sc.load_inventory()[1]) == ['task_00000', 'task_00002']
+
+
+def test_failed_reload_is_not_cached(fake, monkeypatch):
+    run = fake.run
+    monkeypatch.setattr(fake, 'run', lambda args, timeout=None: subprocess.CompletedProcess(
+        args, 1, '', 'ERROR: Access is denied.'))
+    result, records = sc.load_inventory()
+    assert result.returncode == 1 and records == []
+    # 非“找不到”的错误不能把文件夹记为不存在
+    assert sc.folder_cache.known(sc.TASK_FOLDER) is None
+    monkeypatch.setattr(fake, 'run', run)
+    assert len(sc.load_inventory()[1]) == 3
@@ -0,0 +1,98 @@
+import subprocess
+
+import pytest
+
+import reconcile
+
+
+def entry(name, **extra):
+    return dict(name=name, python_path='C:\\Python\\python.exe', script_path=f'C:\\jobs\\{name}.py',
+                trigger={'type': 'daily', 'start': '2030-01-01T02:00'}, **extra)
+
+
+def ops(plan):
+    return [(a.op, a.name) for a in plan.actions]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return reconcile.HashCache(tmp_path / 'hashes.json')
+
+
+@pytest.fixture
+def synced(fake, cache):
+    """Two manifest tasks registered live next to the fake's sample tasks."""
+    entries = [entry('alpha'), entry('beta')]
+    reconcile.apply(reconcile.plan(entries, cache=cache), cache)
+    return entries
+
+
+def test_missing_tasks_are_created(fake, cache):
+    plan = reconcile.plan([entry('alpha'), entry('beta', enabled=False)], cache=cache)
+    assert ops(plan) == [('create', 'alpha'), ('create', 'beta'), ('disable', 'beta')]
+    assert plan.xml_queries == 0
+
+
+def test_applied_plan_leaves_nothing_to_do(fake, cache, synced):
+    plan = reconcile.plan(synced, cache=cache)
+    assert plan.actions == [] and plan.unchanged == ['alpha', 'beta']
+    assert plan.xml_queries == 2
+    # 指纹未变时直接用缓存的哈希
+    assert reconcile.plan(synced, cache=cache).xml_queries == 0
+
+
+def test_drift_is_planned_as_update(fake, cache, synced):
+    drifted = [entry('alpha', args='--full'), synced[1]]
+    plan = reconcile.plan(drifted, cache=cache)
+    assert ops(plan) == [('update', 'alpha')]
+    assert plan.unchanged == ['beta']
+
+
+def test_enabled_state_is_reconciled(fake, cache, synced):
+    plan = reconcile.plan([synced[0], entry('beta', enabled=False)], cache=cache)
+    assert ops(plan) == [('disable', 'beta')]
+
+
+def test_prune_deletes_tasks_not_in_manifest(fake, cache, synced):
+    plan = reconcile.plan(synced, prune=True, cache=cache)
+    assert ops(plan) == [('delete', 'task_00000'), ('delete', 'task_00001'), ('delete', 'task_00002')]
+    assert all(a.reason == 'not in manifest' for a in plan.actions)
+
+
+def test_failed_xml_query_is_an_error_not_an_update(fake, cache, synced, monkeypatch):
+    run = fake.run
+
+    def flaky(args, timeout=None):
+        if '/XML' in args and 'alpha' in args[-2].lower():
+            return subprocess.CompletedProcess(args, -1, '', 'Timed out after 30s')
+        return run(args, timeout)
+
+    monkeypatch.setattr(fake, 'run', flaky)
+    plan = reconcile.plan([entry('alpha', args='--full'), synced[1]], prune=True, cache=cache)
+    assert plan.errors == [('alpha', 'Timed out after 30s')]
+    # 读取失败的任务既不重建也不当作多余任务删除
+    assert ('update', 'alpha') not in ops(plan) and ('delete', 'alpha') not in ops(plan)
+    assert '1 errors' in reconcile.format_plan(plan)
+
+
+def test_task_deleted_after_inventory_is_created(fake, cache, synced, monkeypatch):
+    run = fake.run
+
+    def vanished(args, timeout=None):
+        if '/XML' in args and 'alpha' in args[-2].lower():
+            return subprocess.CompletedProcess(args, 1, '', 'ERROR: The system cannot find the file specified.')
+        return run(args, timeout)
+
+    monkeypatch.setattr(fake, 'run', vanished)
+    plan = reconcile.plan(synced, cache=cache)
+    assert ops(plan) == [('create', 'alpha')] and plan.errors == []
+
+
+def test_cached_hash_expires_after_max_age(fake, cache, synced):
+    reconcile.plan(synced, cache=cache)
+    cache.save()
+    reloaded = reconcile.HashCache(cache.path, max_age=60)
+    assert reconcile.plan(synced, cache=reloaded).xml_queries == 0
+    for name, (fingerprint, digest, fetched) in list(reloaded.entries.items()):
+        reloaded.entries[name] = (fingerprint, digest, fetched - 61)
+    assert reconcile.plan(synced, cache=reloaded).xml_queries == 2
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from run_history import RESULT_RUNNING, RunHistory
+from task_records import TaskRecord
+
+T0 = datetime(2026, 3, 2, 9, 0)
+NAME = '\\PyTasks\\job'
+
+
+def snapshot(last_run=None, last_result=None, next_run=None, enabled=True):
+    return [TaskRecord(name=NAME, enabled=enabled, last_run=last_run, last_result=last_result, next_run=next_run)]
+
+
+@pytest.fixture
+def history():
+    history = RunHistory(':memory:')
+    yield history
+    history.close()
+
+
+def test_new_runs_are_recorded_once(history):
+    assert history.record(snapshot(T0, 0, T0 + timedelta(hours=1)), now=T0) == 1
+    # 状态不变的快照不写入
+    assert history.record(snapshot(T0, 0, T0 + timedelta(hours=1)), now=T0 + timedelta(minutes=5)) == 0
+    later = T0 + timedelta(hours=1)
+    assert history.record(snapshot(later, 1, later + timedelta(hours=1)), now=later) == 1
+    assert history.runs(NAME) == [(later, 1), (T0, 0)]
+    stats = history.summary(now=later)[NAME]
+    assert (stats.runs, stats.failures, stats.missed) == (2, 1, 0)
+
+
+def test_running_result_is_corrected_later(history):
+    history.record(snapshot(T0, RESULT_RUNNING), now=T0)
+    stats = history.summary(now=T0)[NAME]
+    assert (stats.runs, stats.failures) == (1, 0)
+
+    assert history.record(snapshot(T0, 2), now=T0 + timedelta(minutes=1)) == 1
+    assert history.runs(NAME) == [(T0, 2)]
+    assert history.summary(now=T0)[NAME].failures == 1
+    # 再次更正为成功时失败数回退
+    history.record(snapshot(T0, 0), now=T0 + timedelta(minutes=2))
+    assert history.summary(now=T0)[NAME].failures == 0
+    assert history.stats['updated'] == 2
+
+
+def test_overdue_next_run_is_recorded_as_missed(history):
+    due = T0 + timedelta(hours=1)
+    history.record(snapshot(T0, 0, due), now=T0)
+    # 宽限期内不算错过
+    assert history.record(snapshot(T0, 0, due), now=due + timedelta(minutes=1)) == 0
+    assert history.record(snapshot(T0, 0, due), now=due + timedelta(minutes=3)) == 1
+    assert history.record(snapshot(T0, 0, due), now=due + timedelta(minutes=4)) == 0
+    stats = history.summary(now=due)[NAME]
+    assert (stats.runs, stats.missed) == (1, 1)
+
+
+def test_run_that_happened_is_not_missed(history):
+    due = T0 + timedelta(hours=1)
+    history.record(snapshot(T0, 0, due), now=T0)
+    assert history.record(snapshot(due, 0, due + timedelta(hours=1)), now=due + timedelta(minutes=5)) == 1
+    assert history.summary(now=due)[NAME].missed == 0
+
+
+def test_disabled_task_is_not_missed(history):
+    due = T0 + timedelta(hours=1)
+    history.record(snapshot(T0, 0, due), now=T0)
+    assert history.record(snapshot(T0, 0, due, enabled=False), now=due + timedelta(minutes=5)) == 0
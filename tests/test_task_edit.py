@@ -0,0 +1,95 @@
+from dataclasses import replace
+from datetime import datetime
+
+import pytest
+
+import scheduler_cli as sc
+import task_edit
+from xml_builder import TaskConfig, build_xml, config_from_xml, daily_trigger, minutes_trigger
+
+START = datetime(2026, 3, 2, 9, 30)
+
+
+@pytest.fixture
+def config():
+    return TaskConfig(name='job', python_path='C:\\Python\\python.exe', script_path='C:\\jobs\\job.py',
+                      args='--quiet', retry_interval='PT1H', trigger_xml=minutes_trigger(START, 15, 'minutes'))
+
+
+def plan(config, desired, enabled=None, live_enabled=True):
+    return task_edit.plan_edit('job', build_xml(config), live_enabled, desired, enabled)
+
+
+def test_unchanged_task_needs_nothing(config):
+    assert plan(config, config).op == 'none'
+
+
+def test_spaced_script_path_and_equivalent_durations_are_unchanged(config):
+    config = replace(config, script_path='C:\\my jobs\\job.py')
+    assert plan(config, replace(config, retry_interval='PT60M')).op == 'none'
+    interval = task_edit.set_trigger_interval(config.trigger_xml, 15)
+    assert plan(replace(config, trigger_xml=minutes_trigger(START, 1, 'hours')),
+                replace(config, trigger_xml=task_edit.set_trigger_interval(interval, 60))).op == 'none'
+
+
+def test_command_change_uses_tr(config):
+    result = plan(config, replace(config, args='--verbose'))
+    assert result.op == 'change'
+    assert result.changes == ['args']
+    assert result.switches == ['/TR', '"C:\\Python\\python.exe" C:\\jobs\\job.py --verbose']
+
+
+@pytest.mark.parametrize('start, switches', [
+    (datetime(2026, 3, 2, 10, 0), ['/ST', '10:00']),
+    (datetime(2026, 3, 5, 9, 30), ['/SD', '03/05/2026']),
+])
+def test_start_change_uses_st_or_sd(config, start, switches):
+    desired = replace(config, trigger_xml=task_edit.set_trigger_start(config.trigger_xml, start))
+    result = plan(config, desired)
+    assert (result.op, result.changes, result.switches) == ('change', ['trigger'], switches)
+
+
+def test_interval_change_uses_ri(config):
+    desired = replace(config, trigger_xml=task_edit.set_trigger_interval(config.trigger_xml, 30))
+    assert plan(config, desired).switches == ['/RI', '30']
+
+
+def test_enabled_change_alone_uses_change(config):
+    result = plan(config, config, enabled=False)
+    assert (result.op, result.switches) == ('change', ['/DISABLE'])
+
+
+@pytest.mark.parametrize('desired', [
+    lambda c: replace(c, multiple_instances_policy='IgnoreNew'),
+    lambda c: replace(c, workdir='D:\\work'),
+    lambda c: replace(c, trigger_xml=daily_trigger(START, 1)),
+    lambda c: replace(c, trigger_xml=task_edit.set_trigger_start(c.trigger_xml, START.replace(second=30))),
+])
+def test_other_changes_recreate_the_task(config, desired):
+    result = plan(config, desired(config))
+    assert result.op == 'create' and result.reason
+
+
+def test_long_command_line_recreates_the_task(config):
+    result = plan(config, replace(config, args='x' * task_edit.MAX_TR_LENGTH))
+    assert (result.op, result.reason) == ('create', '/TR 超过长度限制')
+
+
+def test_edit_applies_change_against_the_scheduler(fake, config):
+    sc.create_task_from_xml(build_xml(config), 'job')
+    desired = replace(config, args='--verbose',
+                      trigger_xml=task_edit.set_trigger_interval(config.trigger_xml, 5))
+    result, res = task_edit.edit_task('job', desired)
+    assert result.op == 'change' and res.returncode == 0
+    assert fake.calls.get('/CREATE') == 1
+    live, _ = config_from_xml(sc.query_task_xml('job').stdout, 'job')
+    assert live.args == '--verbose'
+    assert task_edit.plan_edit('job', sc.query_task_xml('job').stdout, True, desired).op == 'none'
+
+
+def test_recreating_a_disabled_task_keeps_it_disabled(fake, config):
+    sc.create_task_from_xml(build_xml(config), 'job')
+    sc.change_enable('job', False)
+    result, res = task_edit.edit_task('job', replace(config, workdir='D:\\work'), live_enabled=False)
+    assert result.op == 'create' and res.returncode == 0
+    assert not fake.tasks['\\pytasks\\job'].enabled
@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import pytest
+
+from fake_scheduler import FakeScheduler
+from task_records import iter_csv_records, iter_list_records, parse_datetime
+
+
+def query(scheduler, fmt):
+    return scheduler.run(['schtasks', '/Query', '/TN', '\\PyTasks\\', '/V', '/FO', fmt]).stdout
+
+
+@pytest.fixture(params=['en', 'zh'])
+def scheduler(request):
+    scheduler = FakeScheduler(locale=request.param).populate(3)
+    ran = scheduler.tasks['\\pytasks\\task_00001']
+    ran.last_run, ran.last_result = datetime(2026, 3, 2, 14, 5, 0), 1
+    scheduler.tasks['\\pytasks\\task_00002'].enabled = False
+    return scheduler
+
+
+@pytest.mark.parametrize('fmt, parse', [('CSV', iter_csv_records), ('LIST', iter_list_records)])
+def test_parse_verbose_output(scheduler, fmt, parse):
+    records = list(parse(query(scheduler, fmt)))
+    assert [r.name for r in records] == [f'\\PyTasks\\task_0000{i}' for i in range(3)]
+    never, ran, disabled = records
+    assert never.host == 'FAKEHOST'
+    assert never.status == 'Ready' and never.enabled
+    assert never.last_run is None and never.last_result == 267011
+    assert never.task_to_run == 'C:\\Python\\python.exe C:\\scripts\\job_0.py'
+    assert never.start_in == 'C:\\scripts'
+    assert ran.last_run == datetime(2026, 3, 2, 14, 5, 0) and ran.last_result == 1
+    assert disabled.status == 'Disabled' and not disabled.enabled
+
+
+def test_csv_and_list_agree(scheduler):
+    assert list(iter_csv_records(query(scheduler, 'CSV'))) == list(iter_list_records(query(scheduler, 'LIST')))
+
+
+def test_csv_skips_repeated_headers_and_trigger_rows():
+    header = '"HostName","TaskName","Status","Last Result"'
+    lines = [header, '"H","\\A\\one","Ready","0"', '"H","\\A\\one","Ready","0"',
+             header, '"H","\\B\\two","Running","0x41301"']
+    records = list(iter_csv_records(lines))
+    assert [(r.name, r.status, r.last_result) for r in records] == [
+        ('\\A\\one', 'Ready', 0), ('\\B\\two', 'Running', 0x41301)]
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('3/2/2026 2:05:00 PM', datetime(2026, 3, 2, 14, 5)),
+    ('2026/03/02 14:05:00', datetime(2026, 3, 2, 14, 5)),
+    ('11/30/1999 12:00:00 AM', None),
+    ('N/A', None),
+])
+def test_parse_datetime(value, expected):
+    assert parse_datetime(value) == expected
@@ -0,0 +1,72 @@
+import io
+import json
+import subprocess
+
+import pytest
+
+import taskctl
+
+
+def run(argv, stdin=None, monkeypatch=None):
+    if stdin is not None:
+        monkeypatch.setattr('sys.stdin', io.StringIO(stdin))
+    out = io.StringIO()
+    code = taskctl.main(argv, out=out)
+    return code, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def deny_inventory(fake, monkeypatch):
+    run_ = fake.run
+    monkeypatch.setattr(fake, 'run', lambda args, timeout=None: subprocess.CompletedProcess(
+        args, 1, '', 'ERROR: Access is denied.') if '/V' in args else run_(args, timeout))
+
+
+def test_list_and_disable(fake):
+    code, lines = run(['list', '--pattern', '*1'])
+    assert code == 0 and [line['name'] for line in lines] == ['\\PyTasks\\task_00001']
+    code, lines = run(['disable', 'task_00000', 'task_00002'])
+    assert code == 0 and [line['task'] for line in lines] == ['task_00000', 'task_00002']
+    assert not fake.tasks['\\pytasks\\task_00000'].enabled
+
+
+def test_unknown_task_is_reported_per_line(fake):
+    code, lines = run(['run', 'task_00000', 'missing'])
+    assert code == 1
+    assert [line['ok'] for line in lines] == [True, False]
+    assert 'cannot find' in lines[1]['error']
+
+
+def test_malformed_trigger_is_an_error_line(fake):
+    code, lines = run(['create', 'job', '--python', 'python.exe', '--script', 'job.py', '--trigger', '{daily'])
+    assert code == 1
+    assert lines[0]['op'] == 'create' and not lines[0]['ok']
+    assert lines[0]['error'].startswith('invalid --trigger JSON')
+    assert fake.calls.get('/CREATE') is None
+
+
+def test_export_fails_when_inventory_query_fails(fake, monkeypatch):
+    deny_inventory(fake, monkeypatch)
+    code, lines = run(['export'])
+    assert code == 1
+    assert lines == [{'op': 'export', 'folder': '\\PyTasks\\', 'ok': False, 'error': 'ERROR: Access is denied.'}]
+
+
+def test_failed_list_folder_is_reported(fake):
+    code, lines = run(['list', '--folder', '\\PyTasks\\', '--folder', '\\Nowhere\\'])
+    assert code == 1
+    assert len([line for line in lines if 'name' in line]) == 3
+    assert lines[-1]['op'] == 'list' and lines[-1]['folder'] == '\\Nowhere\\' and not lines[-1]['ok']
+
+
+@pytest.mark.parametrize('line, error', [
+    ('{"op": "explode", "task": "task_00000"}', "unknown op 'explode'"),
+    ('{"op": "run"}', 'missing task name'),
+    ('not json', 'invalid JSON: not json'),
+    ('[1, 2]', 'invalid JSON: [1, 2]'),
+])
+def test_batch_reports_bad_lines_in_order(fake, monkeypatch, line, error):
+    stdin = '\n'.join(['{"op": "disable", "task": "task_00000"}', line, '', '{"op": "run", "task": "task_00001"}'])
+    code, lines = run(['batch'], stdin, monkeypatch)
+    assert code == 1
+    assert [out['ok'] for out in lines] == [True, False, True]
+    assert lines[1]['error'] == error
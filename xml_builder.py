@@ -1,14 +1,20 @@
+import codecs
+import re
+import xml.etree.ElementTree as ET
 from dataclasses import dataclass
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, List
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, List, Tuple, Union
 
-from jinja2 import Environment, FileSystemLoader
+from launcher import LAUNCHER_PATH, journal_path
+from task_records import TASK_NS, parse_task_xml
 
-TEMPLATE_DIR = Path(__file__).parent / 'templates'
+if TYPE_CHECKING:
+    from jinja2 import Template
 
+TEMPLATE_DIR = Path(__file__).parent / 'templates'
 
-env = Environment(loader=FileSystemLoader(str(TEMPLATE_DIR)))
 
 MONTHS_XML = """<Months><January/><February/><March/><April/><May/><June/><July/><August/><September/><October/><November/><December/></Months>"""
 
@@ -26,13 +32,27 @@ class TaskConfig:
     retry_count: int = 3
     trigger_xml: str = ''
     author: str = 'TaskScheduler'
+    # 通过 launcher.py 运行脚本，记录每次运行的耗时与资源占用
+    launcher: bool = False
+    # 把脚本的 stdout/stderr 追加到该文件（经由 launcher.py 重定向）
+    log_path: str = ''
 
 
-def build_xml(config: TaskConfig) -> str:
-    """Render the task XML using the template."""
-    template = env.get_template('task_template.xml')
-    xml = template.render(
-        registration_date=datetime.now().isoformat(),
+@lru_cache(maxsize=None)
+def get_template() -> 'Template':
+    """Load and compile the task template once per process.
+
+    jinja2 is imported here so that importing this module stays cheap.
+    """
+    from jinja2 import Environment, FileSystemLoader
+
+    env = Environment(loader=FileSystemLoader(str(TEMPLATE_DIR)))
+    return env.get_template('task_template.xml')
+
+
+def _context(config: TaskConfig, registration_date: Optional[str] = None) -> dict:
+    return dict(
+        registration_date=registration_date or datetime.now().isoformat(),
         author=config.author,
         triggers=config.trigger_xml,
         python_path=config.python_path,
@@ -43,8 +63,95 @@ def build_xml(config: TaskConfig) -> str:
         start_when_available=config.start_when_available,
         retry_interval=config.retry_interval,
         retry_count=config.retry_count,
+        launcher=str(LAUNCHER_PATH) if config.launcher or config.log_path else '',
+        journal=str(journal_path(config.name)) if config.launcher or config.log_path else '',
+        log=config.log_path,
     )
-    return xml
+
+
+def build_xml(config: TaskConfig, registration_date: Optional[str] = None) -> str:
+    """Render the task XML using the template."""
+    return get_template().render(_context(config, registration_date))
+
+
+def build_xml_batch(configs: Iterable[TaskConfig]) -> Iterator[Tuple[TaskConfig, str]]:
+    """Lazily render many configs with one compiled template and one timestamp."""
+    template = get_template()
+    registration_date = datetime.now().isoformat()
+    for config in configs:
+        yield config, template.render(_context(config, registration_date))
+
+
+def write_xml(config: TaskConfig, path: Union[str, Path], registration_date: Optional[str] = None) -> Path:
+    """Stream the rendered XML to ``path`` as UTF-16, as ``schtasks /Create /XML`` expects."""
+    path = Path(path)
+    # 增量编码器只在开头写一次 BOM
+    encoder = codecs.getincrementalencoder('utf-16')()
+    with open(path, 'wb') as f:
+        for chunk in get_template().generate(_context(config, registration_date)):
+            f.write(encoder.encode(chunk))
+        f.write(encoder.encode('', final=True))
+    return path
+
+
+def _strip_namespace(node: ET.Element) -> ET.Element:
+    for elem in node.iter():
+        elem.tag = elem.tag.replace(TASK_NS, '')
+    return node
+
+
+def _split_arguments(arguments: str) -> Tuple[bool, str, str, str]:
+    """Undo the ``Arguments`` template: ``(launcher, log_path, script_path, args)``."""
+    arguments = arguments.strip()
+    launcher = arguments.startswith(f'"{LAUNCHER_PATH}" --journal ') and ' -- ' in arguments
+    log_path = ''
+    if launcher:
+        prefix, arguments = arguments.split(' -- ', 1)
+        arguments = arguments.lstrip()
+        match = re.search(r' --log "([^"]*)"', prefix)
+        log_path = match.group(1) if match else ''
+    if arguments.startswith('"') and '"' in arguments[1:]:
+        end = arguments.index('"', 1) + 1
+        script_path, args = arguments[:end], arguments[end:]
+    else:
+        script_path, _, args = arguments.partition(' ')
+    return launcher, log_path, script_path, args.strip()
+
+
+def config_from_xml(xml: str, name: str) -> Tuple[TaskConfig, bool]:
+    """Parse task XML (e.g. ``query_task_xml`` output) back into ``(config, enabled)``.
+
+    The inverse of :func:`build_xml` for tasks created from the template;
+    triggers are kept as XML without the namespace, one element per trigger.
+    """
+    root = parse_task_xml(xml)
+
+    def text(path: str, default: str = '') -> str:
+        node = root.find('./' + '/'.join(TASK_NS + p for p in path.split('/')))
+        return node.text.strip() if node is not None and node.text else default
+
+    triggers = root.find(f'./{TASK_NS}Triggers')
+    trigger_xml = '\n'.join(ET.tostring(_strip_namespace(t), encoding='unicode').strip()
+                             for t in (list(triggers) if triggers is not None else []))
+    launcher, log_path, script_path, args = _split_arguments(text('Actions/Exec/Arguments'))
+    retry_count = text('Settings/RestartOnFailure/Count', '0')
+    config = TaskConfig(
+        name=name,
+        # /Change /TR 写入的命令带引号
+        python_path=text('Actions/Exec/Command').strip('"'),
+        script_path=script_path,
+        args=args,
+        workdir=text('Actions/Exec/WorkingDirectory'),
+        multiple_instances_policy=text('Settings/MultipleInstancesPolicy', 'IgnoreNew'),
+        start_when_available=text('Settings/StartWhenAvailable', 'false'),
+        retry_interval=text('Settings/RestartOnFailure/Interval', TaskConfig.retry_interval),
+        retry_count=int(retry_count) if retry_count.isdigit() else 0,
+        trigger_xml=trigger_xml,
+        author=text('RegistrationInfo/Author'),
+        launcher=launcher,
+        log_path=log_path,
+    )
+    return config, text('Settings/Enabled', 'true').lower() != 'false'
 
 
 def minutes_trigger(start: datetime, every: int, unit: str) -> str:
@@ -108,3 +215,11 @@ def monthly_nth_dow_trigger(start: datetime, week: str, day: str) -> str:
     {MONTHS_XML}
   </ScheduleByMonthDayOfWeek>
 </CalendarTrigger>"""
+
+
+def shift_trigger(trigger_xml: str, offset: timedelta) -> str:
+    """Move every ``StartBoundary`` in the trigger XML by ``offset`` (e.g. to stagger tasks)."""
+    def shift(match):
+        start = datetime.fromisoformat(match.group(1)) + offset
+        return f'<StartBoundary>{start.isoformat()}</StartBoundary>'
+    return re.sub(r'<StartBoundary>([^<]+)</StartBoundary>', shift, trigger_xml)